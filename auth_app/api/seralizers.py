@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from auth_app.models import User
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.contrib.auth.models import update_last_login
+from rest_framework import exceptions
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from auth_app.tokens import FilteredRefreshToken
 from django.contrib.auth import get_user_model
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -56,6 +60,17 @@ class LoginSeralizer(TokenObtainPairSerializer):
         fields = ['id','username', 'password', 'email']
         extra_kwargs = {'username': {'write_only': True},'password': {'write_only': True},}
 
+    @classmethod
+    def get_token(cls, user):
+        """
+        Issue the refresh token with an "is_staff" claim, which access
+        tokens inherit. The stateless authentication mode reads it, see
+        auth_app.authentication.CookieJWTAuthentication.token_user.
+        """
+        token = super().get_token(user)
+        token["is_staff"] = user.is_staff
+        return token
+
     def validate(self, attrs):
         """
         Validate user login credentials and generate JWT tokens.
@@ -66,8 +81,13 @@ class LoginSeralizer(TokenObtainPairSerializer):
         3. Raise a validation error if the user does not exist.
         4. Verify the provided password against the stored hashed password.
         5. Raise a validation error if the password is incorrect.
-        6. Call the parent TokenObtainPairSerializer validation to generate access and refresh tokens.
-        7. Return the token data.
+        6. Reject inactive accounts like authenticate() would.
+        7. Generate access and refresh tokens for the user.
+        8. Return the token data.
+
+        The password is hashed exactly once; the parent validation is not
+        called because authenticate() would load the user and hash the
+        password a second time.
         """
         
         username = attrs.get("username")
@@ -80,6 +100,22 @@ class LoginSeralizer(TokenObtainPairSerializer):
         
         if not user.check_password(password):
             raise serializers.ValidationError("wrong password")
-        
-        data = super().validate({"username": user.username, "password": password})
+
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        self.user = user
+        refresh = self.get_token(user)
+        data = {"refresh": str(refresh), "access": str(refresh.access_token)}
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
         return data
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that checks revocation through the in-process
+    filter, see auth_app.tokens.FilteredRefreshToken.
+    """
+
+    token_class = FilteredRefreshToken
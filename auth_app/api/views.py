@@ -2,14 +2,15 @@
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework import generics, status
-from .seralizers import RegistrationSerializer, LoginSeralizer
+from .seralizers import RegistrationSerializer, LoginSeralizer, FilteredTokenRefreshSerializer
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from auth_app.tokens import FilteredRefreshToken
 
 class RegistrationView(generics.CreateAPIView):
     """
@@ -106,6 +107,11 @@ class LogoutView(APIView):
             - Deletes access and refresh token cookies.
             - Returns a success message.
             - Returns 400 if no access token cookie is found.
+
+    The refresh token is rejected by this process at once; other worker
+    processes pick up the revocation within TOKEN_BLACKLIST_SYNC_INTERVAL
+    seconds, see auth_app.revocation. Access tokens stay valid until they
+    expire.
     """
 
     permission_classes = [IsAuthenticated]
@@ -130,7 +136,7 @@ class LogoutView(APIView):
         
         response = Response({"detail": "Log-Out successfully! All Tokens will be deleted. Refresh token is now invalid."}, status=status.HTTP_200_OK)
 
-        token = RefreshToken(refresh_token)
+        token = FilteredRefreshToken(refresh_token)
         token.blacklist()
 
         response.delete_cookie(key='refresh_token')
@@ -155,6 +161,8 @@ class RefreshTokenView(TokenRefreshView):
             - Returns 401 if tokens are missing or do not match.
     """
 
+    serializer_class = FilteredTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         """
         Handle POST request to refresh the JWT access token.
@@ -184,8 +192,14 @@ class RefreshTokenView(TokenRefreshView):
 
         seralizer = self.get_serializer(data={"refresh": refresh_token })
 
-        if seralizer.is_valid():
+        try:
+            valid = seralizer.is_valid()
+        except TokenError:
+            return Response({"detail": "RefreshToken invalid"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if valid:
             access_token = seralizer.validated_data.get("access")
             response = Response({'detail': "Token refreshed",  "access": access_token})
             response.set_cookie(key="access_token", value=access_token, httponly=True, secure=True, samesite="Lax")
-            return response
\ No newline at end of file
+            return response
+        return Response({"detail": "RefreshToken invalid"}, status=status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class AuthAppConfig(AppConfig):
     name = 'auth_app'
+
+    def ready(self):
+        """
+        Connect the signal handlers that keep the authentication cache in
+        sync with the user table.
+        """
+        from . import signals
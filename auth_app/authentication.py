@@ -1,6 +1,23 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.response import Response
-from rest_framework import generics, status
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CACHE_ALIAS = "auth_users"
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """
+    Remove a user from the authentication cache of this process, see
+    auth_app.signals.
+    """
+    caches[USER_CACHE_ALIAS].delete(user_cache_key(user_id))
+
 
 class CookieJWTAuthentication(JWTAuthentication):
     """
@@ -14,6 +31,8 @@ class CookieJWTAuthentication(JWTAuthentication):
         - Extracts the access token from request cookies.
         - Validates the token and identifies the associated user.
         - Authenticates the request if the token is valid.
+        - Keeps the user in the "auth_users" cache for a few seconds, so
+          list and detail calls do not query the user table every time.
     """
     def authenticate(self, request):
         """
@@ -21,16 +40,56 @@ class CookieJWTAuthentication(JWTAuthentication):
 
         Process Steps:
         1. Retrieve the 'access_token' from the request cookies.
-        2. Validate the token (check signature, expiration, etc.).
-        3. Extract the user associated with the validated token.
-        4. Return a tuple of (user, validated_token) if authentication succeeds.
-        5. Return None if the token is missing, invalid, or expired.
+        2. Return None right away if there is no cookie.
+        3. Validate the token (check signature, expiration, etc.).
+        4. Extract the user associated with the validated token.
+        5. Return a tuple of (user, validated_token) if authentication succeeds.
+        6. Return None if the token is invalid or expired.
         """
         access_token = request.COOKIES.get("access_token")
+        if not access_token:
+            return None
 
         try:
             validated_token = self.get_validated_token(access_token)
             user = self.get_user(validated_token)
             return (user, validated_token)
         except Exception:
-            return None
\ No newline at end of file
+            return None
+
+    def get_user(self, validated_token):
+        """
+        Return the user of a validated token.
+
+        Behavior:
+            - With settings.AUTH_STATELESS_USER the user is built from the
+              token claims without any query, see token_user.
+            - Otherwise the user is read from the "auth_users" cache and
+              loaded from the database on a miss. Entries expire after the
+              cache TIMEOUT (AUTH_USER_CACHE_TTL) and are dropped when the
+              user is saved or deleted.
+        """
+        if settings.AUTH_STATELESS_USER:
+            return self.token_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        cache = caches[USER_CACHE_ALIAS]
+        user = cache.get(user_cache_key(user_id)) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(user_cache_key(user_id), user)
+        return user
+
+    def token_user(self, validated_token):
+        """
+        Build an unsaved User from the token claims.
+
+        The instance can be used as foreign key value and for ownership
+        checks like a loaded user. Changes to the account (e.g. deactivation)
+        only take effect once the access token expires.
+        """
+        user = User(is_active=True, is_staff=bool(validated_token.get("is_staff", False)))
+        user_id_field = User._meta.get_field(api_settings.USER_ID_FIELD)
+        setattr(user, user_id_field.attname, user_id_field.to_python(validated_token[api_settings.USER_ID_CLAIM]))
+        user._state.adding = False
+        return user
@@ -0,0 +1,57 @@
+import time
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from auth_app.api.seralizers import LoginSeralizer
+from quiz_app.management.benchmark import throwaway_database
+
+USERNAME = "benchmark-login"
+PASSWORD = "benchmark-pass"
+
+
+def login():
+    LoginSeralizer(data={"username": USERNAME, "password": PASSWORD}).is_valid(raise_exception=True)
+
+
+def login_with_double_hash():
+    """
+    The previous login path: check the password, then let
+    TokenObtainPairSerializer authenticate() and hash it again.
+    """
+    User.objects.get(username=USERNAME).check_password(PASSWORD)
+    TokenObtainPairSerializer(data={"username": USERNAME, "password": PASSWORD}).is_valid(raise_exception=True)
+
+
+class Command(BaseCommand):
+    """
+    Measure how many logins one core can serve.
+
+    Runs the login serializer in a single thread against a throwaway
+    database, so the result is logins per second per core with the
+    configured password hasher.
+    """
+
+    help = "Measure logins per second per core."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=30, help="Number of logins to time.")
+        parser.add_argument('--compare', action='store_true',
+                            help="Also time the previous login path that hashed the password twice.")
+
+    def handle(self, *args, **options):
+        hasher = get_hasher()
+        self.stdout.write(f"Password hasher: {hasher.algorithm}, {getattr(hasher, 'iterations', '-')} iterations")
+        with throwaway_database():
+            User.objects.create_user(username=USERNAME, password=PASSWORD)
+            paths = [("login", login)]
+            if options['compare']:
+                paths.append(("login (double hash)", login_with_double_hash))
+            for name, path in paths:
+                path()
+                start = time.perf_counter()
+                for _ in range(options['logins']):
+                    path()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{name:<20} {options['logins'] / elapsed:8.1f} logins/s/core "
+                                  f"{elapsed / options['logins'] * 1000:8.1f} ms/login")
@@ -0,0 +1,143 @@
+import hashlib
+import math
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter for strings.
+
+    Answers "definitely not added" or "possibly added". The bit array is
+    sized for capacity items at the given false positive rate; positions are
+    derived from one blake2b digest with double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        """
+        Add an item. It is only counted if it set a new bit, so adding an
+        item twice does not use up capacity.
+        """
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item: str):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationFilter:
+    """
+    In-process filter of blacklisted refresh token ids (JTIs).
+
+    Behavior:
+        - Built from the unexpired entries of simplejwt's token blacklist on
+          first use and rebuilt every settings.TOKEN_BLACKLIST_REBUILD_INTERVAL
+          seconds, which drops the ids of expired tokens.
+        - Picks up tokens blacklisted by other processes every
+          settings.TOKEN_BLACKLIST_SYNC_INTERVAL seconds with one small query.
+        - Tokens blacklisted by this process are added right away, tokens
+          blacklisted by other processes are accepted here for up to
+          TOKEN_BLACKLIST_SYNC_INTERVAL seconds.
+
+    A token that is not in the filter is not blacklisted, so only possible
+    hits (real ones and rare false positives) need a database lookup.
+    """
+
+    def __init__(self):
+        self._filter = None
+        self._built_at = None
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def rebuild(self):
+        """
+        Build a new filter from the blacklisted tokens that are not expired yet.
+        """
+        now = timezone.now()
+        jtis = list(BlacklistedToken.objects.filter(token__expires_at__gt=now).values_list("token__jti", flat=True))
+        bloom = BloomFilter(max(2 * len(jtis), settings.TOKEN_BLACKLIST_FILTER_CAPACITY),
+                            settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE)
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            self._filter = bloom
+            self._built_at = self._synced_at = now
+
+    def sync(self):
+        """
+        Add tokens blacklisted since the last sync. The window overlaps the
+        previous one, so entries committed late by other processes are not
+        missed; ids that are added again are not counted twice.
+        """
+        now = timezone.now()
+        jtis = BlacklistedToken.objects.filter(blacklisted_at__gte=self._synced_at - SYNC_OVERLAP).values_list(
+            "token__jti", flat=True)
+        with self._lock:
+            for jti in jtis:
+                self._filter.add(jti)
+            self._synced_at = now
+
+    def _refresh(self):
+        now = timezone.now()
+        if (self._filter is None or self._filter.count > self._filter.capacity
+                or now - self._built_at >= timedelta(seconds=settings.TOKEN_BLACKLIST_REBUILD_INTERVAL)):
+            self.rebuild()
+        elif now - self._synced_at >= timedelta(seconds=settings.TOKEN_BLACKLIST_SYNC_INTERVAL):
+            self.sync()
+
+    def might_contain(self, jti: str):
+        """
+        Return False if the token is certainly not blacklisted, True if it
+        may be and the database has to decide.
+        """
+        self._refresh()
+        return jti in self._filter
+
+    def add(self, jti: str):
+        """
+        Record a token that was just blacklisted by this process.
+        """
+        self._refresh()
+        with self._lock:
+            self._filter.add(jti)
+
+    def clear(self):
+        """
+        Drop the filter so it is rebuilt on next use, mainly useful for tests.
+        """
+        with self._lock:
+            self._filter = None
+
+    def stats(self):
+        bloom = self._filter
+        if bloom is None:
+            return {"entries": 0, "bits": 0, "hashes": 0, "built_at": None}
+        return {"entries": bloom.count, "bits": bloom.size, "hashes": bloom.hashes, "built_at": self._built_at}
+
+
+revocation_filter = RevocationFilter()
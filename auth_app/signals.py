@@ -0,0 +1,14 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_cached_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    """
+    Drop a changed or deleted user from the authentication cache, so
+    deactivation, password or permission changes apply to the next request.
+    """
+    invalidate_cached_user(instance.pk)
@@ -1,3 +1,177 @@
-from django.test import TestCase
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from auth_app.authentication import CookieJWTAuthentication
+from auth_app.revocation import BloomFilter, revocation_filter
+from auth_app.tokens import FilteredRefreshToken
 
-# Create your tests here.
+
+class CookieAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        caches["auth_users"].clear()
+        caches["quiz_reads"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.cookies["access_token"] = str(AccessToken.for_user(self.user))
+        # the blacklist middleware reloads its rules once per minute
+        self.client.get("/api/quizzes/")
+
+    def test_user_is_cached_between_requests(self):
+        # no queries, the user and the quiz list come from the caches
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/quizzes/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_changed_user_is_loaded_again(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get("/api/quizzes/")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_not_authenticated(self):
+        self.user.delete()
+
+        response = self.client.get("/api/quizzes/")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_request_without_cookie_skips_token_validation(self):
+        self.client.cookies.clear()
+
+        with mock.patch.object(CookieJWTAuthentication, "get_validated_token") as validate:
+            response = self.client.get("/api/quizzes/")
+
+        validate.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_STATELESS_USER=True)
+    def test_stateless_mode_builds_user_from_token(self):
+        caches["auth_users"].clear()
+        caches["quiz_reads"].clear()
+
+        # list ETag and quizzes, no user query and no user cache
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/quizzes/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.wsgi_request.user.pk, self.user.pk)
+
+
+@override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=3600)
+class RevocationFilterTests(APITestCase):
+
+    def setUp(self):
+        revocation_filter.clear()
+        self.addCleanup(revocation_filter.clear)
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.cookies["refresh_token"] = str(self.refresh)
+        self.client.cookies["access_token"] = str(self.refresh.access_token)
+
+    def refresh_access(self):
+        return self.client.post("/api/token/refresh/", HTTP_AUTHORIZATION=f"Bearer {self.refresh}")
+
+    def test_bloom_filter_has_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"added-{i}")
+
+        self.assertTrue(all(f"added-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_refresh_skips_blacklist_lookup(self):
+        revocation_filter.rebuild()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh_access()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any("token_blacklist_blacklistedtoken" in query["sql"] for query in queries))
+
+    def test_logged_out_token_is_rejected(self):
+        self.client.get("/api/quizzes/")
+        self.assertEqual(self.client.post("/api/logout/").status_code, status.HTTP_200_OK)
+        self.client.cookies["refresh_token"] = str(self.refresh)
+
+        response = self.refresh_access()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(revocation_filter.might_contain(self.refresh["jti"]))
+
+    @override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0)
+    def test_tokens_blacklisted_elsewhere_are_synced(self):
+        revocation_filter.rebuild()
+        RefreshToken(str(self.refresh)).blacklist()
+
+        response = self.refresh_access()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0)
+    def test_repeated_syncs_do_not_count_tokens_twice(self):
+        RefreshToken(str(self.refresh)).blacklist()
+        revocation_filter.rebuild()
+        for _ in range(5):
+            revocation_filter.sync()
+
+        self.assertEqual(revocation_filter.stats()["entries"], 1)
+
+    def test_rebuild_drops_expired_tokens(self):
+        FilteredRefreshToken(str(self.refresh)).blacklist()
+        OutstandingToken.objects.filter(jti=self.refresh["jti"]).update(expires_at=timezone.now())
+
+        revocation_filter.rebuild()
+
+        self.assertFalse(revocation_filter.might_contain(self.refresh["jti"]))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoginTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+
+    def login(self, username="owner", password="secret-pass"):
+        return self.client.post("/api/login/", {"username": username, "password": password}, format="json")
+
+    def test_password_is_hashed_once(self):
+        with mock.patch.object(User, "check_password", autospec=True, side_effect=User.check_password) as check:
+            response = self.login()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(check.call_count, 1)
+        self.assertIn("access_token", response.cookies)
+        self.assertIn("refresh_token", response.cookies)
+
+    def test_error_messages_stay_distinct(self):
+        self.assertEqual(self.login(username="nobody").data["non_field_errors"], ["username not exist"])
+        self.assertEqual(self.login(password="wrong").data["non_field_errors"], ["wrong password"])
+
+    @override_settings(AUTH_STATELESS_USER=True)
+    def test_staff_claim_reaches_stateless_user(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        self.login()
+        response = self.client.get("/api/stats/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.wsgi_request.user.is_staff)
+
+    def test_inactive_user_cannot_log_in(self):
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .revocation import revocation_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check asks the in-process revocation
+    filter first and only queries the blacklist table on a possible hit.
+    Blacklisting a token also adds it to the filter.
+    Disabled with settings.TOKEN_BLACKLIST_FILTER.
+    """
+
+    def check_blacklist(self):
+        if settings.TOKEN_BLACKLIST_FILTER and not revocation_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            return
+        super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        if settings.TOKEN_BLACKLIST_FILTER:
+            revocation_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
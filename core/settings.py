@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     ]
 
 MIDDLEWARE = [
+    "quiz_app.middleware.ServerTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -91,12 +92,54 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_ENGINE selects the profile: "sqlite" (default) or "postgres". Connections are
+# kept open for DATABASE_CONN_MAX_AGE seconds instead of being opened for every request.
+DATABASE_ENGINE = os.getenv("DATABASE_ENGINE", "sqlite")
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", "60"))
+
+if DATABASE_ENGINE == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DATABASE_NAME", "quizly"),
+            'USER': os.getenv("DATABASE_USER", "quizly"),
+            'PASSWORD': os.getenv("DATABASE_PASSWORD", ""),
+            'HOST': os.getenv("DATABASE_HOST", "localhost"),
+            'PORT': os.getenv("DATABASE_PORT", "5432"),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    # psycopg's connection pool (pip install "psycopg[pool]") replaces persistent connections.
+    if os.getenv("DATABASE_POOL", "False") == "True":
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv("DATABASE_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+            'timeout': float(os.getenv("DATABASE_POOL_TIMEOUT", "10")),
+        }
+else:
+    # WAL lets readers run next to the single writer, synchronous=NORMAL only syncs at
+    # checkpoints, and writers wait up to SQLITE_BUSY_TIMEOUT seconds for the lock instead
+    # of failing with "database is locked". IMMEDIATE transactions take the write lock up
+    # front, so the wait applies instead of failing on the read -> write upgrade.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DATABASE_NAME", BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'OPTIONS': {
+                'init_command': (
+                    f"PRAGMA journal_mode={os.getenv('SQLITE_JOURNAL_MODE', 'WAL')};"
+                    f"PRAGMA synchronous={os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')};"
+                    "PRAGMA temp_store=MEMORY;"
+                ),
+                'timeout': float(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -135,7 +178,12 @@ REST_FRAMEWORK = {
         
         'auth_app.authentication.CookieJWTAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # Same bytes as the default JSONRenderer, serialized with orjson when installed.
+    'DEFAULT_RENDERER_CLASSES': (
+        'quiz_app.api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 
 }
 
@@ -145,6 +193,44 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 
 }
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Transcript and quiz payload per YouTube video id, see quiz_app.api.result_cache.
+    # Point the backend to a shared cache (file based, Redis, ...) to share results between workers.
+    'quiz_results': {
+        'BACKEND': os.getenv("QUIZ_RESULT_CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("QUIZ_RESULT_CACHE_LOCATION", 'quiz-results'),
+        'TIMEOUT': int(os.getenv("QUIZ_RESULT_CACHE_TTL", str(60 * 60 * 24 * 7))),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("QUIZ_RESULT_CACHE_MAX_ENTRIES", "1000")),
+        },
+    },
+    # Authenticated users per user id, see auth_app.authentication. Entries are dropped
+    # when a user is saved or deleted; with a per-process cache other workers see the
+    # change after AUTH_USER_CACHE_TTL seconds at the latest.
+    'auth_users': {
+        'BACKEND': os.getenv("AUTH_USER_CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("AUTH_USER_CACHE_LOCATION", 'auth-users'),
+        'TIMEOUT': int(os.getenv("AUTH_USER_CACHE_TTL", "30")),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000")),
+        },
+    },
+    # Rendered quiz list/detail payloads per user, see quiz_app.api.read_cache. Quiz and
+    # question signals invalidate the owner's entries; with a per-process cache other
+    # workers serve a changed quiz after QUIZ_READ_CACHE_TTL seconds at the latest.
+    'quiz_reads': {
+        'BACKEND': os.getenv("QUIZ_READ_CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("QUIZ_READ_CACHE_LOCATION", 'quiz-reads'),
+        'TIMEOUT': int(os.getenv("QUIZ_READ_CACHE_TTL", "30")),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("QUIZ_READ_CACHE_MAX_ENTRIES", "5000")),
+        },
+    },
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
@@ -162,3 +248,94 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Quiz pipeline
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_PRELOAD_MODELS = [name.strip() for name in os.getenv("WHISPER_PRELOAD_MODELS", "").split(",") if name.strip()]
+WHISPER_WARM_ON_STARTUP = os.getenv("WHISPER_WARM_ON_STARTUP", "False") == "True"
+QUIZ_JOB_WORKERS = int(os.getenv("QUIZ_JOB_WORKERS", "2"))
+# Jobs stuck in a pipeline stage this long are requeued by run_quiz_jobs.
+QUIZ_JOB_STALE_SECONDS = int(os.getenv("QUIZ_JOB_STALE_SECONDS", "7200"))
+VIDEO_INFO_CACHE_TTL = int(os.getenv("VIDEO_INFO_CACHE_TTL", "300"))
+WHISPER_PARALLEL_WORKERS = int(os.getenv("WHISPER_PARALLEL_WORKERS", "0"))
+WHISPER_PARALLEL_MIN_SECONDS = float(os.getenv("WHISPER_PARALLEL_MIN_SECONDS", "600"))
+WHISPER_CHUNK_SECONDS = float(os.getenv("WHISPER_CHUNK_SECONDS", "120"))
+WHISPER_CHUNK_OVERLAP_SECONDS = float(os.getenv("WHISPER_CHUNK_OVERLAP_SECONDS", "2"))
+# Whisper inference profiles, see quiz_app.api.transcription.get_profile. "models" maps a
+# maximum audio length in seconds (None for any) to a model size; "fast" trades accuracy for
+# speed with smaller int8 models and greedy decoding without temperature fallback.
+WHISPER_PROFILE = os.getenv("WHISPER_PROFILE", "default")
+WHISPER_PROFILE_THREADS = int(os.getenv("WHISPER_PROFILE_THREADS", "0"))
+WHISPER_PROFILES = {
+    "default": {
+        "models": [[None, WHISPER_MODEL]],
+        "threads": WHISPER_PROFILE_THREADS,
+    },
+    "fast": {
+        "models": [[600, "base"], [None, "tiny"]],
+        "quantize": True,
+        "threads": WHISPER_PROFILE_THREADS,
+        "decoding": "greedy",
+        "fallback": False,
+    },
+    "accurate": {
+        "models": [[1800, "small"], [None, "base"]],
+        "threads": WHISPER_PROFILE_THREADS,
+        "decoding": "beam",
+        "beam_size": 5,
+    },
+}
+# Energy-based voice activity detection that cuts silence before Whisper runs, see
+# quiz_app.api.transcription.speech_spans. Off by default: it is relative to the noise floor of
+# each recording and does not detect music.
+WHISPER_VAD = os.getenv("WHISPER_VAD", "False") == "True"
+WHISPER_VAD_NOISE_RATIO = float(os.getenv("WHISPER_VAD_NOISE_RATIO", "3"))
+WHISPER_VAD_SILENCE_RMS = float(os.getenv("WHISPER_VAD_SILENCE_RMS", "0.0001"))
+WHISPER_VAD_MIN_SILENCE_SECONDS = float(os.getenv("WHISPER_VAD_MIN_SILENCE_SECONDS", "1"))
+WHISPER_VAD_PAD_SECONDS = float(os.getenv("WHISPER_VAD_PAD_SECONDS", "0.25"))
+# Transcript source ladder, tried in order: manual subtitles, automatic captions, Whisper.
+TRANSCRIPT_SOURCES = [source.strip() for source in os.getenv("TRANSCRIPT_SOURCES", "manual,automatic,whisper").split(",") if source.strip()]
+CAPTION_LANGUAGES = [lang.strip() for lang in os.getenv("CAPTION_LANGUAGES", "en,de").split(",") if lang.strip()]
+# Per-job audio directories, removed after transcription; stale ones are swept by the janitor.
+AUDIO_WORKSPACE_ROOT = os.getenv("AUDIO_WORKSPACE_ROOT", os.path.join(MEDIA_ROOT, 'work'))
+AUDIO_WORKSPACE_MAX_BYTES = int(os.getenv("AUDIO_WORKSPACE_MAX_BYTES", str(2 * 1024 ** 3)))
+AUDIO_WORKSPACE_MAX_AGE = int(os.getenv("AUDIO_WORKSPACE_MAX_AGE", "3600"))
+AUDIO_DECODE_IN_MEMORY = os.getenv("AUDIO_DECODE_IN_MEMORY", "False") == "True"
+QUIZ_BATCH_MAX_URLS = int(os.getenv("QUIZ_BATCH_MAX_URLS", "50"))
+QUIZ_BATCH_DOWNLOAD_WORKERS = int(os.getenv("QUIZ_BATCH_DOWNLOAD_WORKERS", "8"))
+# Whisper inference is serialized per process (see WhisperModelRegistry), so more than one
+# transcribe worker only overlaps audio decoding, it adds no CPU parallelism. Scale with
+# WHISPER_PARALLEL_WORKERS or more processes instead.
+QUIZ_BATCH_TRANSCRIBE_WORKERS = int(os.getenv("QUIZ_BATCH_TRANSCRIBE_WORKERS", "1"))
+# Jobs that may be downloaded but not yet transcribed; downloads wait for a free slot.
+QUIZ_BATCH_MAX_PENDING_AUDIO = int(os.getenv("QUIZ_BATCH_MAX_PENDING_AUDIO", "2"))
+QUIZ_BATCH_GENERATE_WORKERS = int(os.getenv("QUIZ_BATCH_GENERATE_WORKERS", "4"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "120"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "4"))
+GEMINI_RETRY_INITIAL_DELAY = float(os.getenv("GEMINI_RETRY_INITIAL_DELAY", "1"))
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "30"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+# Transcripts above the token budget are generated map-reduce style in chunks of GEMINI_CHUNK_TOKENS.
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+GEMINI_TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("GEMINI_TRANSCRIPT_TOKEN_BUDGET", "30000"))
+GEMINI_CHUNK_TOKENS = int(os.getenv("GEMINI_CHUNK_TOKENS", "8000"))
+GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "True") == "True"
+GEMINI_REPAIR_ATTEMPTS = int(os.getenv("GEMINI_REPAIR_ATTEMPTS", "2"))
+QUIZ_SERVER_TIMING = os.getenv("QUIZ_SERVER_TIMING", "True") == "True"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+QUIZ_ASYNC_VIEWS = os.getenv("QUIZ_ASYNC_VIEWS", "False") == "True"
+# Under ASGI every sync_to_async thread keeps its own persistent connection and Django
+# only closes them at request boundaries, so they pile up. Use DATABASE_POOL instead.
+if QUIZ_ASYNC_VIEWS:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+QUIZ_ASYNC_WHISPER_WORKERS = int(os.getenv("QUIZ_ASYNC_WHISPER_WORKERS", "1"))
+AUTH_STATELESS_USER = os.getenv("AUTH_STATELESS_USER", "False") == "True"
+TOKEN_BLACKLIST_FILTER = os.getenv("TOKEN_BLACKLIST_FILTER", "True") == "True"
+TOKEN_BLACKLIST_FILTER_CAPACITY = int(os.getenv("TOKEN_BLACKLIST_FILTER_CAPACITY", "10000"))
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = float(os.getenv("TOKEN_BLACKLIST_FILTER_ERROR_RATE", "0.001"))
+# Other workers accept a revoked refresh token for up to TOKEN_BLACKLIST_SYNC_INTERVAL seconds.
+TOKEN_BLACKLIST_SYNC_INTERVAL = float(os.getenv("TOKEN_BLACKLIST_SYNC_INTERVAL", "5"))
+TOKEN_BLACKLIST_REBUILD_INTERVAL = float(os.getenv("TOKEN_BLACKLIST_REBUILD_INTERVAL", "3600"))
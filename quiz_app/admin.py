@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Quiz, Question
+from .models import Quiz, Question, QuizJob
 # Register your models here.
 admin.site.register(Quiz)
-admin.site.register(Question)
\ No newline at end of file
+admin.site.register(Question)
+admin.site.register(QuizJob)
@@ -0,0 +1,100 @@
+import html
+import json
+import re
+
+SOURCE_MANUAL = "manual"
+SOURCE_AUTOMATIC = "automatic"
+SOURCE_WHISPER = "whisper"
+TRANSCRIPT_SOURCES = (SOURCE_MANUAL, SOURCE_AUTOMATIC, SOURCE_WHISPER)
+
+CAPTION_FORMATS = ("json3", "vtt")
+
+TIMESTAMP_LINE = re.compile(r"^\d{2}:\d{2}(:\d{2})?\.\d{3} --> ")
+TAG = re.compile(r"<[^>]+>")
+
+
+def _candidate_languages(info: dict, source: str, languages):
+    """
+    Return the caption languages to try, most preferred first.
+
+    Automatic captions are offered by YouTube for every language as machine
+    translations, so only the spoken language of the video is accepted there.
+    """
+    spoken = info.get("language")
+    if source == SOURCE_AUTOMATIC:
+        candidates = [f"{spoken}-orig", spoken] if spoken else []
+        candidates += [lang for lang in languages if not spoken or lang.split("-")[0] == spoken.split("-")[0]]
+        if not spoken:
+            candidates += [lang for lang in info.get("automatic_captions", {}) if lang.endswith("-orig")]
+        return candidates
+    candidates = list(languages)
+    if spoken:
+        candidates.append(spoken)
+    candidates += list(info.get("subtitles", {}))
+    return candidates
+
+
+def select_caption_track(info: dict, source: str, languages=()):
+    """
+    Pick the caption track of a yt-dlp info dict for one transcript source.
+
+    Args:
+        info (dict): Info dict returned by fetch_video_info.
+        source (str): "manual" for uploaded subtitles, "automatic" for
+            YouTube's speech recognition captions.
+        languages (list[str]): Preferred language codes.
+
+    Returns:
+        dict | None: The track ({"ext", "url", ...}) or None if no usable
+        track exists.
+    """
+    tracks = info.get("subtitles" if source == SOURCE_MANUAL else "automatic_captions") or {}
+    for language in _candidate_languages(info, source, languages):
+        formats = tracks.get(language) or []
+        for ext in CAPTION_FORMATS:
+            for track in formats:
+                if track.get("ext") == ext and track.get("url"):
+                    return track
+    return None
+
+
+def parse_json3(content: str):
+    """
+    Convert a YouTube json3 caption file into plain text.
+    """
+    data = json.loads(content)
+    parts = []
+    for event in data.get("events", []):
+        text = "".join(seg.get("utf8", "") for seg in event.get("segs") or [])
+        if text.strip():
+            parts.append(text.strip())
+    return " ".join(" ".join(parts).split())
+
+
+def parse_vtt(content: str):
+    """
+    Convert a WebVTT caption file into plain text.
+
+    Automatic captions repeat the previous line in every cue while the
+    text scrolls, so consecutive duplicate lines are dropped.
+    """
+    lines = []
+    for raw in content.splitlines():
+        line = raw.strip()
+        if not line or line == "WEBVTT" or TIMESTAMP_LINE.match(line) or line.isdigit():
+            continue
+        if line.startswith(("Kind:", "Language:", "NOTE", "STYLE")):
+            continue
+        line = html.unescape(TAG.sub("", line)).strip()
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return " ".join(" ".join(lines).split())
+
+
+def parse_caption(content: str, ext: str):
+    """
+    Convert caption file content into plain text based on its format.
+    """
+    if ext == "json3":
+        return parse_json3(content)
+    return parse_vtt(content)
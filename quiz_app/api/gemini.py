@@ -0,0 +1,193 @@
+import asyncio
+import contextlib
+import logging
+import random
+import threading
+import time
+import weakref
+import httpx
+from django.conf import settings
+from google import genai
+from google.genai import errors, types
+from .metrics import GEMINI_TOKENS
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+SLOT_POLL_INTERVAL = 0.05
+
+_client = None
+_semaphore = None
+_async_semaphores = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide Gemini client.
+
+    The client keeps its HTTP connection pool between calls, so only the
+    first request of a worker pays for the connection and TLS handshake.
+    Timeout and base URL come from settings.GEMINI_TIMEOUT and
+    settings.GEMINI_BASE_URL (e.g. a local stub server in tests).
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            http_options = types.HttpOptions(
+                timeout=int(settings.GEMINI_TIMEOUT * 1000),
+                base_url=settings.GEMINI_BASE_URL or None)
+            _client = genai.Client(api_key=settings.GEMINI_API_KEY or None, http_options=http_options)
+        return _client
+
+
+def get_semaphore():
+    """
+    Return the semaphore that caps concurrent Gemini requests of this
+    process at settings.GEMINI_MAX_CONCURRENCY. Sync and async requests
+    share it, see async_slot.
+    """
+    global _semaphore
+    with _lock:
+        if _semaphore is None:
+            _semaphore = threading.BoundedSemaphore(settings.GEMINI_MAX_CONCURRENCY)
+        return _semaphore
+
+
+def get_async_semaphore():
+    """
+    Return the asyncio semaphore of the running event loop. It queues the
+    requests of the loop, so at most settings.GEMINI_MAX_CONCURRENCY of them
+    poll for the process-wide semaphore.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if loop not in _async_semaphores:
+            _async_semaphores[loop] = asyncio.BoundedSemaphore(settings.GEMINI_MAX_CONCURRENCY)
+        return _async_semaphores[loop]
+
+
+@contextlib.asynccontextmanager
+async def async_slot():
+    """
+    Hold a slot of the process-wide semaphore from async code, so requests
+    of the event loop and of worker threads together stay under
+    settings.GEMINI_MAX_CONCURRENCY. The loop polls for a free slot every
+    SLOT_POLL_INTERVAL seconds instead of blocking, so a cancelled request
+    never takes one.
+    """
+    semaphore = get_semaphore()
+    async with get_async_semaphore():
+        while not semaphore.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+def reset_client():
+    """
+    Drop the shared client and semaphores so they are rebuilt from the
+    current settings, mainly useful for tests.
+    """
+    global _client, _semaphore
+    with _lock:
+        _client = None
+        _semaphore = None
+        _async_semaphores.clear()
+
+
+def is_retryable(exc: Exception):
+    """
+    Return True for errors that are worth another attempt: rate limits,
+    server errors, timeouts and dropped connections.
+    """
+    if isinstance(exc, errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+def backoff_delay(attempt: int):
+    """
+    Return the sleep before retry number attempt + 1, using exponential
+    backoff with full jitter so parallel workers do not retry in lockstep.
+    """
+    cap = min(settings.GEMINI_RETRY_MAX_DELAY, settings.GEMINI_RETRY_INITIAL_DELAY * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+def record_usage(response):
+    """
+    Record the prompt and output token counts reported by Gemini in the
+    quiz_gemini_tokens histogram.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    if usage.prompt_token_count is not None:
+        GEMINI_TOKENS.observe(usage.prompt_token_count, "prompt")
+    if usage.candidates_token_count is not None:
+        GEMINI_TOKENS.observe(usage.candidates_token_count, "output")
+
+
+def generate_content(contents, model: str = None, config=None):
+    """
+    Call Gemini generate_content with retries and bounded concurrency.
+
+    Behavior:
+        - Retries retryable errors up to settings.GEMINI_MAX_ATTEMPTS times
+          with jittered exponential backoff.
+        - Holds a concurrency slot only while a request is in flight, not
+          while sleeping between attempts.
+
+    Args:
+        contents: Prompt contents passed to the Gemini API.
+        model (str): Model name, defaults to settings.GEMINI_MODEL.
+        config: Optional GenerateContentConfig.
+
+    Returns:
+        GenerateContentResponse: The Gemini response.
+
+    Raises:
+        errors.APIError | httpx.HTTPError: If the last attempt fails or the
+        error is not retryable.
+    """
+    attempts = max(1, settings.GEMINI_MAX_ATTEMPTS)
+    for attempt in range(attempts):
+        try:
+            with get_semaphore():
+                response = get_client().models.generate_content(
+                    model=model or settings.GEMINI_MODEL, contents=contents, config=config)
+            record_usage(response)
+            return response
+        except Exception as exc:
+            if attempt == attempts - 1 or not is_retryable(exc):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("Gemini request failed (%s), retrying in %.1fs", exc, delay)
+            time.sleep(delay)
+
+
+async def agenerate_content(contents, model: str = None, config=None):
+    """
+    Async variant of generate_content for ASGI views.
+
+    Uses the native asyncio API of the shared client (client.aio), so a
+    waiting request holds no thread. Retries, backoff and the concurrency
+    cap behave like generate_content, the cap is shared with it.
+    """
+    attempts = max(1, settings.GEMINI_MAX_ATTEMPTS)
+    for attempt in range(attempts):
+        try:
+            async with async_slot():
+                response = await get_client().aio.models.generate_content(
+                    model=model or settings.GEMINI_MODEL, contents=contents, config=config)
+            record_usage(response)
+            return response
+        except Exception as exc:
+            if attempt == attempts - 1 or not is_retryable(exc):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("Gemini request failed (%s), retrying in %.1fs", exc, delay)
+            await asyncio.sleep(delay)
@@ -1,13 +1,83 @@
+import asyncio
+import http.cookiejar
 import json
-import yt_dlp
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import numpy as np
 import whisper
-from google import genai
-import secrets
+import yt_dlp
+from google.genai import types
 from glob import glob
 from pathlib import Path
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from .transcription import transcribe_file, transcribe_pcm
+from .result_cache import extract_video_id
+from .captions import select_caption_track, parse_caption
+from .gemini import generate_content, agenerate_content
+from .seralizers import QuestionSeralizer
+from .tokens import count_tokens, split_by_tokens
+from .metrics import span, GEMINI_TOKENS
+
+
+YDL_OPTIONS = {
+    "format": "bestaudio/best",
+    "quiet": False,
+    "noplaylist": True,
+    "cookiefile": "cookies.txt",
+    "extractor_args": {
+        "youtube": {
+            "player_client": ["default,-android_sdkless"]
+        }
+    },
+}
+
+
+@span("video_info")
+def fetch_video_info(url: str):
+    """
+    Extract the metadata and available formats of a video in a single pass.
+
+    Behavior:
+        - Runs one yt-dlp extraction without downloading anything.
+        - The returned info dict is reused for validation, format selection
+          and the download, so the page and player are only resolved once.
+        - Results are cached for settings.VIDEO_INFO_CACHE_TTL seconds per
+          video id, short enough for the signed format URLs to stay valid.
+
+    Args:
+        url (str): Video URL.
+
+    Returns:
+        dict | None:
+            - Sanitized yt-dlp info dict if the video exists.
+            - None if the video is unavailable or invalid.
+    """
+    video_id = extract_video_id(url)
+    cache_key = f"video-info:{video_id}"
+    if video_id:
+        info = cache.get(cache_key)
+        if info is not None:
+            return info
+
+    try:
+        with yt_dlp.YoutubeDL(YDL_OPTIONS) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError:
+        return None
+
+    info = yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True)
+    if video_id:
+        cache.set(cache_key, info, settings.VIDEO_INFO_CACHE_TTL)
+    return info
 
 
 def check_video(url: str):
@@ -22,55 +92,157 @@ def check_video(url: str):
             - True if the video exists and metadata can be extracted.
             - False if the video is unavailable or invalid.
     """
-    try:
-        ydl_opts = {}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-        return True
-    except yt_dlp.utils.DownloadError:
-        return False
+    return fetch_video_info(url) is not None
 
 
-def video_download(url: str):
+@span("download")
+def video_download(url: str, info: dict = None, workdir: str = None):
     """
     Download the audio stream from a video URL.
 
     Behavior:
         - Validates the video URL before downloading.
         - Downloads the best available audio format.
-        - Stores the audio file in the media directory.
+        - Stores the audio file in a directory that belongs to this job only.
+        - Reuses the info dict from fetch_video_info instead of resolving
+          the video page and formats a second time.
 
     Args:
         url (str): Video URL.
+        info (dict): Optional info dict already returned by fetch_video_info.
+        workdir (str): Job directory from audio_workspace(). Without it a new
+            directory is created below settings.AUDIO_WORKSPACE_ROOT and the
+            caller is responsible for removing it.
 
     Returns:
         str | bool:
             - Path to the downloaded audio file on success.
             - False if validation or download fails.
     """
-    udid = secrets.randbelow(1000) + 1
-    
-    audio_data = f"media/audio_{udid}."
-    URL = url
-    if check_video(url):
-        ydl_opts = {"format": "bestaudio/best","outtmpl": f"{audio_data}%(ext)s","quiet": False,"noplaylist": True, 
-                    "cookiefile": "cookies.txt",
-                "extractor_args": {
-                "youtube": {
-                "player_client": ["default,-android_sdkless"]
-            }
-        },}
+    if info is None:
+        info = fetch_video_info(url)
+    if info is None:
+        return False
+
+    if workdir is None:
+        os.makedirs(settings.AUDIO_WORKSPACE_ROOT, exist_ok=True)
+        workdir = tempfile.mkdtemp(prefix="job-", dir=settings.AUDIO_WORKSPACE_ROOT)
+    ydl_opts = {**YDL_OPTIONS, "outtmpl": os.path.join(workdir, "audio.%(ext)s")}
+    try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            error_code = ydl.download([URL])    
-            audio_files = glob(f"{audio_data}*")
-            if error_code is None or error_code == 0 :
-                return audio_files[0]
-            else:
-                 return False
-    else:
+            ydl.process_ie_result(info, download=True)
+    except yt_dlp.utils.DownloadError:
         return False
+
+    audio_files = glob(os.path.join(workdir, "audio.*"))
+    if audio_files:
+        return audio_files[0]
+    return False
+
+
+@span("decode")
+def decode_audio_stream(info: dict):
+    """
+    Decode the selected audio format straight into a 16 kHz mono PCM buffer.
+
+    Behavior:
+        - Lets ffmpeg read the media URL from the info dict and write raw
+          16-bit PCM to a pipe, so no audio file touches the disk.
+        - Returns the samples in the float32 format Whisper expects.
+
+    Args:
+        info (dict): Info dict returned by fetch_video_info.
+
+    Returns:
+        np.ndarray | None: The decoded audio, or None if the stream cannot be
+        decoded (the caller falls back to a regular download).
+    """
+    cmd = ffmpeg_decode_command(info)
+    if cmd is None:
+        return None
+    try:
+        result = subprocess.run(cmd, capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return pcm_to_float(result.stdout)
+
+
+def ffmpeg_decode_command(info: dict):
+    """
+    Return the ffmpeg command that decodes the media URL of an info dict to
+    16 kHz mono s16le PCM on stdout, or None if the info dict has no URL.
+    """
+    media_url = info.get("url")
+    if not media_url:
+        return None
+    headers = "".join(f"{key}: {value}\r\n" for key, value in (info.get("http_headers") or {}).items())
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if headers:
+        cmd += ["-headers", headers]
+    return cmd + ["-i", media_url, "-f", "s16le", "-ac", "1", "-ar", str(whisper.audio.SAMPLE_RATE), "-"]
+
+
+def pcm_to_float(pcm: bytes):
+    """
+    Convert s16le PCM bytes to the float32 samples Whisper expects, or None
+    if there are no samples.
+    """
+    if not pcm:
+        return None
+    return np.frombuffer(pcm, np.int16).flatten().astype(np.float32) / 32768.0
     
 
+def fetch_caption(track: dict):
+    """
+    Download the content of a caption track through yt-dlp, so cookies and
+    headers match the ones used for the extraction.
+
+    Args:
+        track (dict): Caption track from select_caption_track.
+
+    Returns:
+        str | None: Raw caption file content, or None if it cannot be fetched.
+    """
+    try:
+        with yt_dlp.YoutubeDL(YDL_OPTIONS) as ydl:
+            return ydl.urlopen(track["url"]).read().decode("utf-8")
+    except Exception:
+        return None
+
+
+@span("captions")
+def caption_transcript(info: dict, source: str, languages=()):
+    """
+    Build a transcript from the captions that YouTube already provides.
+
+    Args:
+        info (dict): Info dict returned by fetch_video_info.
+        source (str): "manual" or "automatic".
+        languages (list[str]): Preferred caption languages.
+
+    Returns:
+        str | None: Caption text, or None if no usable track exists.
+    """
+    track = select_caption_track(info, source, languages)
+    if track is None:
+        return None
+    return caption_text(track, fetch_caption(track))
+
+
+def caption_text(track: dict, content: str):
+    """
+    Parse fetched caption content, returning None if it is empty or cannot
+    be parsed.
+    """
+    if not content:
+        return None
+    try:
+        text = parse_caption(content, track.get("ext"))
+    except ValueError:
+        return None
+    return text or None
+
+
 def check_url_format(url: str):
     """
     Validate a YouTube URL.
@@ -78,30 +250,57 @@ def check_url_format(url: str):
     Args:
         url (str): YouTube URL to validate.
 
-    Raises:
-        ValidationError: If the URL is missing or invalid.
+    Returns:
+        Response | None: 400 response if the URL is missing, not a string
+        or invalid, None otherwise.
     """
     if url is None:
              return Response({'detail': "url is missing"}, status=status.HTTP_400_BAD_REQUEST )
 
+    if not isinstance(url, str):
+           return Response({'detail': "url must be a string"}, status=status.HTTP_400_BAD_REQUEST )
+
     if not url.startswith('https://www.youtube.com/watch?v='):
            return Response({'detail': "The entered URL is incorrect. The URL must begin with https://www.youtube.com/watch?v="}, status=status.HTTP_400_BAD_REQUEST )
 
 
-def transcripts_Audio_to_Text(audio:str):
+def check_whisper_profile(profile):
+    """
+    Validate the optional Whisper inference profile of a request.
+
+    Returns:
+        Response | None: 400 response for an unknown profile, None otherwise.
+    """
+    if profile is None:
+        return None
+    if not isinstance(profile, str) or profile not in settings.WHISPER_PROFILES:
+        choices = ", ".join(settings.WHISPER_PROFILES)
+        return Response({'detail': f"Unknown whisper_profile, use one of: {choices}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+
+@span("whisper")
+def transcripts_Audio_to_Text(audio, profile: str = None):
     """
     Transcribe an audio file into text using OpenAI Whisper.
 
+    The Whisper model is kept resident per worker process, see
+    quiz_app.api.transcription.WhisperModelRegistry.
+
     Args:
-        audio (str): Path to the audio file.
+        audio (str | np.ndarray): Path to the audio file, or 16 kHz mono
+            samples from decode_audio_stream.
+        profile (str): Whisper inference profile, defaults to
+            settings.WHISPER_PROFILE.
 
     Returns:
         str: Transcribed text extracted from the audio.
     """
 
-    model = whisper.load_model("base")
+    if isinstance(audio, np.ndarray):
+        return transcribe_pcm(audio, profile=profile)["text"]
     audio_path = str(Path(audio))
-    result = model.transcribe(audio_path)
+    result = transcribe_file(audio_path, profile=profile)
     return result["text"]
 
 
@@ -141,14 +340,181 @@ Requirements:
 - No explanations, no code fences.
 """ 
 
+def mining_Text(part: int, parts: int, questions: int):
+    """
+    Generate the prompt instructions for mining candidate questions from
+    one part of a long transcript.
+
+    Args:
+        part (int): 1-based number of the transcript part.
+        parts (int): Total number of parts.
+        questions (int): Number of candidate questions to request.
+
+    Returns:
+        str: Prompt text sent to the AI model before the transcript part.
+    """
+
+    return f"""
+You receive part {part} of {parts} of a longer video transcript.
+
+Return this exact structure:
+
+{{
+  "summary": "Summarize this part in no more than 2 sentences.",
+  "questions": [
+    {{
+      "question_title": "The question goes here.",
+      "question_options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "The correct answer from the above options"
+    }}
+  ]
+}}
+
+Requirements:
+- exactly {questions} questions about the content of this part
+- Each question must have exactly 4 distinct answer options.
+- Only one correct answer is allowed per question.
+- The output must be valid JSON.
+- No explanations, no code fences.
+
+Transcript part:
+"""
+
+
+def reduce_Text(summaries, candidates):
+    """
+    Generate the prompt that assembles the final quiz from the summaries and
+    candidate questions of all transcript parts.
+
+    Returns:
+        str: Prompt text sent to the AI model.
+    """
+
+    parts = "\n".join(f"{number}. {summary}" for number, summary in enumerate(summaries, start=1))
+    return promted_Text() + f"""
+The transcript was too long to send at once. Below are summaries of its parts in order and
+candidate questions mined from them. Select or rewrite exactly 10 questions that cover the
+whole video evenly. Base title and description on all parts.
+
+Part summaries:
+{parts}
+
+Candidate questions:
+{json.dumps(candidates, ensure_ascii=False)}
+"""
+
+
+QUESTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "question_title": {"type": "STRING"},
+        "question_options": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "answer": {"type": "STRING"},
+    },
+    "required": ["question_title", "question_options", "answer"],
+}
+
+QUIZ_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "description": {"type": "STRING"},
+        "questions": {"type": "ARRAY", "items": QUESTION_SCHEMA},
+    },
+    "required": ["title", "description", "questions"],
+}
+
+MINING_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "questions": {"type": "ARRAY", "items": QUESTION_SCHEMA},
+    },
+    "required": ["summary", "questions"],
+}
+
+QUESTIONS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "questions": {"type": "ARRAY", "items": QUESTION_SCHEMA},
+    },
+    "required": ["questions"],
+}
+
+CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+
+def json_config(schema: dict):
+    """
+    Return the generation config that makes Gemini answer with JSON matching
+    the schema, or None if settings.GEMINI_STRUCTURED_OUTPUT is disabled.
+    """
+    if not settings.GEMINI_STRUCTURED_OUTPUT:
+        return None
+    return types.GenerateContentConfig(response_mime_type="application/json", response_schema=schema)
+
+
+def parse_quiz_response(text: str):
+    """
+    Parse the JSON text returned by the AI model.
+
+    Behavior:
+        - Strips Markdown code fences and any text around the outermost
+          JSON object.
+        - Accepts raw line breaks inside strings.
+
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON.
+    """
+    text = CODE_FENCE.sub("", (text or "").strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    return json.loads(text, strict=False)
+
+
+def generate_json(prompt: str, schema: dict):
+    """
+    Ask the AI model for JSON and parse it, asking again if the response
+    cannot be parsed.
+
+    Args:
+        prompt (str): Full prompt text.
+        schema (dict): Response schema for structured output.
+
+    Returns:
+        dict: The parsed response.
+
+    Raises:
+        json.JSONDecodeError: If no response within settings.GEMINI_REPAIR_ATTEMPTS
+        extra attempts is valid JSON.
+    """
+    for attempt in range(settings.GEMINI_REPAIR_ATTEMPTS + 1):
+        response = generate_content(prompt, config=json_config(schema))
+        try:
+            data = parse_quiz_response(response.text)
+        except json.JSONDecodeError:
+            if attempt == settings.GEMINI_REPAIR_ATTEMPTS:
+                raise
+            continue
+        if isinstance(data, dict):
+            return data
+    raise json.JSONDecodeError("Response is not a JSON object", response.text or "", 0)
+
+
+@span("gemini")
 def create_Quiz_with_GeminiAPI(transcript):
     """
     Generate a quiz from a transcript using the Gemini AI API.
 
     Behavior:
-        - Sends transcript text with strict prompt instructions.
-        - Receives AI-generated quiz data in JSON format.
-        - Parses and returns the JSON as a Python dictionary.
+        - Sends transcript text with strict prompt instructions through the
+          shared, retrying client in quiz_app.api.gemini.
+        - Asks for structured JSON output that follows QUIZ_SCHEMA.
+        - Transcripts above settings.GEMINI_TRANSCRIPT_TOKEN_BUDGET tokens
+          are generated map-reduce style, see create_Quiz_map_reduce.
+        - Regenerates only the questions that fail validation, see
+          repair_questions.
 
     Args:
         transcript (str): Transcribed text from the video audio.
@@ -159,11 +525,347 @@ def create_Quiz_with_GeminiAPI(transcript):
     Raises:
         json.JSONDecodeError: If the AI response is not valid JSON.
     """
-    client = genai.Client()
-    prompt_text = promted_Text()
-    response = client.models.generate_content(
-    model="gemini-3-flash-preview",
-    contents=prompt_text+transcript,)
-    prompt = response.text.replace("\n", " ").strip()
-    data = json.loads(prompt)
+    transcript_tokens = count_tokens(transcript)
+    GEMINI_TOKENS.observe(transcript_tokens, "transcript")
+    if transcript_tokens > settings.GEMINI_TRANSCRIPT_TOKEN_BUDGET:
+        data, context = create_Quiz_map_reduce(transcript)
+    else:
+        prompt_text = promted_Text()
+        data = generate_json(prompt_text+transcript, QUIZ_SCHEMA)
+        context = transcript
+    return repair_questions(data, context)
+
+
+def question_is_valid(question):
+    """
+    Return True if a generated question has four distinct options and
+    passes QuestionSeralizer validation.
+    """
+    if not isinstance(question, dict):
+        return False
+    options = question.get("question_options")
+    if not isinstance(options, list) or len(set(map(str, options))) != 4:
+        return False
+    return QuestionSeralizer(data=question).is_valid()
+
+
+def replacement_Text(count: int, existing_titles):
+    """
+    Generate the prompt instructions for replacing invalid questions.
+
+    Returns:
+        str: Prompt text sent to the AI model before the transcript.
+    """
+
+    return f"""
+Write {count} new quiz questions about the transcript below.
+Do not repeat any of these existing questions: {json.dumps(existing_titles, ensure_ascii=False)}
+
+Return this exact structure:
+
+{{
+  "questions": [
+    {{
+      "question_title": "The question goes here.",
+      "question_options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "The correct answer from the above options"
+    }}
+  ]
+}}
+
+Requirements:
+- exactly {count} questions
+- Each question must have exactly 4 distinct answer options.
+- The answer must be copied exactly from the answer options.
+- The output must be valid JSON.
+- No explanations, no code fences.
+
+Transcript:
+"""
+
+
+def repair_questions(data: dict, context: str):
+    """
+    Keep the valid questions of a generated quiz and regenerate only the
+    invalid or missing ones.
+
+    Behavior:
+        - Drops questions that fail QuestionSeralizer validation (e.g. an
+          answer that is not one of the options) and duplicates.
+        - Asks for exactly the number of missing questions, up to
+          settings.GEMINI_REPAIR_ATTEMPTS times.
+        - Returns the valid questions found if the attempts run out, so one
+          bad question does not fail the whole quiz.
+
+    Args:
+        data (dict): Parsed quiz data.
+        context (str): Transcript (or part summaries) the questions are based on.
+
+    Returns:
+        dict: Quiz data with at most 10 valid questions.
+    """
+    candidates = data.get("questions") or []
+    valid = []
+    for attempt in range(settings.GEMINI_REPAIR_ATTEMPTS + 1):
+        titles = add_valid_questions(valid, candidates)
+        missing = 10 - len(valid)
+        if missing <= 0 or attempt == settings.GEMINI_REPAIR_ATTEMPTS:
+            break
+        try:
+            candidates = generate_json(replacement_Text(missing, sorted(titles)) + context, QUESTIONS_SCHEMA).get("questions") or []
+        except json.JSONDecodeError:
+            candidates = []
+    data["questions"] = valid[:10]
+    return data
+
+
+def add_valid_questions(valid: list, candidates):
+    """
+    Append the valid candidates whose title is not taken yet to valid.
+
+    Returns:
+        set[str]: Titles of all valid questions.
+    """
+    titles = {question["question_title"] for question in valid}
+    for question in candidates:
+        if question_is_valid(question) and question["question_title"] not in titles:
+            valid.append(question)
+            titles.add(question["question_title"])
+    return titles
+
+
+def mine_transcript_part(part: int, parts: int, text: str, questions: int):
+    """
+    Ask the AI model for a summary and candidate questions of one part.
+
+    Returns:
+        dict | None: {"summary": str, "questions": list}, or None if the
+        response is not valid JSON.
+    """
+    try:
+        return generate_json(mining_Text(part, parts, questions) + text, MINING_SCHEMA)
+    except json.JSONDecodeError:
+        return None
+
+
+def create_Quiz_map_reduce(transcript: str):
+    """
+    Generate a quiz from a transcript that is too long for a single prompt.
+
+    Steps:
+        1. Split the transcript into parts of settings.GEMINI_CHUNK_TOKENS tokens.
+        2. Map: summarize every part and mine candidate questions from it,
+           with up to settings.GEMINI_MAX_CONCURRENCY parts in parallel.
+        3. Reduce: one final call assembles title, description and exactly
+           10 questions from the summaries and candidates.
+
+    Prompt size, latency and cost stay flat no matter how long the video is,
+    because no single call sees more than one part or the reduced material.
+
+    Returns:
+        tuple[dict, str]: Parsed quiz data and the joined part summaries,
+        which serve as context for repair_questions.
+
+    Raises:
+        json.JSONDecodeError: If the final AI response is not valid JSON.
+        ValueError: If no part could be mined.
+    """
+    parts = split_by_tokens(transcript, settings.GEMINI_CHUNK_TOKENS)
+    per_part = max(2, -(-20 // len(parts)))
+    with ThreadPoolExecutor(max_workers=max(1, min(len(parts), settings.GEMINI_MAX_CONCURRENCY))) as pool:
+        mined = list(pool.map(
+            lambda item: mine_transcript_part(item[0], len(parts), item[1], per_part),
+            enumerate(parts, start=1)))
+
+    summaries, candidates = combine_mined_parts(mined)
+    data = generate_json(reduce_Text(summaries, candidates), QUIZ_SCHEMA)
+    data["questions"] = data.get("questions", [])[:10]
+    return data, "\n".join(summaries)
+
+
+def combine_mined_parts(mined):
+    """
+    Collect the summaries and candidate questions of the mined parts.
+
+    Raises:
+        ValueError: If no part could be mined.
+    """
+    mined = [data for data in mined if data]
+    if not mined:
+        raise ValueError("No transcript part could be summarized")
+    summaries = [data.get("summary", "") for data in mined]
+    candidates = [question for data in mined for question in data.get("questions", [])]
+    return summaries, candidates
+
+
+# Async variants used by the ASGI views. Network-bound stages are awaited
+# natively where the library allows it; yt-dlp has no asyncio API and runs
+# in a worker thread instead.
+
+async def afetch_video_info(url: str):
+    """
+    Async variant of fetch_video_info. The yt-dlp extraction runs in a
+    worker thread, see sync_to_async.
+    """
+    return await sync_to_async(fetch_video_info, thread_sensitive=False)(url)
+
+
+async def avideo_download(url: str, info: dict = None, workdir: str = None):
+    """
+    Async variant of video_download. The yt-dlp download runs in a worker
+    thread, see sync_to_async.
+    """
+    return await sync_to_async(video_download, thread_sensitive=False)(url, info=info, workdir=workdir)
+
+
+async def adecode_audio_stream(info: dict):
+    """
+    Async variant of decode_audio_stream that awaits the ffmpeg subprocess
+    instead of blocking a thread on it.
+    """
+    cmd = ffmpeg_decode_command(info)
+    if cmd is None:
+        return None
+    with span("decode"):
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except OSError:
+            return None
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            return None
+        return pcm_to_float(stdout)
+
+
+def load_cookie_jar(path: str = None):
+    """
+    Load the yt-dlp cookie file (Netscape format) for plain HTTP clients.
+    An expiry of 0 marks a session cookie, as in yt-dlp.
+
+    Args:
+        path (str): Cookie file, defaults to YDL_OPTIONS["cookiefile"].
+
+    Returns:
+        http.cookiejar.MozillaCookieJar: The cookies, empty if the file is
+        missing or unreadable.
+    """
+    path = path or YDL_OPTIONS.get("cookiefile")
+    jar = http.cookiejar.MozillaCookieJar()
+    if path and os.path.exists(path):
+        try:
+            jar.load(path, ignore_discard=True, ignore_expires=True)
+        except (OSError, http.cookiejar.LoadError):
+            pass
+    for cookie in jar:
+        if cookie.expires == 0:
+            cookie.expires, cookie.discard = None, True
+    return jar
+
+
+async def afetch_caption(track: dict, headers: dict = None):
+    """
+    Async variant of fetch_caption using an httpx.AsyncClient with the
+    request headers of the info dict and the cookies of the yt-dlp cookie
+    file, like fetch_caption.
+    """
+    cookies = await asyncio.to_thread(load_cookie_jar)
+    try:
+        async with httpx.AsyncClient(headers=headers or {}, cookies=cookies, timeout=30,
+                                     follow_redirects=True) as client:
+            response = await client.get(track["url"])
+            response.raise_for_status()
+            return response.text
+    except httpx.HTTPError:
+        return None
+
+
+async def acaption_transcript(info: dict, source: str, languages=()):
+    """
+    Async variant of caption_transcript.
+    """
+    track = select_caption_track(info, source, languages)
+    if track is None:
+        return None
+    with span("captions"):
+        return caption_text(track, await afetch_caption(track, info.get("http_headers")))
+
+
+async def agenerate_json(prompt: str, schema: dict):
+    """
+    Async variant of generate_json.
+    """
+    for attempt in range(settings.GEMINI_REPAIR_ATTEMPTS + 1):
+        response = await agenerate_content(prompt, config=json_config(schema))
+        try:
+            data = parse_quiz_response(response.text)
+        except json.JSONDecodeError:
+            if attempt == settings.GEMINI_REPAIR_ATTEMPTS:
+                raise
+            continue
+        if isinstance(data, dict):
+            return data
+    raise json.JSONDecodeError("Response is not a JSON object", response.text or "", 0)
+
+
+async def acreate_Quiz_with_GeminiAPI(transcript):
+    """
+    Async variant of create_Quiz_with_GeminiAPI. Parts of long transcripts
+    are mined concurrently on the event loop instead of a thread pool.
+    """
+    with span("gemini"):
+        transcript_tokens = count_tokens(transcript)
+        GEMINI_TOKENS.observe(transcript_tokens, "transcript")
+        if transcript_tokens > settings.GEMINI_TRANSCRIPT_TOKEN_BUDGET:
+            data, context = await acreate_Quiz_map_reduce(transcript)
+        else:
+            data = await agenerate_json(promted_Text()+transcript, QUIZ_SCHEMA)
+            context = transcript
+        return await arepair_questions(data, context)
+
+
+async def arepair_questions(data: dict, context: str):
+    """
+    Async variant of repair_questions.
+    """
+    candidates = data.get("questions") or []
+    valid = []
+    for attempt in range(settings.GEMINI_REPAIR_ATTEMPTS + 1):
+        titles = add_valid_questions(valid, candidates)
+        missing = 10 - len(valid)
+        if missing <= 0 or attempt == settings.GEMINI_REPAIR_ATTEMPTS:
+            break
+        try:
+            response = await agenerate_json(replacement_Text(missing, sorted(titles)) + context, QUESTIONS_SCHEMA)
+            candidates = response.get("questions") or []
+        except json.JSONDecodeError:
+            candidates = []
+    data["questions"] = valid[:10]
     return data
+
+
+async def amine_transcript_part(part: int, parts: int, text: str, questions: int):
+    """
+    Async variant of mine_transcript_part.
+    """
+    try:
+        return await agenerate_json(mining_Text(part, parts, questions) + text, MINING_SCHEMA)
+    except json.JSONDecodeError:
+        return None
+
+
+async def acreate_Quiz_map_reduce(transcript: str):
+    """
+    Async variant of create_Quiz_map_reduce. All parts are requested at once;
+    the per-loop semaphore in agenerate_content keeps at most
+    settings.GEMINI_MAX_CONCURRENCY of them in flight.
+    """
+    parts = split_by_tokens(transcript, settings.GEMINI_CHUNK_TOKENS)
+    per_part = max(2, -(-20 // len(parts)))
+    mined = await asyncio.gather(*(
+        amine_transcript_part(part, len(parts), text, per_part) for part, text in enumerate(parts, start=1)))
+
+    summaries, candidates = combine_mined_parts(mined)
+    data = await agenerate_json(reduce_Text(summaries, candidates), QUIZ_SCHEMA)
+    data["questions"] = data.get("questions", [])[:10]
+    return data, "\n".join(summaries)
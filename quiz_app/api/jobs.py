@@ -0,0 +1,272 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from quiz_app.models import QuizJob
+from .pipeline import generate_quiz, clone_cached_quiz, prepare_video, transcribe_video, generate_from_transcript
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the process-wide worker pool that runs queued quiz jobs.
+
+    The pool is created lazily with settings.QUIZ_JOB_WORKERS threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.QUIZ_JOB_WORKERS, thread_name_prefix="quiz-job")
+        return _executor
+
+
+def enqueue_job(job: QuizJob):
+    """
+    Hand a queued job to the local worker pool once the surrounding
+    transaction has committed.
+
+    Args:
+        job (QuizJob): The job to run.
+    """
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+
+
+def claim_job(job_id: int):
+    """
+    Atomically move a queued job into the first pipeline stage.
+
+    Returns:
+        bool: True if this caller owns the job now, False if it was already
+        claimed by another worker.
+    """
+    claimed = QuizJob.objects.filter(pk=job_id, status=QuizJob.STATUS_QUEUED).update(
+        status=QuizJob.STATUS_DOWNLOADING, started_at=timezone.now(), updated_at=timezone.now())
+    return claimed == 1
+
+
+def _stage_updater(job_id: int):
+    def on_stage(stage):
+        QuizJob.objects.filter(pk=job_id).update(status=stage, updated_at=timezone.now())
+    return on_stage
+
+
+def _fail_job(job_id: int, exc: Exception):
+    logger.exception("Quiz job %s failed", job_id, exc_info=exc)
+    QuizJob.objects.filter(pk=job_id).update(
+        status=QuizJob.STATUS_FAILED, error=str(exc) or exc.__class__.__name__,
+        finished_at=timezone.now(), updated_at=timezone.now())
+
+
+def _finish_job(job_id: int, quiz):
+    QuizJob.objects.filter(pk=job_id).update(
+        status=QuizJob.STATUS_DONE, quiz=quiz, finished_at=timezone.now(), updated_at=timezone.now())
+
+
+def run_job(job_id: int):
+    """
+    Run the quiz pipeline for one job and record its progress.
+
+    Behavior:
+        - Skips jobs that are no longer queued.
+        - Updates the job status before every pipeline stage.
+        - Stores the created quiz on success or the error message on failure.
+    """
+    try:
+        if not claim_job(job_id):
+            return
+        job = QuizJob.objects.select_related('user').get(pk=job_id)
+        try:
+            quiz = generate_quiz(job.video_url, job.user, on_stage=_stage_updater(job_id),
+                                 whisper_profile=job.whisper_profile or None)
+        except Exception as exc:
+            _fail_job(job_id, exc)
+            return
+        _finish_job(job_id, quiz)
+    finally:
+        close_old_connections()
+
+
+_stage_pools = {}
+_stage_pools_lock = threading.Lock()
+
+STAGE_POOL_SIZES = {
+    "download": "QUIZ_BATCH_DOWNLOAD_WORKERS",
+    "transcribe": "QUIZ_BATCH_TRANSCRIBE_WORKERS",
+    "generate": "QUIZ_BATCH_GENERATE_WORKERS",
+}
+
+
+_audio_slots = None
+
+
+def get_audio_slots():
+    """
+    Return the semaphore that bounds how many batch jobs may be between the
+    start of their download and the end of their transcription.
+
+    Downloads are much faster than Whisper, so without it a large batch
+    would download every audio file up front, fill the audio workspace and
+    keep files waiting longer than AUDIO_WORKSPACE_MAX_AGE. Sized by
+    settings.QUIZ_BATCH_MAX_PENDING_AUDIO.
+    """
+    global _audio_slots
+    with _stage_pools_lock:
+        if _audio_slots is None:
+            _audio_slots = threading.BoundedSemaphore(settings.QUIZ_BATCH_MAX_PENDING_AUDIO)
+        return _audio_slots
+
+
+def get_stage_pool(name: str):
+    """
+    Return the worker pool of one batch pipeline stage.
+
+    Each stage has its own pool sized by the matching setting, so downloads
+    (I/O-bound), Whisper (CPU-bound) and Gemini calls (network-bound, quota
+    limited) run concurrently without starving each other.
+    """
+    with _stage_pools_lock:
+        if name not in _stage_pools:
+            _stage_pools[name] = ThreadPoolExecutor(
+                max_workers=getattr(settings, STAGE_POOL_SIZES[name]), thread_name_prefix=f"quiz-{name}")
+        return _stage_pools[name]
+
+
+def _run_stage(job_id: int, work, next_stage=None):
+    """
+    Run one stage of a batch job and hand its result to the next stage.
+    Failures are recorded on the job and end its pipeline.
+    """
+    try:
+        try:
+            result = work()
+        except Exception as exc:
+            _fail_job(job_id, exc)
+            return None
+        if next_stage is not None:
+            return next_stage(result)
+        return result
+    finally:
+        close_old_connections()
+
+
+def _download_stage(job_id: int):
+    slots = get_audio_slots()
+    on_stage = _stage_updater(job_id)
+    handed_over = False
+    job = None
+
+    def work():
+        cached_quiz = clone_cached_quiz(job.video_url, job.user, job.whisper_profile or None)
+        if cached_quiz is not None:
+            _finish_job(job_id, cached_quiz)
+            return None
+        return prepare_video(job.video_url, on_stage, job.whisper_profile or None)
+
+    def next_stage(prepared):
+        nonlocal handed_over
+        if prepared is not None:
+            get_stage_pool("transcribe").submit(_transcribe_stage, job, prepared, on_stage)
+            handed_over = True
+
+    slots.acquire()
+    try:
+        if not claim_job(job_id):
+            close_old_connections()
+            return
+        job = QuizJob.objects.select_related('user').get(pk=job_id)
+        _run_stage(job_id, work, next_stage)
+    finally:
+        if not handed_over:
+            slots.release()
+
+
+def _transcribe_stage(job, prepared, on_stage):
+    try:
+        _run_stage(job.pk, lambda: transcribe_video(prepared, on_stage),
+                   lambda prepared: get_stage_pool("generate").submit(_generate_stage, job, prepared, on_stage))
+    finally:
+        get_audio_slots().release()
+
+
+def _generate_stage(job, prepared, on_stage):
+    _run_stage(job.pk, lambda: generate_from_transcript(prepared, job.user, on_stage),
+               lambda quiz: _finish_job(job.pk, quiz))
+
+
+def run_batch(job_ids):
+    """
+    Feed a batch of queued jobs through the staged pipeline.
+
+    Every job moves download -> transcribe -> generate on its own, so while
+    one video is transcribed the next ones are already downloading and
+    earlier ones are already at Gemini. Throughput is bounded by the slowest
+    stage instead of the sum of all stages. At most
+    settings.QUIZ_BATCH_MAX_PENDING_AUDIO jobs are downloaded ahead of
+    Whisper, see get_audio_slots.
+
+    Args:
+        job_ids (list[int]): Queued jobs to run.
+    """
+    pool = get_stage_pool("download")
+    for job_id in job_ids:
+        pool.submit(_download_stage, job_id)
+
+
+def enqueue_batch(job_ids):
+    """
+    Start a batch once the surrounding transaction has committed.
+    """
+    job_ids = list(job_ids)
+    transaction.on_commit(lambda: run_batch(job_ids))
+
+
+IN_PROGRESS_STATUSES = (QuizJob.STATUS_DOWNLOADING, QuizJob.STATUS_TRANSCRIBING, QuizJob.STATUS_GENERATING)
+
+
+def requeue_stale_jobs(max_age: float = None):
+    """
+    Put jobs back into the queue whose worker died mid-pipeline.
+
+    A job counts as stale if it is in a pipeline stage and its status has
+    not changed for max_age seconds. Run this at startup, before
+    drain_queue, see the run_quiz_jobs command.
+
+    Args:
+        max_age (float): Seconds without progress, defaults to
+            settings.QUIZ_JOB_STALE_SECONDS. Keep it above the longest
+            expected stage, a live job would otherwise run twice.
+
+    Returns:
+        int: Number of jobs that were queued again.
+    """
+    max_age = settings.QUIZ_JOB_STALE_SECONDS if max_age is None else max_age
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    return QuizJob.objects.filter(status__in=IN_PROGRESS_STATUSES, updated_at__lt=cutoff).update(
+        status=QuizJob.STATUS_QUEUED, started_at=None, updated_at=timezone.now())
+
+
+def drain_queue(limit: int = None):
+    """
+    Run every queued job, oldest first, in the current process.
+
+    Args:
+        limit (int): Optional maximum number of jobs to run.
+
+    Returns:
+        int: Number of jobs that were picked up.
+    """
+    job_ids = QuizJob.objects.filter(status=QuizJob.STATUS_QUEUED).order_by('created_at').values_list('pk', flat=True)
+    if limit is not None:
+        job_ids = job_ids[:limit]
+    job_ids = list(job_ids)
+    futures = [get_executor().submit(run_job, job_id) for job_id in job_ids]
+    for future in futures:
+        future.result()
+    return len(job_ids)
@@ -0,0 +1,183 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+AUDIO_BUCKETS = (30, 60, 120, 300, 600, 900, 1800, 3600, 7200)
+CHARACTER_BUCKETS = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+SILENCE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800)
+REALTIME_FACTOR_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+TOKEN_BUCKETS = (250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000, 250000)
+
+_request_spans = contextvars.ContextVar("quiz_request_spans", default=None)
+
+
+class Histogram:
+    """
+    Thread-safe cumulative histogram in the Prometheus data model.
+
+    Observations are kept per value of one optional label (e.g. the pipeline
+    stage), so a single metric can describe every stage.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets, label: str = None):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.label = label
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str = ""):
+        """
+        Record one observation.
+
+        Args:
+            value (float): Observed value.
+            label_value (str): Value of the histogram label, if it has one.
+        """
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self):
+        """
+        Return {label_value: {"buckets": [...], "sum": float, "count": int}}
+        with non-cumulative bucket counts.
+        """
+        with self._lock:
+            return {key: {"buckets": list(value["buckets"]), "sum": value["sum"], "count": value["count"]}
+                    for key, value in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """
+        Return the histogram in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_value, series in sorted(self.snapshot().items()):
+            labels = f'{self.label}="{_escape(label_value)}"' if self.label else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["buckets"]):
+                cumulative += count
+                lines.append(self._bucket_line(labels, _format(bound), cumulative))
+            lines.append(self._bucket_line(labels, "+Inf", series["count"]))
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {_format(series['sum'])}")
+            lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return "\n".join(lines)
+
+    def _bucket_line(self, labels: str, bound: str, count: int):
+        bucket_labels = ",".join(part for part in (labels, f'le="{bound}"') if part)
+        return f"{self.name}_bucket{{{bucket_labels}}} {count}"
+
+
+def _escape(value: str):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value: float):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+STAGE_SECONDS = Histogram(
+    "quiz_stage_duration_seconds", "Duration of one quiz pipeline stage.", DURATION_BUCKETS, label="stage")
+AUDIO_SECONDS = Histogram(
+    "quiz_audio_duration_seconds", "Duration of the processed videos.", AUDIO_BUCKETS)
+TRANSCRIPT_CHARACTERS = Histogram(
+    "quiz_transcript_characters", "Length of the transcripts sent to Gemini.", CHARACTER_BUCKETS, label="source")
+GEMINI_TOKENS = Histogram(
+    "quiz_gemini_tokens", "Tokens per transcript and per Gemini request.", TOKEN_BUCKETS, label="kind")
+WHISPER_REALTIME_FACTOR = Histogram(
+    "quiz_whisper_realtime_factor", "Whisper processing time divided by the audio duration.",
+    REALTIME_FACTOR_BUCKETS, label="profile")
+VAD_REMOVED_SECONDS = Histogram(
+    "quiz_vad_removed_seconds", "Seconds of non-speech audio cut before transcription.", SILENCE_BUCKETS)
+
+HISTOGRAMS = (STAGE_SECONDS, AUDIO_SECONDS, TRANSCRIPT_CHARACTERS, GEMINI_TOKENS, WHISPER_REALTIME_FACTOR,
+              VAD_REMOVED_SECONDS)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a pipeline stage.
+
+    Behavior:
+        - Records the duration in the quiz_stage_duration_seconds histogram.
+        - Writes one structured log line with the stage and its duration.
+        - Adds the duration to the Server-Timing header of the current
+          request, see quiz_app.middleware.ServerTimingMiddleware.
+        - Also works as a decorator, e.g. @span("download").
+
+    Args:
+        stage (str): Stage name, used as histogram label and Server-Timing metric.
+    """
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage)
+        logger.info("span stage=%s duration_ms=%.1f failed=%s", stage, duration * 1000, failed,
+                    extra={"stage": stage, "duration_ms": round(duration * 1000, 1), "failed": failed})
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, duration))
+
+
+def start_request():
+    """
+    Start collecting spans for the current request.
+
+    Returns:
+        contextvars.Token: Pass to finish_request to stop collecting.
+    """
+    return _request_spans.set([])
+
+
+def finish_request(token):
+    """
+    Stop collecting spans and return them as [(stage, seconds, calls)],
+    summed per stage in the order the stages first ran.
+    """
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    totals = {}
+    for stage, duration in spans:
+        seconds, calls = totals.get(stage, (0.0, 0))
+        totals[stage] = (seconds + duration, calls + 1)
+    return [(stage, seconds, calls) for stage, (seconds, calls) in totals.items()]
+
+
+def render_metrics():
+    """
+    Return all histograms of this process in the Prometheus text format.
+    """
+    return "\n".join(histogram.render() for histogram in HISTOGRAMS) + "\n"
+
+
+def reset_metrics():
+    """
+    Clear all histograms of this process, mainly useful for tests.
+    """
+    for histogram in HISTOGRAMS:
+        histogram.reset()
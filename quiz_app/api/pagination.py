@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class QuizCursorPagination(CursorPagination):
+    """
+    Keyset pagination for quiz lists, newest quiz first.
+
+    Pages are addressed by an opaque cursor on (created_at, id) instead of an
+    offset, so every page costs the same index range scan no matter how deep
+    the client pages. The id breaks ties between quizzes created in the same
+    instant.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
@@ -1,3 +1,5 @@
+import hmac
+from django.conf import settings
 from rest_framework.permissions import BasePermission
 
 
@@ -19,4 +21,16 @@ class isOwnerFromTheQuiz(BasePermission):
         return request.user and request.user.is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
+
+
+class HasMetricsToken(BasePermission):
+    """
+    Allow requests that send settings.METRICS_TOKEN as bearer token, so a
+    Prometheus scraper can read the metrics without a user session.
+    Denies everything while no token is configured.
+    """
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        header = request.headers.get("Authorization", "")
+        return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
@@ -0,0 +1,357 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from quiz_app.models import Question
+from .seralizers import QuizSerializer, QuestionSeralizer
+from .snapshots import refresh_snapshot
+from .helper import (fetch_video_info, caption_transcript, video_download, decode_audio_stream,
+                     transcripts_Audio_to_Text, create_Quiz_with_GeminiAPI,
+                     afetch_video_info, acaption_transcript, avideo_download, adecode_audio_stream,
+                     acreate_Quiz_with_GeminiAPI)
+from .captions import SOURCE_MANUAL, SOURCE_AUTOMATIC, SOURCE_WHISPER
+from .workspace import audio_workspace, WorkspaceFullError
+from .result_cache import extract_video_id, get_cached_result, store_result
+from .metrics import span, AUDIO_SECONDS, TRANSCRIPT_CHARACTERS
+
+
+class QuizPipelineError(Exception):
+    """
+    Raised when a stage of the quiz pipeline cannot produce its result.
+    """
+
+
+STAGE_DOWNLOADING = "downloading"
+STAGE_TRANSCRIBING = "transcribing"
+STAGE_GENERATING = "generating"
+
+
+class PreparedVideo:
+    """
+    Result of the I/O stage of the pipeline for one video.
+
+    Holds either the transcript taken from captions or the audio that still
+    has to be transcribed, plus the job directory that keeps the audio file
+    alive until transcription has finished, and the Whisper inference
+    profile to transcribe it with (None for settings.WHISPER_PROFILE).
+    """
+
+    def __init__(self, url: str, video_id: str, whisper_profile: str = None):
+        self.url = url
+        self.video_id = video_id
+        self.whisper_profile = whisper_profile
+        self.transcript = None
+        self.source = ""
+        self.audio = None
+        self.cleanup = ExitStack()
+
+
+def generate_quiz(url: str, user, on_stage=None, whisper_profile: str = None):
+    """
+    Run the full quiz pipeline for a YouTube URL.
+
+    Steps:
+        1. Return a copy of the cached quiz if this video was processed before.
+        2. Fetch captions or audio, see prepare_video.
+        3. Transcribe the audio if no captions were used.
+        4. Generate quiz data using the Gemini API.
+        5. Save the quiz and related questions to the database.
+        6. Cache the transcript and quiz payload under the video id.
+
+    Args:
+        url (str): YouTube video URL.
+        user (User): Owner of the created quiz.
+        on_stage (callable): Optional callback invoked with the stage name
+            before each stage starts.
+        whisper_profile (str): Optional Whisper inference profile.
+
+    Returns:
+        Quiz: The created quiz instance.
+
+    Raises:
+        QuizPipelineError: If no transcript can be produced.
+    """
+    stage = on_stage or (lambda name: None)
+    cached_quiz = clone_cached_quiz(url, user, whisper_profile)
+    if cached_quiz is not None:
+        return cached_quiz
+
+    prepared = prepare_video(url, stage, whisper_profile)
+    transcribe_video(prepared, stage)
+    return generate_from_transcript(prepared, user, stage)
+
+
+def clone_cached_quiz(url: str, user, whisper_profile: str = None):
+    """
+    Copy the cached quiz of a video into a new quiz for the user. Whisper
+    transcripts are only reused for the same profile.
+
+    Returns:
+        Quiz | None: The new quiz, or None if the video is not cached.
+    """
+    with span("result_cache"):
+        cached = get_cached_result(extract_video_id(url), whisper_profile or settings.WHISPER_PROFILE)
+    if cached is None:
+        return None
+    return save_quiz(cached["quiz"], url, user, transcript_source=cached.get("source", ""))
+
+
+def result_profile(prepared: PreparedVideo):
+    """
+    Return the Whisper profile a result is cached under, None for captions.
+    """
+    if prepared.source != SOURCE_WHISPER:
+        return None
+    return prepared.whisper_profile or settings.WHISPER_PROFILE
+
+
+def prepare_video(url: str, stage, whisper_profile: str = None):
+    """
+    Network stage: walk the transcript source ladder until a source yields
+    text or audio.
+
+    Behavior:
+        - Tries the sources of settings.TRANSCRIPT_SOURCES in order.
+        - "manual" and "automatic" read the caption tracks listed in the
+          info dict that was already fetched, without downloading audio.
+        - "whisper" downloads the audio into a private job directory that is
+          removed after transcription. With settings.AUDIO_DECODE_IN_MEMORY
+          the stream is decoded straight into a PCM buffer instead.
+
+    Args:
+        url (str): YouTube video URL.
+        stage (callable): Called with the stage name before each stage starts.
+        whisper_profile (str): Whisper inference profile used by transcribe_video.
+
+    Returns:
+        PreparedVideo: Transcript or audio of the video.
+
+    Raises:
+        QuizPipelineError: If the video is unavailable or no source yields text.
+    """
+    stage(STAGE_DOWNLOADING)
+    prepared = PreparedVideo(url, extract_video_id(url), whisper_profile)
+    info = fetch_video_info(str(url))
+    if info is None:
+        raise QuizPipelineError("Download failed")
+    if info.get("duration"):
+        AUDIO_SECONDS.observe(info["duration"])
+
+    for source in settings.TRANSCRIPT_SOURCES:
+        if source in (SOURCE_MANUAL, SOURCE_AUTOMATIC):
+            text = caption_transcript(info, source, settings.CAPTION_LANGUAGES)
+            if text:
+                prepared.transcript, prepared.source = text, source
+                return prepared
+            continue
+        if source != SOURCE_WHISPER:
+            continue
+
+        prepared.source = SOURCE_WHISPER
+        if settings.AUDIO_DECODE_IN_MEMORY:
+            prepared.audio = decode_audio_stream(info)
+            if prepared.audio is not None:
+                return prepared
+
+        workdir = open_workspace(prepared)
+        try:
+            prepared.audio = video_download(str(url), info=info, workdir=workdir)
+            if not prepared.audio:
+                raise QuizPipelineError("Download failed")
+        except BaseException:
+            prepared.cleanup.close()
+            raise
+        return prepared
+
+    raise QuizPipelineError("No transcript available")
+
+
+def open_workspace(prepared: PreparedVideo):
+    """
+    Create the audio job directory of a prepared video. It is removed with
+    prepared.cleanup.
+
+    Raises:
+        QuizPipelineError: If the audio workspace is full.
+    """
+    try:
+        return prepared.cleanup.enter_context(audio_workspace())
+    except WorkspaceFullError as exc:
+        raise QuizPipelineError(str(exc)) from exc
+
+
+def transcribe_video(prepared: PreparedVideo, stage):
+    """
+    CPU stage: transcribe the audio of a prepared video with Whisper and
+    remove its job directory. Does nothing if captions were used.
+    """
+    if prepared.transcript is not None:
+        return prepared
+    try:
+        stage(STAGE_TRANSCRIBING)
+        prepared.transcript = transcripts_Audio_to_Text(prepared.audio, prepared.whisper_profile)
+    finally:
+        prepared.audio = None
+        prepared.cleanup.close()
+    return prepared
+
+
+def generate_from_transcript(prepared: PreparedVideo, user, stage):
+    """
+    Network stage: generate the quiz with the Gemini API, save it and cache
+    the result under the video id.
+
+    Returns:
+        Quiz: The created quiz instance.
+    """
+    stage(STAGE_GENERATING)
+    TRANSCRIPT_CHARACTERS.observe(len(prepared.transcript), prepared.source)
+    quiz_json = create_Quiz_with_GeminiAPI(prepared.transcript)
+    quiz_instance = save_quiz(quiz_json, prepared.url, user, transcript_source=prepared.source)
+    store_result(prepared.video_id, prepared.transcript, quiz_json, prepared.source, result_profile(prepared))
+    return quiz_instance
+
+
+def save_quiz(quiz_json: dict, url: str, user, transcript_source: str = ""):
+    """
+    Persist generated quiz data together with its questions.
+
+    Args:
+        quiz_json (dict): Quiz data returned by the Gemini API.
+        url (str): Source video URL.
+        user (User): Owner of the quiz.
+        transcript_source (str): Transcript source the quiz was generated from.
+
+    Behavior:
+        - Validates the quiz and every question before writing anything.
+        - Inserts all questions with a single bulk_create in the same
+          transaction as the quiz, so a failure never leaves a partial quiz.
+        - Stores the read snapshot of the new quiz, see snapshots.
+
+    Returns:
+        Quiz: The created quiz instance.
+
+    Raises:
+        ValidationError: If the quiz or any of its questions is invalid.
+    """
+    serializer = QuizSerializer(data=quiz_json)
+    serializer.is_valid(raise_exception=True)
+    question_serializer = QuestionSeralizer(data=quiz_json.get("questions", []), many=True)
+    question_serializer.is_valid(raise_exception=True)
+
+    with span("db"), transaction.atomic():
+        quiz_instance = serializer.save(video_url=url, user=user, transcript_source=transcript_source)
+        questions = Question.objects.bulk_create(
+            [Question(quizz=quiz_instance, **question) for question in question_serializer.validated_data])
+        refresh_snapshot(quiz_instance, questions)
+    return quiz_instance
+
+
+_whisper_executor = None
+_whisper_executor_lock = threading.Lock()
+
+
+def get_whisper_executor():
+    """
+    Return the thread pool that runs Whisper for the async pipeline, sized
+    by settings.QUIZ_ASYNC_WHISPER_WORKERS. Keeps CPU-bound transcription
+    off the event loop while capping how many run at once.
+    """
+    global _whisper_executor
+    with _whisper_executor_lock:
+        if _whisper_executor is None:
+            _whisper_executor = ThreadPoolExecutor(
+                max_workers=settings.QUIZ_ASYNC_WHISPER_WORKERS, thread_name_prefix="quiz-whisper")
+        return _whisper_executor
+
+
+async def agenerate_quiz(url: str, user, whisper_profile: str = None):
+    """
+    Async variant of generate_quiz for ASGI views.
+
+    Network-bound stages are awaited, Whisper runs in get_whisper_executor()
+    and database work goes through sync_to_async, so a request that waits
+    for YouTube, Whisper or Gemini holds no thread of its own.
+
+    Returns:
+        Quiz: The created quiz instance.
+
+    Raises:
+        QuizPipelineError: If no transcript can be produced.
+    """
+    cached_quiz = await sync_to_async(clone_cached_quiz)(url, user, whisper_profile)
+    if cached_quiz is not None:
+        return cached_quiz
+
+    prepared = await aprepare_video(url, whisper_profile)
+    await atranscribe_video(prepared)
+    return await agenerate_from_transcript(prepared, user)
+
+
+async def aprepare_video(url: str, whisper_profile: str = None):
+    """
+    Async variant of prepare_video with the same transcript source ladder.
+    """
+    prepared = PreparedVideo(url, extract_video_id(url), whisper_profile)
+    info = await afetch_video_info(str(url))
+    if info is None:
+        raise QuizPipelineError("Download failed")
+    if info.get("duration"):
+        AUDIO_SECONDS.observe(info["duration"])
+
+    for source in settings.TRANSCRIPT_SOURCES:
+        if source in (SOURCE_MANUAL, SOURCE_AUTOMATIC):
+            text = await acaption_transcript(info, source, settings.CAPTION_LANGUAGES)
+            if text:
+                prepared.transcript, prepared.source = text, source
+                return prepared
+            continue
+        if source != SOURCE_WHISPER:
+            continue
+
+        prepared.source = SOURCE_WHISPER
+        if settings.AUDIO_DECODE_IN_MEMORY:
+            prepared.audio = await adecode_audio_stream(info)
+            if prepared.audio is not None:
+                return prepared
+
+        # the workspace may walk and sweep the whole directory tree
+        workdir = await sync_to_async(open_workspace, thread_sensitive=False)(prepared)
+        try:
+            prepared.audio = await avideo_download(str(url), info=info, workdir=workdir)
+            if not prepared.audio:
+                raise QuizPipelineError("Download failed")
+        except BaseException:
+            await sync_to_async(prepared.cleanup.close, thread_sensitive=False)()
+            raise
+        return prepared
+
+    raise QuizPipelineError("No transcript available")
+
+
+async def atranscribe_video(prepared: PreparedVideo):
+    """
+    Async variant of transcribe_video that runs Whisper in
+    get_whisper_executor(), with the request context so its span still
+    reaches the Server-Timing header.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_whisper_executor(), context.run, transcribe_video, prepared, lambda name: None)
+
+
+async def agenerate_from_transcript(prepared: PreparedVideo, user):
+    """
+    Async variant of generate_from_transcript.
+    """
+    TRANSCRIPT_CHARACTERS.observe(len(prepared.transcript), prepared.source)
+    quiz_json = await acreate_Quiz_with_GeminiAPI(prepared.transcript)
+    quiz_instance = await sync_to_async(save_quiz)(quiz_json, prepared.url, user, prepared.source)
+    await sync_to_async(store_result)(prepared.video_id, prepared.transcript, quiz_json, prepared.source,
+                                      result_profile(prepared))
+    return quiz_instance
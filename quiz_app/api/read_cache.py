@@ -0,0 +1,137 @@
+import hashlib
+import uuid
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+from quiz_app.models import Question, Quiz
+
+READ_CACHE_ALIAS = "quiz_reads"
+
+
+def _version_key(user_id):
+    return f"quiz-reads:{user_id}:version"
+
+
+def _entry_key(user_id, version: str, variant: str):
+    digest = hashlib.blake2b(variant.encode(), digest_size=16).hexdigest()
+    return f"quiz-reads:{user_id}:{version}:{digest}"
+
+
+def read_version(user_id):
+    """
+    Return the current cache version of a user's quiz reads. A random token
+    is created on first use, so an evicted version never brings back entries
+    stored under an older one.
+    """
+    cache = caches[READ_CACHE_ALIAS]
+    cache.add(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+    return cache.get(_version_key(user_id)) or ""
+
+
+def _bump_version(user_id):
+    caches[READ_CACHE_ALIAS].set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_user_reads(user_id):
+    """
+    Drop every cached quiz read of a user, see quiz_app.signals.
+
+    The version is changed right away and once more when the surrounding
+    transaction commits, so a read that ran between the write and the
+    commit cannot keep stale data cached.
+    """
+    _bump_version(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_version(user_id))
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the given values.
+    """
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def quiz_list_etag(user, variant: str):
+    """
+    Return the ETag of a user's quiz list. It changes whenever a quiz or
+    question of the user is created, changed or deleted.
+    """
+    state = Quiz.objects.filter(user=user).aggregate(
+        quiz_count=Count('id', distinct=True), quiz_updated=Max('updated_at'),
+        question_count=Count('questions'), question_updated=Max('questions__updated_at'))
+    return make_etag(variant, *state.values())
+
+
+def quiz_state_etag(quiz_id, updated_at, question_count: int, question_updated):
+    """
+    Return the version tag of a quiz and its questions, stored in the quiz
+    snapshot and used for the detail ETag.
+    """
+    return make_etag(quiz_id, updated_at, question_count, question_updated)
+
+
+def quiz_detail_etag(quiz, variant: str):
+    """
+    Return the ETag of a single quiz from its and its questions' timestamps.
+    A current snapshot already carries them, otherwise they are queried.
+    """
+    snapshot = quiz.snapshot
+    if snapshot and snapshot.get("version") == Quiz.SNAPSHOT_VERSION:
+        return make_etag(variant, snapshot["etag"])
+    state = Question.objects.filter(quizz=quiz).aggregate(question_count=Count('id'), question_updated=Max('updated_at'))
+    return make_etag(variant, quiz_state_etag(quiz.pk, quiz.updated_at, **state))
+
+
+def etag_matches(request, etag: str):
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
+def conditional_headers(response, etag: str):
+    """
+    Set the ETag and ask clients to revalidate every time, the response
+    belongs to the logged in user only.
+    """
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified(etag: str):
+    return conditional_headers(HttpResponseNotModified(), etag)
+
+
+def get_cached_read(request, user_id, version: str, variant: str):
+    """
+    Return the response for a cached read, a 304 if the client already has
+    it, or None on a miss.
+    """
+    entry = caches[READ_CACHE_ALIAS].get(_entry_key(user_id, version, variant))
+    if entry is None:
+        return None
+    if etag_matches(request, entry["etag"]):
+        return not_modified(entry["etag"])
+    response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    return conditional_headers(response, entry["etag"])
+
+
+def store_read(response, user_id, version: str, variant: str, etag: str):
+    """
+    Render a successful read and keep the bytes for the next request with
+    the same user, version and variant.
+    """
+    if not isinstance(response, Response) or response.status_code != 200:
+        return response
+    conditional_headers(response, etag)
+    response.render()
+    caches[READ_CACHE_ALIAS].set(_entry_key(user_id, version, variant), {
+        "etag": etag, "content": response.content, "content_type": response["Content-Type"]})
+    return response
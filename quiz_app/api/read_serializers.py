@@ -0,0 +1,72 @@
+from rest_framework import serializers
+from quiz_app.models import Question
+from .seralizers import QuestionListSeralizer, QuizListSeralizer
+
+# Lightweight read serializers for quizzes and questions.
+#
+# They work on .values() rows instead of model instances and build the same
+# dicts as QuizListSeralizer / QuestionListSeralizer, with the same keys in
+# the same order, without per-field serializer objects. Only output is
+# supported, writes keep going through the DRF serializers.
+
+QUIZ_FIELDS = QuizListSeralizer.Meta.fields
+QUIZ_VALUE_FIELDS = [name for name in QUIZ_FIELDS if name != 'questions']
+QUESTION_FIELDS = QuestionListSeralizer.Meta.fields
+DATETIME_FIELDS = frozenset(('created_at', 'updated_at'))
+
+_datetime_field = serializers.DateTimeField()
+
+
+def format_datetime(value):
+    """
+    Format a datetime exactly like the DRF DateTimeField of the serializers
+    (current timezone, ISO 8601 with "Z" for UTC).
+    """
+    return _datetime_field.to_representation(value)
+
+
+def quiz_row(quiz):
+    """
+    Return the values row of a loaded quiz instance.
+    """
+    return {name: getattr(quiz, name) for name in QUIZ_VALUE_FIELDS}
+
+
+def question_rows(quiz_ids):
+    """
+    Load the questions of the given quizzes with one .values() query.
+
+    Returns:
+        dict[int, list[dict]]: Question rows per quiz id in primary key order,
+        with "updated_at" in addition to the output fields.
+    """
+    grouped = {quiz_id: [] for quiz_id in quiz_ids}
+    if not grouped:
+        return grouped
+    rows = Question.objects.filter(quizz_id__in=grouped).order_by('pk').values('quizz_id', 'updated_at', *QUESTION_FIELDS)
+    for row in rows:
+        grouped[row['quizz_id']].append(row)
+    return grouped
+
+
+def represent_quiz(row: dict, questions=None, fields=None):
+    """
+    Build the QuizListSeralizer representation of a quiz row.
+
+    Args:
+        row (dict): Quiz values with at least the requested QUIZ_VALUE_FIELDS.
+        questions (list[dict] | None): Question rows, required if the
+            questions are part of the output.
+        fields (list[str] | None): Field names to return, None for all.
+            Unknown names are ignored.
+    """
+    names = QUIZ_FIELDS if fields is None else [name for name in QUIZ_FIELDS if name in fields]
+    data = {}
+    for name in names:
+        if name == 'questions':
+            data[name] = [{field: question[field] for field in QUESTION_FIELDS} for question in questions]
+        elif name in DATETIME_FIELDS:
+            data[name] = format_datetime(row[name])
+        else:
+            data[name] = row[name]
+    return data
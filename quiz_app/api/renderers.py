@@ -0,0 +1,49 @@
+import re
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # FastJSONRenderer falls back to JSONRenderer
+    orjson = None
+
+_LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+# orjson writes float exponents as "1e16" where json writes "1e+16".
+_EXPONENT = re.compile(rb"[0-9]e[-0-9]")
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that serializes with orjson when it is installed.
+
+    Produces the same bytes as DRF's JSONRenderer with the default settings
+    (compact separators, UTF-8 instead of \\u escapes, \\u2028 and \\u2029
+    escaped): orjson writes the same compact output, and every type it would
+    format differently (datetimes, decimals, lazy strings, ...) is handed to
+    DRF's encoder. Falls back to JSONRenderer for indented output (browsable
+    API, "; indent=" media types), non-default UNICODE_JSON/COMPACT_JSON
+    settings, data orjson refuses (e.g. non-string keys or integers above
+    64 bits) and output that may contain a float in exponent notation.
+    Only NaN and infinity differ: orjson writes null where the strict
+    JSONRenderer raises.
+    """
+
+    _encoder = JSONEncoder()
+    _options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._encoder.default, option=self._options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if _EXPONENT.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        for separator, escaped in _LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
@@ -0,0 +1,113 @@
+import re
+import threading
+from urllib.parse import urlparse, parse_qs
+from django.core.cache import caches
+
+RESULT_CACHE_ALIAS = "quiz_results"
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+_counters = {"hits": 0, "misses": 0, "stores": 0}
+_counters_lock = threading.Lock()
+
+
+def extract_video_id(url: str):
+    """
+    Return the canonical YouTube video id of a URL.
+
+    Supports watch?v=, youtu.be/<id>, /shorts/<id> and /embed/<id> links, so
+    different spellings of the same video share one cache entry.
+
+    Args:
+        url (str): YouTube URL.
+
+    Returns:
+        str | None: The 11 character video id, or None if it cannot be found.
+    """
+    if not url:
+        return None
+    parsed = urlparse(str(url))
+    host = (parsed.hostname or "").lower()
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host == "youtube.com" or host.endswith(".youtube.com"):
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        else:
+            parts = parsed.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live"):
+                candidate = parts[1]
+    if candidate and VIDEO_ID_PATTERN.match(candidate):
+        return candidate
+    return None
+
+
+def _count(name: str):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _cache_key(video_id: str, profile: str = None):
+    if profile:
+        return f"quiz-result:{video_id}:{profile}"
+    return f"quiz-result:{video_id}"
+
+
+def get_cached_result(video_id: str, profile: str = None):
+    """
+    Look up the transcript and quiz payload generated for a video.
+
+    Caption results do not depend on the Whisper profile and are shared by
+    all profiles; Whisper results are only found for the profile that
+    produced them. Both are fetched in one cache round trip.
+
+    Args:
+        video_id (str): Canonical YouTube video id.
+        profile (str): Whisper profile of the request.
+
+    Returns:
+        dict | None: {"transcript": str, "quiz": dict, "source": str} on a
+        hit, None on a miss.
+    """
+    result = None
+    if video_id:
+        keys = [_cache_key(video_id)] + ([_cache_key(video_id, profile)] if profile else [])
+        found = caches[RESULT_CACHE_ALIAS].get_many(keys)
+        result = next((found[key] for key in keys if key in found), None)
+    _count("hits" if result is not None else "misses")
+    return result
+
+
+def store_result(video_id: str, transcript: str, quiz_json: dict, source: str = "", profile: str = None):
+    """
+    Store the transcript, its source and the quiz payload of a video, under
+    the Whisper profile if one produced the transcript.
+
+    Expiry and eviction follow the TIMEOUT and MAX_ENTRIES options of the
+    "quiz_results" cache in settings.CACHES.
+    """
+    if not video_id:
+        return
+    caches[RESULT_CACHE_ALIAS].set(_cache_key(video_id, profile),
+                                   {"transcript": transcript, "quiz": quiz_json, "source": source})
+    _count("stores")
+
+
+def cache_stats():
+    """
+    Return the hit, miss and store counters of this process.
+    """
+    with _counters_lock:
+        stats = dict(_counters)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    """
+    Reset the counters of this process, mainly useful for tests.
+    """
+    with _counters_lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from quiz_app.models import Quiz, Question
+from quiz_app.models import Quiz, Question, QuizJob
 
 
 class QuestionSeralizer(serializers.ModelSerializer):
@@ -81,4 +81,25 @@ class QuizListSeralizer(serializers.ModelSerializer):
     class Meta:
         model=Quiz
         fields=['id','title','description','created_at','updated_at','video_url','questions']
-    read_only_fields = ['title','description','created_at','updated_at']
\ No newline at end of file
+    read_only_fields = ['title','description','created_at','updated_at']
+
+
+class QuizJobSerializer(serializers.ModelSerializer):
+
+    id = serializers.IntegerField(read_only=True)
+    quiz = QuizListSeralizer(read_only=True)
+
+    class Meta:
+        model = QuizJob
+        fields = ['id', 'status', 'video_url', 'quiz', 'error', 'created_at', 'updated_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
+class QuizBatchJobSerializer(serializers.ModelSerializer):
+
+    id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = QuizJob
+        fields = ['id', 'video_url', 'status', 'quiz', 'error']
+        read_only_fields = fields
@@ -0,0 +1,160 @@
+from django.db import transaction
+from django.db.models import Q
+from quiz_app.models import Quiz
+from .read_cache import quiz_state_etag
+from .read_serializers import QUESTION_FIELDS, QUIZ_FIELDS, QUIZ_VALUE_FIELDS, question_rows, quiz_row, represent_quiz
+
+# Columns read for list rows: everything the serializers need if the
+# snapshot has to be rebuilt, plus the snapshot itself.
+ROW_FIELDS = (*QUIZ_VALUE_FIELDS, 'snapshot')
+
+
+def snapshot_is_current(snapshot):
+    return bool(snapshot) and snapshot.get("version") == Quiz.SNAPSHOT_VERSION
+
+
+def build_snapshot(row: dict, questions):
+    """
+    Render a quiz with its questions the way QuizListSeralizer does.
+
+    Args:
+        row (dict): Quiz values, see read_serializers.quiz_row.
+        questions (list[dict]): Question rows of the quiz.
+
+    Returns:
+        dict: {"version": Quiz.SNAPSHOT_VERSION, "etag": str, "quiz": dict},
+        where "etag" is the state tag used for the detail ETag.
+    """
+    latest = max((question['updated_at'] for question in questions), default=None)
+    return {
+        "version": Quiz.SNAPSHOT_VERSION,
+        "etag": quiz_state_etag(row['id'], row['updated_at'], len(questions), latest),
+        "quiz": represent_quiz(row, questions),
+    }
+
+
+def refresh_snapshot(quiz, questions=None):
+    """
+    Rebuild and store the snapshot of a quiz after it or its questions were
+    written. Uses a queryset update, so updated_at and the signals that
+    clear snapshots are not triggered.
+
+    Args:
+        quiz (Quiz): The saved quiz.
+        questions (list[Question] | None): All questions of the quiz, if the
+            caller just created them. They are loaded otherwise, and also
+            when the database did not return their primary keys.
+    """
+    if questions is not None and all(question.pk is not None for question in questions):
+        rows = [{'updated_at': question.updated_at, **{name: getattr(question, name) for name in QUESTION_FIELDS}}
+                for question in questions]
+    else:
+        rows = question_rows([quiz.pk])[quiz.pk]
+    quiz.snapshot = build_snapshot(quiz_row(quiz), rows)
+    Quiz.objects.filter(pk=quiz.pk).update(snapshot=quiz.snapshot)
+    return quiz.snapshot
+
+
+def rebuild_snapshots(quiz_ids):
+    """
+    Rebuild and store the snapshots of quizzes whose snapshot was cleared
+    outside the views (admin, shell, question edits), so the next read is a
+    single row fetch again.
+
+    The quiz rows are locked while their questions are read. A question
+    write clears the snapshot through the same row, so it either waits for
+    the rebuild or the rebuild sees its questions; a snapshot built from
+    older questions is never stored over a newer clear.
+
+    Args:
+        quiz_ids (list[int]): Quizzes without a current snapshot.
+
+    Returns:
+        dict[int, dict]: Snapshot per quiz id. Quizzes that were deleted in
+        the meantime are missing.
+    """
+    with transaction.atomic():
+        rows = list(Quiz.objects.select_for_update().filter(pk__in=quiz_ids).order_by('pk').values(*ROW_FIELDS))
+        snapshots = {row['id']: row['snapshot'] for row in rows if snapshot_is_current(row['snapshot'])}
+        stale = [row for row in rows if row['id'] not in snapshots]
+        if stale:
+            questions = question_rows([row['id'] for row in stale])
+            rebuilt = [Quiz(pk=row['id'], snapshot=build_snapshot(row, questions[row['id']])) for row in stale]
+            Quiz.objects.bulk_update(rebuilt, ['snapshot'])
+            snapshots.update((quiz.pk, quiz.snapshot) for quiz in rebuilt)
+    return snapshots
+
+
+def project(data: dict, fields=None):
+    """
+    Return the requested fields of a rendered quiz in serializer order.
+    Also restores the key order, which Postgres jsonb does not keep.
+    """
+    names = QUIZ_FIELDS if fields is None else [name for name in QUIZ_FIELDS if name in fields]
+    payload = {name: data[name] for name in names}
+    if 'questions' in payload:
+        payload['questions'] = [{name: question[name] for name in QUESTION_FIELDS}
+                                for question in payload['questions']]
+    return payload
+
+
+def quiz_payload(quiz, fields=None):
+    """
+    Return the read representation of a quiz from its snapshot, which is
+    rebuilt first if it is missing or outdated, see rebuild_snapshots.
+
+    Args:
+        quiz (Quiz): The loaded quiz.
+        fields (list[str] | None): Field names to return, None for all.
+    """
+    if not snapshot_is_current(quiz.snapshot):
+        quiz.snapshot = rebuild_snapshots([quiz.pk]).get(quiz.pk)
+        if quiz.snapshot is None:  # deleted meanwhile, its questions are gone too
+            return represent_quiz(quiz_row(quiz), [], fields)
+    return project(quiz.snapshot["quiz"], fields)
+
+
+def quiz_payloads(rows, fields=None):
+    """
+    Return the read representations of many quiz rows (see ROW_FIELDS).
+    Snapshots that are missing or outdated are rebuilt together, see
+    rebuild_snapshots.
+    """
+    stale = [row['id'] for row in rows if not snapshot_is_current(row['snapshot'])]
+    rebuilt = rebuild_snapshots(stale) if stale else {}
+    payloads = []
+    for row in rows:
+        snapshot = row['snapshot'] if snapshot_is_current(row['snapshot']) else rebuilt.get(row['id'])
+        payloads.append(project(snapshot["quiz"], fields) if snapshot else represent_quiz(row, [], fields))
+    return payloads
+
+
+def backfill_snapshots(batch_size: int = 500, rebuild_all: bool = False):
+    """
+    Store snapshots for quizzes that have none or one of an older version.
+
+    Quizzes are processed in primary key order, batch_size at a time, with
+    one query for the quizzes, one for their questions and one bulk update
+    per batch.
+
+    Args:
+        batch_size (int): Quizzes per batch.
+        rebuild_all (bool): Rebuild current snapshots as well.
+
+    Returns:
+        int: Number of snapshots written.
+    """
+    queryset = Quiz.objects.order_by('pk')
+    if not rebuild_all:
+        queryset = queryset.filter(Q(snapshot__isnull=True) | ~Q(snapshot__version=Quiz.SNAPSHOT_VERSION))
+    written = 0
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values(*QUIZ_VALUE_FIELDS)[:batch_size])
+        if not rows:
+            return written
+        questions = question_rows([row['id'] for row in rows])
+        Quiz.objects.bulk_update(
+            [Quiz(pk=row['id'], snapshot=build_snapshot(row, questions[row['id']])) for row in rows], ['snapshot'])
+        written += len(rows)
+        last_pk = rows[-1]['id']
@@ -0,0 +1,93 @@
+import logging
+import re
+from functools import lru_cache
+import tiktoken
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str):
+    """
+    Return the tiktoken encoding, or None if it cannot be loaded.
+
+    tiktoken downloads the BPE ranks on first use. Without network access
+    the token count falls back to a characters-per-token estimate instead of
+    failing the pipeline.
+    """
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        logger.warning("tiktoken encoding %s unavailable, estimating tokens from characters", name)
+        return None
+
+
+def count_tokens(text: str):
+    """
+    Return the number of tokens of a text.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Token count with settings.TOKENIZER_ENCODING, or an estimate of
+        one token per four characters if the encoding is unavailable.
+    """
+    encoding = get_encoding(settings.TOKENIZER_ENCODING)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text: str, max_tokens: int):
+    """
+    Split a text into chunks of at most max_tokens tokens.
+
+    Chunks end at sentence boundaries where possible. A single sentence
+    above the limit (e.g. automatic captions without punctuation) is cut
+    by words.
+
+    Args:
+        text (str): Text to split.
+        max_tokens (int): Token budget of one chunk.
+
+    Returns:
+        list[str]: The chunks in their original order.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in SENTENCE_END.split(text.strip()):
+        pieces = [sentence]
+        if count_tokens(sentence) > max_tokens:
+            pieces = _split_words(sentence, max_tokens)
+        for piece in pieces:
+            tokens = count_tokens(piece) + 1
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _split_words(sentence: str, max_tokens: int):
+    pieces = []
+    current = []
+    current_tokens = 0
+    for word in sentence.split():
+        tokens = count_tokens(" " + word)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
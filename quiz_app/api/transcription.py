@@ -0,0 +1,568 @@
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
+import whisper
+from django.conf import settings
+from .metrics import VAD_REMOVED_SECONDS, WHISPER_REALTIME_FACTOR
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_SUFFIX = ":int8"
+PROFILE_DEFAULTS = {
+    "models": None,
+    "quantize": False,
+    "threads": 0,
+    "decoding": "greedy",
+    "beam_size": 5,
+    "fallback": True,
+}
+
+
+class UnknownProfileError(ValueError):
+    """
+    Raised for a Whisper inference profile that is not in settings.WHISPER_PROFILES.
+    """
+
+
+def get_profile(name: str = None):
+    """
+    Return an inference profile of settings.WHISPER_PROFILES.
+
+    Keys:
+        models (list): [max audio seconds, model size] pairs, the first pair
+            the audio fits in is used; None as limit matches any length.
+            Defaults to settings.WHISPER_MODEL for every length.
+        quantize (bool): Use dynamically int8-quantized Linear layers.
+        threads (int): Torch threads, 0 for the CPU allotment of the worker.
+        decoding (str): "greedy" or "beam" (with beam_size beams).
+        fallback (bool): Re-decode at higher temperatures when Whisper's
+            quality checks fail. Off makes decoding time predictable.
+
+    Args:
+        name (str): Profile name, defaults to settings.WHISPER_PROFILE.
+
+    Returns:
+        dict: The profile merged with PROFILE_DEFAULTS, plus its "name".
+
+    Raises:
+        UnknownProfileError: If the profile is not configured.
+    """
+    name = name or settings.WHISPER_PROFILE
+    if name not in settings.WHISPER_PROFILES:
+        raise UnknownProfileError(f"Unknown Whisper profile {name!r}")
+    return {**PROFILE_DEFAULTS, **settings.WHISPER_PROFILES[name], "name": name}
+
+
+def select_model(profile: dict, audio_seconds: float):
+    """
+    Return the model spec ("base" or "base:int8") a profile uses for audio
+    of the given length.
+    """
+    ladder = profile["models"] or [[None, settings.WHISPER_MODEL]]
+    model_name = ladder[-1][1]
+    for max_seconds, name in ladder:
+        if max_seconds is None or audio_seconds <= max_seconds:
+            model_name = name
+            break
+    return model_name + QUANTIZED_SUFFIX if profile["quantize"] else model_name
+
+
+def decode_options(profile: dict):
+    """
+    Return the model.transcribe keyword arguments of a profile for CPU inference.
+    """
+    options = {"fp16": False}
+    if profile["decoding"] == "beam":
+        options.update(beam_size=profile["beam_size"], best_of=profile["beam_size"])
+    if not profile["fallback"]:
+        options["temperature"] = 0.0
+    return options
+
+
+def cpu_allotment():
+    """
+    Return the number of CPUs this worker may use: the CPU affinity mask,
+    capped by a cgroup v2 CPU quota (container CPU limit) if there is one.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def torch_threads(profile: dict):
+    return profile["threads"] if profile["threads"] > 0 else cpu_allotment()
+
+
+def quantize_model(model):
+    """
+    Replace the Linear layers of a Whisper model with dynamically
+    int8-quantized ones, in place.
+
+    Whisper's Linear subclass only adds a dtype cast for fp16, which does not
+    apply on CPU, so it is turned back into torch.nn.Linear first; torch's
+    quantization only converts the exact class.
+    """
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_whisper_model(spec: str):
+    """
+    Load a Whisper model from a spec like "base" or "base:int8".
+    """
+    name, quantized, _ = spec.partition(QUANTIZED_SUFFIX)
+    model = whisper.load_model(name)
+    return quantize_model(model) if quantized else model
+
+
+def model_bytes(model):
+    """
+    Return the memory held by the weights and buffers of a model, including
+    packed int8 weights.
+    """
+    tensors = []
+    for value in model.state_dict().values():
+        tensors.extend(value if isinstance(value, tuple) else [value])
+    return sum(t.numel() * t.element_size() for t in tensors if isinstance(t, torch.Tensor))
+
+
+class WhisperModelRegistry:
+    """
+    Process-wide cache of loaded Whisper models.
+
+    Behavior:
+        - Loads every model size at most once per worker process. Sizes
+          with an ":int8" suffix (e.g. "base:int8") are loaded quantized,
+          see quantize_model.
+        - Loading is guarded per model name, so concurrent requests for the
+          same size wait for the first load instead of loading it twice.
+        - One inference lock is shared by every model of the process.
+          Whisper installs key/value cache hooks on the shared modules while
+          decoding, so two transcriptions must never run on the same instance
+          at the same time, and torch's thread count, which every
+          transcription sets to the CPU allotment, is process-wide.
+        - Keeps load time, memory footprint and usage counters per model.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._inference_lock = threading.Lock()
+        self._registry_lock = threading.Lock()
+
+    def _lock_for(self, name: str):
+        with self._registry_lock:
+            if name not in self._locks:
+                self._locks[name] = threading.Lock()
+            return self._locks[name]
+
+    def get(self, name: str = None):
+        """
+        Return the loaded Whisper model for the given size.
+
+        Args:
+            name (str): Whisper model size, defaults to settings.WHISPER_MODEL.
+
+        Returns:
+            whisper.model.Whisper: The resident model instance.
+        """
+        name = name or settings.WHISPER_MODEL
+        model = self._models.get(name)
+        if model is None:
+            with self._lock_for(name):
+                model = self._models.get(name)
+                if model is None:
+                    model = self._load(name)
+        with self._registry_lock:
+            self._stats[name]["uses"] += 1
+        return model
+
+    def _load(self, name: str):
+        started = time.perf_counter()
+        model = load_whisper_model(name)
+        load_seconds = time.perf_counter() - started
+        self._stats[name] = {
+            "load_seconds": round(load_seconds, 3),
+            "memory_bytes": model_bytes(model),
+            "loaded_at": time.time(),
+            "uses": 0,
+        }
+        self._models[name] = model
+        return model
+
+    def inference_lock(self, name: str = None):
+        """
+        Return the lock that serializes inference in this process. It is the
+        same lock for every model, see the class docstring.
+        """
+        return self._inference_lock
+
+    def warm(self, names=None):
+        """
+        Load the given model sizes ahead of the first request.
+
+        Args:
+            names (list[str]): Model sizes to load, defaults to
+                settings.WHISPER_PRELOAD_MODELS or settings.WHISPER_MODEL.
+        """
+        names = names or settings.WHISPER_PRELOAD_MODELS or [settings.WHISPER_MODEL]
+        for name in names:
+            self.get(name)
+
+    def stats(self):
+        """
+        Return load time, memory footprint and usage counters per model.
+        """
+        return {name: dict(values) for name, values in self._stats.items()}
+
+    def clear(self):
+        """
+        Drop every loaded model, mainly useful for tests.
+        """
+        with self._registry_lock:
+            self._models.clear()
+            self._stats.clear()
+            self._locks.clear()
+
+
+whisper_registry = WhisperModelRegistry()
+
+
+def transcribe_file(audio_path: str, model_name: str = None, profile: str = None):
+    """
+    Transcribe an audio file with a resident Whisper model.
+
+    The file is decoded once (Whisper would do the same) so its duration is
+    known before the profile picks a model, see transcribe_pcm.
+
+    Args:
+        audio_path (str): Path to the audio file.
+        model_name (str): Whisper model spec, overrides the profile's choice.
+        profile (str): Inference profile, defaults to settings.WHISPER_PROFILE.
+
+    Returns:
+        dict: Whisper result including "text", see transcribe_pcm.
+    """
+    return transcribe_pcm(whisper.load_audio(audio_path), model_name, profile)
+
+
+def transcribe_pcm(audio, model_name: str = None, profile: str = None):
+    """
+    Transcribe 16 kHz mono float32 samples with an inference profile.
+
+    Behavior:
+        - The profile picks the model size for the audio duration, int8 or
+          fp32 weights, the torch thread count and the decoding strategy,
+          see get_profile.
+        - With settings.WHISPER_VAD silence and other non-speech regions
+          are cut out first, see trim_non_speech. The model and the parallel
+          path are chosen by the remaining speech duration.
+        - Audio longer than settings.WHISPER_PARALLEL_MIN_SECONDS is split
+          into chunks and transcribed in the process pool when
+          settings.WHISPER_PARALLEL_WORKERS is greater than zero.
+        - The real-time factor (processing time including the VAD pass /
+          original audio duration) is logged and recorded per profile in the
+          quiz_whisper_realtime_factor histogram.
+
+    Args:
+        audio (np.ndarray): Samples as returned by whisper.load_audio.
+        model_name (str): Whisper model spec, overrides the profile's choice.
+        profile (str): Inference profile, defaults to settings.WHISPER_PROFILE.
+
+    Returns:
+        dict: Whisper result including "text", plus "profile", "model",
+        "realtime_factor" and "vad_removed_seconds".
+    """
+    profile = get_profile(profile)
+    audio_seconds = len(audio) / whisper.audio.SAMPLE_RATE
+
+    started = time.perf_counter()
+    removed_seconds = 0.0
+    if settings.WHISPER_VAD:
+        audio, removed_seconds = trim_non_speech(audio)
+        VAD_REMOVED_SECONDS.observe(removed_seconds)
+    speech_seconds = audio_seconds - removed_seconds
+    model_name = model_name or select_model(profile, speech_seconds)
+
+    if settings.WHISPER_PARALLEL_WORKERS > 0 and speech_seconds >= settings.WHISPER_PARALLEL_MIN_SECONDS:
+        result = transcribe_parallel(audio, model_name, profile)
+    else:
+        result = transcribe_array(audio, model_name, profile)
+    elapsed = time.perf_counter() - started
+
+    realtime_factor = elapsed / audio_seconds if audio_seconds else 0.0
+    WHISPER_REALTIME_FACTOR.observe(realtime_factor, profile["name"])
+    logger.info("whisper profile=%s model=%s audio_s=%.1f vad_removed_s=%.1f rtf=%.3f",
+                profile["name"], model_name, audio_seconds, removed_seconds, realtime_factor)
+    result.update(profile=profile["name"], model=model_name, realtime_factor=round(realtime_factor, 3),
+                  vad_removed_seconds=round(removed_seconds, 2))
+    return result
+
+
+def transcribe_array(audio, model_name: str = None, profile: dict = None):
+    """
+    Transcribe a 16 kHz mono float32 array with a resident Whisper model.
+
+    torch's thread count is process-wide; it is set under the process-wide
+    inference lock right before decoding.
+    """
+    profile = profile or get_profile()
+    model = whisper_registry.get(model_name)
+    with whisper_registry.inference_lock(model_name):
+        torch.set_num_threads(torch_threads(profile))
+        return model.transcribe(audio, **decode_options(profile))
+
+
+def profile_stats():
+    """
+    Return the number of transcriptions and the mean real-time factor per
+    inference profile in this process.
+    """
+    return {
+        name: {"transcriptions": series["count"],
+               "mean_realtime_factor": round(series["sum"] / series["count"], 3) if series["count"] else 0.0}
+        for name, series in WHISPER_REALTIME_FACTOR.snapshot().items()
+    }
+
+
+FRAME_SECONDS = 0.03
+
+
+def frame_energy(audio, sample_rate: int = whisper.audio.SAMPLE_RATE):
+    """
+    Return the RMS energy of consecutive 30 ms frames.
+    """
+    frame = int(sample_rate * FRAME_SECONDS)
+    usable = len(audio) - len(audio) % frame
+    if usable == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:usable].reshape(-1, frame)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def speech_spans(audio, sample_rate: int = whisper.audio.SAMPLE_RATE):
+    """
+    Find the speech regions of audio with an energy-based voice activity
+    detector.
+
+    Behavior:
+        - A 30 ms frame counts as voiced if its RMS energy is above
+          settings.WHISPER_VAD_NOISE_RATIO times the noise floor of the
+          recording (the 10th percentile of all frames). The threshold only
+          depends on the quietest parts, so quiet or distant speakers are
+          kept next to louder passages. settings.WHISPER_VAD_SILENCE_RMS
+          (-80 dBFS) only keeps digital silence from counting as voiced.
+        - Only energy is looked at: music and other loud non-speech are
+          kept and transcribed.
+        - Every voiced run is padded by settings.WHISPER_VAD_PAD_SECONDS on
+          both sides, so word onsets and endings are kept.
+        - Runs separated by less than settings.WHISPER_VAD_MIN_SILENCE_SECONDS
+          are merged into one span; only longer pauses are cut.
+
+    Args:
+        audio (np.ndarray): 16 kHz mono audio.
+
+    Returns:
+        list[tuple[int, int]]: Sample offsets (start, end) of the speech
+        spans in playback order, empty if nothing is voiced.
+    """
+    energy = frame_energy(audio, sample_rate)
+    if not len(energy):
+        return []
+    frame = int(sample_rate * FRAME_SECONDS)
+    noise_floor = max(float(np.percentile(energy, 10)), settings.WHISPER_VAD_SILENCE_RMS)
+    threshold = noise_floor * settings.WHISPER_VAD_NOISE_RATIO
+    voiced = np.concatenate(([False], energy > threshold, [False]))
+    edges = np.flatnonzero(voiced[1:] != voiced[:-1])
+
+    pad = int(settings.WHISPER_VAD_PAD_SECONDS * sample_rate)
+    min_gap = int(settings.WHISPER_VAD_MIN_SILENCE_SECONDS * sample_rate)
+    spans = []
+    for first, last in zip(edges[::2], edges[1::2]):
+        start = max(0, int(first) * frame - pad)
+        end = min(len(audio), int(last) * frame + pad)
+        if spans and start - spans[-1][1] < min_gap:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+    return [(start, end) for start, end in spans]
+
+
+def trim_non_speech(audio, sample_rate: int = whisper.audio.SAMPLE_RATE):
+    """
+    Cut silence, dead air and other non-speech regions out of audio before
+    it is transcribed, see speech_spans.
+
+    Audio without any voiced frame is returned unchanged; a recording that is
+    quieter than the detector expects is then still transcribed in full.
+
+    Args:
+        audio (np.ndarray): 16 kHz mono audio.
+
+    Returns:
+        tuple[np.ndarray, float]: The speech spans joined in playback order
+        and the number of seconds removed.
+    """
+    spans = speech_spans(audio, sample_rate)
+    kept = sum(end - start for start, end in spans)
+    if not spans or kept == len(audio):
+        return audio, 0.0
+    trimmed = np.concatenate([audio[start:end] for start, end in spans])
+    return trimmed, (len(audio) - kept) / sample_rate
+
+
+def find_split_points(audio, chunk_seconds: float, search_seconds: float, sample_rate: int = whisper.audio.SAMPLE_RATE):
+    """
+    Choose chunk boundaries at the quietest frame near every chunk_seconds mark.
+
+    Args:
+        audio (np.ndarray): 16 kHz mono audio.
+        chunk_seconds (float): Target chunk length.
+        search_seconds (float): How far around each target mark to look for silence.
+
+    Returns:
+        list[int]: Sample offsets of the chunk boundaries, including 0 and len(audio).
+    """
+    energy = frame_energy(audio, sample_rate)
+    frame = int(sample_rate * FRAME_SECONDS)
+    points = [0]
+    target = chunk_seconds
+    total_seconds = len(audio) / sample_rate
+    while target < total_seconds - search_seconds:
+        low = int((target - search_seconds) / FRAME_SECONDS)
+        high = min(int((target + search_seconds) / FRAME_SECONDS), len(energy))
+        window = energy[low:high]
+        if len(window):
+            split = (low + int(np.argmin(window))) * frame
+        else:
+            split = int(target * sample_rate)
+        if split > points[-1]:
+            points.append(split)
+        target = split / sample_rate + chunk_seconds
+    points.append(len(audio))
+    return points
+
+
+def split_audio(audio, chunk_seconds: float, overlap_seconds: float, sample_rate: int = whisper.audio.SAMPLE_RATE):
+    """
+    Split audio at silence boundaries into chunks that overlap their successor.
+
+    Returns:
+        list[np.ndarray]: Chunks in playback order.
+    """
+    points = find_split_points(audio, chunk_seconds, search_seconds=min(chunk_seconds / 4, 10.0), sample_rate=sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    return [audio[start:min(end + overlap, len(audio))] for start, end in zip(points, points[1:])]
+
+
+def _normalize_word(word: str):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def merge_transcripts(texts, max_overlap_words: int = 30):
+    """
+    Join chunk transcripts in order and drop words repeated across the overlap.
+
+    The longest run of words that ends one chunk and starts the next one
+    (compared without case and punctuation) is kept only once.
+
+    Args:
+        texts (list[str]): Chunk transcripts in playback order.
+        max_overlap_words (int): Longest overlap that is searched for.
+
+    Returns:
+        str: The stitched transcript.
+    """
+    merged = []
+    for text in texts:
+        words = text.split()
+        if merged and words:
+            tail = [_normalize_word(w) for w in merged[-max_overlap_words:]]
+            head = [_normalize_word(w) for w in words[:max_overlap_words]]
+            for size in range(min(len(tail), len(head)), 0, -1):
+                if tail[-size:] == head[:size]:
+                    words = words[size:]
+                    break
+        merged.extend(words)
+    return " ".join(merged)
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    global _worker_model
+    torch.set_num_threads(threads)
+    _worker_model = load_whisper_model(model_name)
+
+
+def _transcribe_chunk(audio, options=None):
+    return _worker_model.transcribe(audio, **(options or {}))["text"]
+
+
+def get_transcription_pool(model_name: str = None):
+    """
+    Return the process pool used for chunked transcription with one model.
+
+    There is one pool per model spec (e.g. "base" and "tiny:int8"), created
+    on first use. Every worker process loads the model once in its
+    initializer and splits the CPU allotment of this process evenly with the
+    other workers of its pool. Workers are spawned rather than forked so
+    they do not inherit torch thread state.
+    """
+    model_name = model_name or settings.WHISPER_MODEL
+    with _pool_lock:
+        if model_name not in _pools:
+            workers = settings.WHISPER_PARALLEL_WORKERS
+            threads = max(1, cpu_allotment() // workers)
+            _pools[model_name] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, threads))
+        return _pools[model_name]
+
+
+def transcribe_parallel(audio, model_name: str = None, profile: dict = None):
+    """
+    Transcribe long audio by splitting it at silence and running the chunks
+    in the process pool of the model. The pool workers share the CPU
+    allotment of this process, so the process-wide inference lock is held
+    while they run.
+
+    Args:
+        audio (np.ndarray): 16 kHz mono audio.
+        model_name (str): Whisper model spec, selects the pool.
+        profile (dict): Inference profile whose decoding options are used.
+
+    Returns:
+        dict: {"text": stitched transcript, "chunks": number of chunks}.
+    """
+    chunks = split_audio(audio, settings.WHISPER_CHUNK_SECONDS, settings.WHISPER_CHUNK_OVERLAP_SECONDS)
+    pool = get_transcription_pool(model_name)
+    options = decode_options(profile or get_profile())
+    with whisper_registry.inference_lock(model_name):
+        texts = list(pool.map(_transcribe_chunk, chunks, itertools.repeat(options)))
+    return {"text": merge_transcripts(texts), "chunks": len(chunks)}
@@ -1,9 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from .views import CreateQuizView, QuizListView, QuizDetailView
+from .views import (CreateQuizView, AsyncCreateQuizView, QuizListView, QuizDetailView, QuizJobDetailView, PipelineStatsView,
+                    QuizBatchCreateView, QuizBatchDetailView, MetricsView)
 
 
 urlpatterns = [
-    path('createQuiz/', CreateQuizView.as_view(), name='createQuiz'),
+    path('createQuiz/', (AsyncCreateQuizView if settings.QUIZ_ASYNC_VIEWS else CreateQuizView).as_view(),
+         name='createQuiz'),
+    path('createQuiz/batch/', QuizBatchCreateView.as_view(), name='createQuiz-batch'),
     path('quizzes/', QuizListView.as_view(), name='listquizzes'),
     path('quizzes/<int:pk>/', QuizDetailView.as_view(), name='listquizzes'),
+    path('jobs/<int:pk>/', QuizJobDetailView.as_view(), name='quizjob-detail'),
+    path('jobs/batch/<uuid:batch>/', QuizBatchDetailView.as_view(), name='quizjob-batch'),
+    path('stats/', PipelineStatsView.as_view(), name='pipeline-stats'),
+    path('metrics/', MetricsView.as_view(), name='pipeline-metrics'),
 ]
\ No newline at end of file
@@ -1,15 +1,36 @@
 from rest_framework.views import APIView
-from .seralizers import  QuizSerializer, QuizListSeralizer
-from quiz_app.models import Quiz, Question
+import json
+import uuid
+from abc import ABC, abstractmethod
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.exceptions import APIException
+from django.conf import settings
+from .seralizers import  QuizSerializer, QuizListSeralizer, QuizJobSerializer, QuizBatchJobSerializer
+from quiz_app.models import Quiz, QuizJob
 from rest_framework.response import Response
-from .helper import video_download, transcripts_Audio_to_Text, create_Quiz_with_GeminiAPI, check_url_format
-from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.generics import  ListAPIView, RetrieveUpdateDestroyAPIView
+from .helper import check_url_format, check_whisper_profile
+from .pipeline import generate_quiz, agenerate_quiz, QuizPipelineError
+from .jobs import enqueue_job, enqueue_batch
+from .result_cache import cache_stats
+from .transcription import whisper_registry, profile_stats
+from .metrics import span, render_metrics
+from .snapshots import ROW_FIELDS, quiz_payload, quiz_payloads, refresh_snapshot
+from .read_cache import (etag_matches, get_cached_read, not_modified, quiz_detail_etag, quiz_list_etag,
+                         read_version, store_read)
 from rest_framework import status
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.generics import  ListAPIView, RetrieveUpdateDestroyAPIView, RetrieveAPIView
 from django.shortcuts import get_object_or_404
-from .permission import isOwnerFromTheQuiz
-from rest_framework.exceptions import ValidationError
+from django.http import HttpResponse
+from .permission import isOwnerFromTheQuiz, HasMetricsToken
+from .pagination import QuizCursorPagination
+from auth_app.authentication import CookieJWTAuthentication
 
 class CreateQuizView(APIView):
     """
@@ -36,61 +57,364 @@ class CreateQuizView(APIView):
 
         Request Data:
             - url (str): YouTube video URL (must start with 'https://www.youtube.com/watch?v=')
+            - async (bool): Optional, queue a background job instead of waiting for the quiz.
+            - whisper_profile (str): Optional Whisper inference profile
+              (e.g. "fast" or "accurate"), defaults to WHISPER_PROFILE.
 
         Responses:
             - 201 Created: Quiz successfully created with questions.
-            - 400 Bad Request: URL missing, invalid URL, or download/transcription failed.
+            - 202 Accepted: Quiz job queued (only with "async": true), poll jobs/<id>/.
+            - 400 Bad Request: URL missing, invalid URL, unknown whisper_profile,
+              or download/transcription failed.
             - 401 UNAUTHORIZED: only a registed user is allowed to create Quizz
         """
         url = request.data.get('url')
-        check_url_format(str(url))
-
-        audio_data = video_download(str(url))
-        if audio_data:
-            transcripted_text = transcripts_Audio_to_Text(audio_data)
-        else:
-          return Response({"Download failed"}, status=status.HTTP_400_BAD_REQUEST)
-
-        quiz_json = create_Quiz_with_GeminiAPI(transcripted_text)
-        serializer = QuizSerializer(data=quiz_json)
-        serializer.is_valid(raise_exception=True)
-        quiz_instance = serializer.save(video_url=url, user=request.user)
-
-        for q in quiz_json.get("questions", []):
-            Question.objects.create(
-                quizz=quiz_instance,
-                question_title=q["question_title"],
-                question_options=q["question_options"],
-                answer=q["answer"])
-        serializer_with_questions = QuizSerializer(quiz_instance)
-        return Response(serializer_with_questions.data,status=status.HTTP_201_CREATED)
-
-class QuizListView(ListAPIView):
+        whisper_profile = request.data.get('whisper_profile') or None
+        invalid_profile = check_whisper_profile(whisper_profile)
+        if invalid_profile is not None:
+            return invalid_profile
+        invalid_url = check_url_format(url)
+        if invalid_url is not None:
+            return invalid_url
+        if self.is_async_request(request):
+            return Response(queue_quiz_job(request.user, url, whisper_profile), status=status.HTTP_202_ACCEPTED)
+
+        try:
+            quiz_instance = generate_quiz(url, request.user, whisper_profile=whisper_profile)
+        except QuizPipelineError:
+            return Response({"Download failed"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with span("serialize"):
+            serializer_with_questions = QuizSerializer(quiz_instance)
+            data = serializer_with_questions.data
+        return Response(data,status=status.HTTP_201_CREATED)
+
+    def is_async_request(self, request):
+        """
+        Return True if the client asked for a background job, either with
+        "async": true in the body or ?async=true in the query string.
+        """
+        return is_true(request.data.get('async', request.query_params.get('async', False)))
+
+
+def is_true(value):
+    """
+    Interpret a boolean flag sent as JSON value or query/form string.
+    """
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def queue_quiz_job(user, url: str, whisper_profile: str = None):
+    """
+    Create a background quiz job for a validated URL and hand it to the
+    worker pool.
+
+    Returns:
+        dict: Serialized job for the 202 response.
+    """
+    job = QuizJob.objects.create(user=user, video_url=url, whisper_profile=whisper_profile or "")
+    enqueue_job(job)
+    return QuizJobSerializer(job).data
+
+
+def authenticate_request(request):
+    """
+    Run the configured DRF authenticators for a plain Django request.
+
+    Returns:
+        User | None: The authenticated user, or None if the request is
+        anonymous or its credentials are invalid.
+    """
+    drf_request = Request(request, authenticators=[
+        authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+def serialize_quiz(quiz_instance):
+    return QuizSerializer(quiz_instance).data
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCreateQuizView(View):
+    """
+    Async variant of CreateQuizView for deployments behind an ASGI server,
+    enabled with settings.QUIZ_ASYNC_VIEWS.
+
+    Waiting for YouTube and Gemini is awaited on the event loop and Whisper
+    runs in a bounded thread pool, so one process can keep hundreds of
+    creations in flight without a thread per request. Request data, status
+    codes and response bodies match CreateQuizView.
+
+    Permissions:
+        - User must be authenticated.
+    """
+
+    async def post(self, request):
+        """
+        Handle POST request to create a quiz, see CreateQuizView.post.
+        """
+        user = await sync_to_async(authenticate_request)(request)
+        if user is None:
+            response = JsonResponse({'detail': "Authentication credentials were not provided."},
+                                    status=status.HTTP_401_UNAUTHORIZED)
+            response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+
+        data = self.request_data(request)
+        if data is None:
+            return JsonResponse({'detail': "JSON parse error"}, status=status.HTTP_400_BAD_REQUEST)
+        url = data.get('url')
+        invalid_url = check_url_format(url)
+        if invalid_url is not None:
+            return JsonResponse(invalid_url.data, status=invalid_url.status_code)
+        whisper_profile = data.get('whisper_profile') or None
+        invalid_profile = check_whisper_profile(whisper_profile)
+        if invalid_profile is not None:
+            return JsonResponse(invalid_profile.data, status=invalid_profile.status_code)
+
+        if is_true(data.get('async', request.GET.get('async', False))):
+            job = await sync_to_async(queue_quiz_job)(user, url, whisper_profile)
+            return JsonResponse(job, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            quiz_instance = await agenerate_quiz(url, user, whisper_profile)
+        except QuizPipelineError:
+            return JsonResponse(["Download failed"], status=status.HTTP_400_BAD_REQUEST, safe=False)
+
+        with span("serialize"):
+            data = await sync_to_async(serialize_quiz)(quiz_instance)
+        return JsonResponse(data, status=status.HTTP_201_CREATED)
+
+    def request_data(self, request):
+        """
+        Return the JSON or form body as a dict, or None if the JSON is invalid.
+        """
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return None
+            return data if isinstance(data, dict) else None
+        return request.POST
+
+class QuizBatchCreateView(APIView):
+    """
+    API view to create quizzes for many YouTube URLs at once.
+
+    Permissions:
+        - User must be authenticated.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Handle POST request to queue a batch of quizzes:
+
+        Steps:
+            1. Validate every URL on its own.
+            2. Create one background job per valid URL, grouped by a batch id.
+            3. Run the jobs through the staged download/transcribe/generate pipeline.
+            4. Return the batch id together with one entry per URL.
+
+        Request Data:
+            - urls (list[str]): YouTube video URLs.
+            - whisper_profile (str): Optional Whisper inference profile for every URL.
+
+        Responses:
+            - 202 Accepted: Batch queued. Every entry holds either the job or
+              the error of its URL. Poll jobs/batch/<batch>/ for progress.
+            - 400 Bad Request: urls missing, empty or above QUIZ_BATCH_MAX_URLS,
+              or unknown whisper_profile.
+            - 401 UNAUTHORIZED: only a registed user is allowed to create Quizz
+        """
+        urls = request.data.get('urls')
+        if not isinstance(urls, list) or not urls:
+            return Response({'detail': "urls must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(urls) > settings.QUIZ_BATCH_MAX_URLS:
+            return Response({'detail': f"At most {settings.QUIZ_BATCH_MAX_URLS} urls per batch"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        whisper_profile = request.data.get('whisper_profile') or ""
+        invalid_profile = check_whisper_profile(whisper_profile or None)
+        if invalid_profile is not None:
+            return invalid_profile
+
+        batch = uuid.uuid4()
+        results = []
+        jobs = []
+        for url in urls:
+            invalid_url = check_url_format(url)
+            if invalid_url is not None:
+                results.append({'video_url': url, 'error': invalid_url.data['detail']})
+                continue
+            job = QuizJob.objects.create(user=request.user, video_url=url, batch=batch,
+                                         whisper_profile=whisper_profile)
+            jobs.append(job)
+            results.append(QuizBatchJobSerializer(job).data)
+
+        enqueue_batch([job.pk for job in jobs])
+        return Response({'batch': batch, 'jobs': results}, status=status.HTTP_202_ACCEPTED)
+
+
+class QuizBatchDetailView(ListAPIView):
+    """
+    API view to poll every job of a batch with its individual result.
+    Only jobs that belong to the current user are returned.
+    """
+    serializer_class = QuizBatchJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return QuizJob.objects.filter(user=self.request.user, batch=self.kwargs['batch']).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if not queryset.exists():
+            return Response({'detail': "Batch not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+
+class ConditionalReadMixin(ABC):
+    """
+    Serve GET requests with strong ETags and a per-user cache of the rendered JSON.
+
+    Behavior:
+        - A cached payload for the same user, URL and cache version is
+          returned as is, or as 304 Not Modified when the client sends its
+          ETag in If-None-Match. Neither touches the ORM or the serializers.
+        - On a miss the ETag is computed from the quiz and question
+          timestamps first (get_etag), so a matching If-None-Match is still
+          answered with 304 without serializing anything.
+        - Otherwise the response is built as usual, rendered once and cached
+          in the "quiz_reads" cache.
+        - Saving or deleting a quiz or question changes the owner's cache
+          version, see quiz_app.signals.
+
+    Only JSON responses are cached, the browsable API is served as before.
+    """
+
+    read_cache = None
+
+    def get(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+
+        user_id = request.user.pk
+        variant = request.get_full_path()
+        version = read_version(user_id)
+        cached = get_cached_read(request, user_id, version, variant)
+        if cached is not None:
+            return cached
+
+        etag = self.get_etag(variant)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        self.read_cache = (user_id, version, variant, etag)
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.read_cache is not None:
+            response = store_read(response, *self.read_cache)
+        return response
+
+    @abstractmethod
+    def get_etag(self, variant: str):
+        """
+        Return the strong ETag of the response for this URL variant.
+
+        Computed from the quiz and question timestamps without serializing,
+        see quiz_app.api.read_cache.
+
+        Args:
+            variant (str): Full path of the request, including the query.
+
+        Returns:
+            str: The quoted ETag.
+        """
+
+
+class QuizListView(ConditionalReadMixin, ListAPIView):
     """
     API view to list all quizzes created by the authenticated user.
     Only quizzes that belong to the current user are returned.
+
+    Query Parameters:
+        - page_size (int) / cursor (str): Optional, return one page of quizzes,
+          newest first, with "next" and "previous" links. Without them the
+          full list is returned as before.
+        - fields (str): Optional, comma separated quiz fields to return.
+        - include (str): "questions" adds the questions when "fields" is used.
+
+    Responses carry an ETag and repeated reads are served from the per-user
+    cache, see ConditionalReadMixin.
     """
     serializer_class = QuizListSeralizer
     permission_classes = [IsAuthenticated]
+    pagination_class = QuizCursorPagination
 
-    def list(self, request):
+    def get_queryset(self):
         """
-        Handle GET request to retrieve a list of quizzes:
+        Build the quiz queryset for the list:
 
         1. Get the currently authenticated user.
         2. Filter quizzes so only those created by this user are included.
-        3. Serialize the filtered quiz queryset.
-        4. Return the serialized quiz data as a response.
+
+        Only the columns of the read rows are fetched as .values(), the
+        questions come from the quiz snapshots.
         """
-        user = request.user
-        queryset = Quiz.objects.filter(user=user)
-        serializer = QuizListSeralizer(queryset, many=True)
-        return Response(serializer.data)
+        return Quiz.objects.filter(user=self.request.user).values(*ROW_FIELDS)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Return the quizzes from their stored snapshots, so the list is a
+        single query on the quiz table. Missing snapshots are rebuilt first
+        and ?fields= is applied to the snapshots, see snapshots.quiz_payloads.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        data = quiz_payloads(page if page is not None else list(queryset), self.requested_fields())
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def requested_fields(self):
+        """
+        Return the field names requested with ?fields= and ?include=, or None
+        if the client asked for the full representation.
+        """
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        requested = [name.strip() for name in fields.split(',') if name.strip()]
+        if 'questions' in self.request.query_params.get('include', '').split(','):
+            requested.append('questions')
+        return requested
+
+    def get_etag(self, variant: str):
+        return quiz_list_etag(self.request.user, variant)
+
+    def paginate_queryset(self, queryset):
+        """
+        Paginate only when the client sends a cursor or a page size, so
+        existing clients keep receiving a plain list.
+        """
+        paginator = self.paginator
+        params = self.request.query_params
+        if paginator.cursor_query_param not in params and paginator.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset)
     
-class QuizDetailView(RetrieveUpdateDestroyAPIView):
+class QuizDetailView(ConditionalReadMixin, RetrieveUpdateDestroyAPIView):
     """
     API view to retrieve, update, or delete a specific quiz.
     Access is restricted to the authenticated owner of the quiz.
+    Reads carry an ETag and are cached per user, see ConditionalReadMixin.
     """
 
     serializer_class = QuizListSeralizer    
@@ -104,12 +428,33 @@ class QuizDetailView(RetrieveUpdateDestroyAPIView):
         2. Attempt to fetch the quiz from the database.
         3. Check if the requesting user has permission to access this quiz.
         4. Return the quiz object if all checks pass.
+
+        The quiz is loaded once per request, a GET reuses the object from
+        get_etag.
         """
+        if getattr(self, 'quiz', None) is not None:
+            return self.quiz
 
         pk = self.kwargs.get('pk')
         obj = get_object_or_404(Quiz, pk=pk)
         self.check_object_permissions(self.request, obj)
+        self.quiz = obj
         return obj
+
+    def get_etag(self, variant: str):
+        return quiz_detail_etag(self.get_object(), variant)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Return the quiz from its stored snapshot, a single-row fetch.
+        """
+        return Response(quiz_payload(self.get_object()))
+
+    def perform_update(self, serializer):
+        """
+        Save the changes and store the new snapshot of the quiz.
+        """
+        refresh_snapshot(serializer.save())
     
     def destroy(self, request, *args, **kwargs):
         """
@@ -125,4 +470,70 @@ class QuizDetailView(RetrieveUpdateDestroyAPIView):
         user = request.user
         obj = get_object_or_404(Quiz, pk=pk)
         self.perform_destroy(obj)
-        return Response({"detail": "delete successfully"},status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response({"detail": "delete successfully"},status=status.HTTP_204_NO_CONTENT)
+
+
+class QuizJobDetailView(RetrieveAPIView):
+    """
+    API view to poll the status of a background quiz job.
+    Access is restricted to the authenticated owner of the job.
+    """
+
+    serializer_class = QuizJobSerializer
+    permission_classes = [IsAuthenticated, isOwnerFromTheQuiz]
+
+    def get_object(self):
+        """
+        Retrieve the job object based on the provided primary key (pk):
+
+        1. Extract the job ID from the URL parameters.
+        2. Attempt to fetch the job from the database.
+        3. Check if the requesting user has permission to access this job.
+        4. Return the job object if all checks pass.
+        """
+
+        pk = self.kwargs.get('pk')
+        obj = get_object_or_404(QuizJob.objects.select_related('quiz'), pk=pk)
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class PipelineStatsView(APIView):
+    """
+    API view exposing the in-process counters of the quiz pipeline.
+    Access is restricted to staff users.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Return the per-video result cache counters, the resident Whisper
+        models and the transcriptions per Whisper profile of the worker
+        process that handled the request.
+        """
+        return Response({
+            "result_cache": cache_stats(),
+            "whisper_models": whisper_registry.stats(),
+            "whisper_profiles": profile_stats(),
+        })
+
+
+class MetricsView(APIView):
+    """
+    API view exposing the pipeline histograms in the Prometheus text format.
+    Access is restricted to staff users or scrapers with settings.METRICS_TOKEN.
+    Only the cookie login is used to authenticate users, so the scraper's
+    bearer token is not mistaken for a JWT.
+    """
+
+    authentication_classes = [CookieJWTAuthentication]
+    permission_classes = [HasMetricsToken | IsAdminUser]
+
+    def get(self, request):
+        """
+        Return stage durations, audio durations, transcript lengths and
+        Gemini token counts recorded by the worker process that handled
+        the request.
+        """
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
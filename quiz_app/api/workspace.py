@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # no lock files, sweep_workspace falls back to the age alone
+    fcntl = None
+
+LOCK_NAME = ".lock"
+
+
+class WorkspaceFullError(Exception):
+    """
+    Raised when the audio workspace is over its disk cap even after
+    removing stale job directories.
+    """
+
+
+def workspace_usage(root: str = None):
+    """
+    Return the number of bytes used by all files below the workspace root.
+    """
+    root = root or settings.AUDIO_WORKSPACE_ROOT
+    total = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+def _lock_directory(path: str):
+    """
+    Hold an exclusive lock on the lock file of a job directory for as long
+    as the returned file stays open. The operating system drops the lock
+    when the process dies.
+    """
+    if fcntl is None:
+        return None
+    lock = open(os.path.join(path, LOCK_NAME), "w")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def is_live(path: str):
+    """
+    Return True if a running job still holds the lock of a job directory.
+    """
+    if fcntl is None:
+        return False
+    try:
+        lock = open(os.path.join(path, LOCK_NAME))
+    except OSError:
+        return False
+    with lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        return False
+
+
+def sweep_workspace(root: str = None, max_age: float = None):
+    """
+    Remove job directories that are older than max_age seconds and no
+    longer belong to a running job.
+
+    Job directories are deleted by their own job when it finishes and are
+    locked while it runs, see audio_workspace. An old directory can still be
+    live, e.g. audio that waits for its turn in the transcribe stage, so only
+    unlocked ones are treated as left behind by a crashed worker.
+
+    Args:
+        root (str): Workspace root, defaults to settings.AUDIO_WORKSPACE_ROOT.
+        max_age (float): Age in seconds, defaults to settings.AUDIO_WORKSPACE_MAX_AGE.
+
+    Returns:
+        int: Number of removed directories.
+    """
+    root = root or settings.AUDIO_WORKSPACE_ROOT
+    max_age = settings.AUDIO_WORKSPACE_MAX_AGE if max_age is None else max_age
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for entry in os.scandir(root):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff and not is_live(entry.path):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+@contextmanager
+def audio_workspace():
+    """
+    Provide a private temporary directory for the audio of one job.
+
+    Behavior:
+        - Every job gets its own directory, so concurrent downloads can never
+          pick up each other's files.
+        - The directory and everything in it is removed when the block
+          exits, also on errors. Until then it is locked, so sweeps leave it
+          alone however long the job waits.
+        - If the workspace is over settings.AUDIO_WORKSPACE_MAX_BYTES, stale
+          directories are swept first; if that is not enough the job is
+          refused instead of deleting files of running jobs.
+
+    Yields:
+        str: Path of the job directory.
+
+    Raises:
+        WorkspaceFullError: If the disk cap is still exceeded after the sweep.
+    """
+    root = settings.AUDIO_WORKSPACE_ROOT
+    os.makedirs(root, exist_ok=True)
+    if workspace_usage(root) > settings.AUDIO_WORKSPACE_MAX_BYTES:
+        sweep_workspace(root)
+        if workspace_usage(root) > settings.AUDIO_WORKSPACE_MAX_BYTES:
+            raise WorkspaceFullError("Audio workspace is full")
+
+    path = tempfile.mkdtemp(prefix="job-", dir=root)
+    lock = _lock_directory(path)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+        if lock is not None:
+            lock.close()
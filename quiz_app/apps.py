@@ -1,5 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class QuizAppConfig(AppConfig):
     name = 'quiz_app'
+
+    def ready(self):
+        """
+        Connect the read cache signals, see quiz_app.signals.
+
+        Load the configured Whisper models once per worker process when
+        WHISPER_WARM_ON_STARTUP is enabled, so the first quiz does not pay
+        for model initialization.
+        """
+        from . import signals
+        if settings.WHISPER_WARM_ON_STARTUP:
+            from .api.transcription import whisper_registry
+            whisper_registry.warm()
@@ -0,0 +1,352 @@
+import asyncio
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+from quiz_app.models import Quiz
+from quiz_app.api import gemini
+from quiz_app.api.pipeline import save_quiz
+from quiz_app.api.read_serializers import QUIZ_VALUE_FIELDS, question_rows, represent_quiz
+from quiz_app.api.renderers import FastJSONRenderer
+from quiz_app.api.seralizers import QuizListSeralizer
+from quiz_app.api.snapshots import ROW_FIELDS, quiz_payloads
+
+ENDPOINTS = ("login", "refresh", "createQuiz", "quizzes", "quiz_detail")
+BENCHMARK_PASSWORD = "benchmark-pass"
+
+_video_ids = itertools.count()
+
+
+def fake_quiz_payload(seed: str = "benchmark", questions: int = 10):
+    """
+    Return a valid quiz payload, ten questions by default, as Gemini would.
+    """
+    return {
+        "title": f"Quiz {seed}",
+        "description": "Generated by the benchmark",
+        "summary": "Benchmark summary",
+        "questions": [
+            {
+                "question_title": f"Question {i} of {seed}?",
+                "question_options": ["A", "B", "C", "D"],
+                "answer": "A",
+            }
+            for i in range(questions)
+        ],
+    }
+
+
+class FakeYoutubeDL:
+    """
+    Stand-in for yt_dlp.YoutubeDL that answers after a fixed delay.
+
+    extract_info returns a minimal info dict without captions, and
+    process_ie_result writes a small audio file into the output template.
+    """
+
+    info_latency = 0.0
+    download_latency = 0.0
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @staticmethod
+    def sanitize_info(info, remove_private_keys=False):
+        return info
+
+    def extract_info(self, url, download=False):
+        time.sleep(self.info_latency)
+        return {"id": url.rsplit("=", 1)[-1], "duration": 600, "language": "en",
+                "subtitles": {}, "automatic_captions": {}}
+
+    def process_ie_result(self, info, download=True):
+        time.sleep(self.download_latency)
+        path = self.params["outtmpl"] % {"ext": "webm"}
+        with open(path, "wb") as audio:
+            audio.write(b"\0" * 1024)
+        return info
+
+
+class FakeGeminiClient:
+    """
+    Stand-in for genai.Client whose generate_content (sync and client.aio)
+    answers every prompt with a valid quiz after a fixed delay.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.models = self
+        self.aio = mock.Mock(models=mock.Mock(generate_content=self.agenerate_content))
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.latency)
+        return self.response(contents)
+
+    async def agenerate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.latency)
+        return self.response(contents)
+
+    def response(self, contents):
+        return mock.Mock(text=json.dumps(fake_quiz_payload(str(len(contents)))), usage_metadata=None)
+
+
+@contextmanager
+def fake_external_stages(info_ms: float = 0, download_ms: float = 0, transcribe_ms: float = 0, gemini_ms: float = 0):
+    """
+    Replace yt_dlp, Whisper and the Gemini client with deterministic fakes.
+
+    Everything between the fakes (helpers, pipeline, ORM, serializers, views)
+    runs for real. Captions and in-memory decoding are disabled so every
+    createQuiz request takes the download -> Whisper -> Gemini path, and the
+    audio files go to a temporary workspace.
+
+    Args:
+        info_ms (float): Latency of the yt-dlp extraction.
+        download_ms (float): Latency of the audio download.
+        transcribe_ms (float): Latency of Whisper.
+        gemini_ms (float): Latency of every Gemini request.
+    """
+    def fake_transcribe_file(audio_path, model_name=None, profile=None):
+        time.sleep(transcribe_ms / 1000)
+        return {"text": "Benchmark transcript. " * 50}
+
+    fake_ydl = type("BenchmarkYoutubeDL", (FakeYoutubeDL,),
+                    {"info_latency": info_ms / 1000, "download_latency": download_ms / 1000})
+    with ExitStack() as stack:
+        workspace = stack.enter_context(tempfile.TemporaryDirectory(prefix="quiz-benchmark-"))
+        stack.enter_context(override_settings(
+            TRANSCRIPT_SOURCES=["whisper"], AUDIO_DECODE_IN_MEMORY=False, AUDIO_WORKSPACE_ROOT=workspace))
+        stack.enter_context(mock.patch("yt_dlp.YoutubeDL", fake_ydl))
+        stack.enter_context(mock.patch("quiz_app.api.helper.transcribe_file", fake_transcribe_file))
+        stack.enter_context(mock.patch("quiz_app.api.gemini.get_client",
+                                       return_value=FakeGeminiClient(gemini_ms / 1000)))
+        stack.callback(gemini.reset_client)
+        yield
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Point the default connection to a new test database for the duration
+    of the block and drop it afterwards. SQLite uses a temporary file, so
+    concurrent clients do not share one in-memory connection.
+    """
+    setup_test_environment()
+    with tempfile.TemporaryDirectory(prefix="quiz-benchmark-db-") as directory:
+        if connection.vendor == "sqlite":
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(directory, "benchmark.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def percentile(values, p: float):
+    """
+    Return the p-th percentile of values with linear interpolation.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class BenchmarkUser:
+    """
+    One simulated client: a user account with its own cookie jar and quizzes.
+    """
+
+    def __init__(self, index: int, seed_quizzes: int):
+        username = f"benchmark-{index}"
+        self.user, _ = User.objects.get_or_create(username=username, defaults={"email": f"{username}@example.com"})
+        self.user.set_password(BENCHMARK_PASSWORD)
+        self.user.save()
+        self.client = Client()
+        self.quiz_ids = [save_quiz(fake_quiz_payload(f"{username}-{i}"), next_video_url(), self.user).pk
+                         for i in range(seed_quizzes)]
+        self.login()
+
+    def login(self):
+        return self.client.post("/api/login/", {"username": self.user.username, "password": BENCHMARK_PASSWORD},
+                                content_type="application/json")
+
+    def call(self, endpoint: str, number: int):
+        if endpoint == "login":
+            return self.login()
+        if endpoint == "refresh":
+            refresh_token = self.client.cookies["refresh_token"].value
+            return self.client.post("/api/token/refresh/", HTTP_AUTHORIZATION=f"Bearer {refresh_token}")
+        if endpoint == "createQuiz":
+            return self.client.post("/api/createQuiz/", {"url": next_video_url()}, content_type="application/json")
+        if endpoint == "quizzes":
+            return self.client.get("/api/quizzes/")
+        if endpoint == "quiz_detail":
+            return self.client.get(f"/api/quizzes/{self.quiz_ids[number % len(self.quiz_ids)]}/")
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def next_video_url():
+    """
+    Return the URL of a video that was never requested before, so
+    createQuiz never hits the result cache.
+    """
+    return f"https://www.youtube.com/watch?v={next(_video_ids):011d}"
+
+
+def timed_call(benchmark_user: BenchmarkUser, endpoint: str, number: int):
+    """
+    Run one request and return (seconds, queries, ok).
+    """
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        try:
+            response = benchmark_user.call(endpoint, number)
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+    return elapsed, len(queries), ok
+
+
+def run_client(benchmark_user: BenchmarkUser, endpoint: str, numbers):
+    """
+    Send the requests of one client in order on its own thread and close
+    the thread's database connection afterwards.
+    """
+    try:
+        return [timed_call(benchmark_user, endpoint, number) for number in numbers]
+    finally:
+        connection.close()
+
+
+def summarize(endpoint: str, samples, wall: float):
+    """
+    Turn the (seconds, queries, ok) samples of one endpoint into a report row.
+    """
+    latencies = [seconds * 1000 for seconds, _, _ in samples]
+    queries = [count for _, count, _ in samples]
+    return {
+        "endpoint": endpoint,
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "throughput": round(len(samples) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "queries_mean": round(sum(queries) / len(queries), 2) if queries else 0.0,
+        "queries_max": max(queries, default=0),
+    }
+
+
+def run_benchmark(endpoints=ENDPOINTS, requests: int = 50, concurrency: int = 4, seed_quizzes: int = 10):
+    """
+    Drive the API endpoints and measure them one after another.
+
+    Behavior:
+        - Creates one user per concurrent client, seeds it with quizzes and
+          logs it in, so every client has its own cookies.
+        - Sends requests calls per endpoint, spread over the clients. Every
+          client runs on its own thread and sends its requests one after
+          another. With concurrency 1 everything runs in the calling thread.
+        - Counts the queries of every request on the connection of the
+          thread that ran it.
+
+    Meant to run inside fake_external_stages and throwaway_database, see
+    the benchmark_api management command.
+
+    Returns:
+        list[dict]: One report row per endpoint, see summarize.
+    """
+    users = [BenchmarkUser(index, max(1, seed_quizzes)) for index in range(concurrency)]
+    report = []
+    for endpoint in endpoints:
+        numbers = [range(index, requests, concurrency) for index in range(concurrency)]
+        start = time.perf_counter()
+        if concurrency == 1:
+            samples = [timed_call(users[0], endpoint, number) for number in numbers[0]]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as pool:
+                results = pool.map(lambda index: run_client(users[index], endpoint, numbers[index]), range(concurrency))
+                samples = [sample for client_samples in results for sample in client_samples]
+        report.append(summarize(endpoint, samples, time.perf_counter() - start))
+    return report
+
+
+
+SERIALIZER_PATHS = ("drf", "values", "snapshot")
+
+
+def render_quiz_list(path: str, user):
+    """
+    Render the full quiz list of a user the way one of the read paths does.
+
+    Paths:
+        - drf: prefetched model instances, QuizListSeralizer, JSONRenderer.
+        - values: .values() rows, read_serializers, FastJSONRenderer.
+        - snapshot: stored snapshots as served by QuizListView.
+    """
+    queryset = Quiz.objects.filter(user=user).order_by('-created_at', '-id')
+    if path == "drf":
+        return JSONRenderer().render(QuizListSeralizer(queryset.prefetch_related('questions'), many=True).data)
+    if path == "values":
+        rows = list(queryset.values(*QUIZ_VALUE_FIELDS))
+        questions = question_rows([row['id'] for row in rows])
+        return FastJSONRenderer().render([represent_quiz(row, questions[row['id']]) for row in rows])
+    if path == "snapshot":
+        return FastJSONRenderer().render(quiz_payloads(list(queryset.values(*ROW_FIELDS))))
+    raise ValueError(f"Unknown path {path}")
+
+
+def run_serializer_benchmark(quizzes: int = 200, questions: int = 10, repeat: int = 20):
+    """
+    Compare the quiz list read paths on one user with the given number of
+    quizzes. Every path is run repeat times after one warm-up call; the
+    median includes the database queries of the path.
+
+    Meant to run inside throwaway_database, see the benchmark_serializers
+    management command.
+
+    Returns:
+        list[dict]: One row per path with the median and best time in ms,
+        the speedup over "drf", the response size and whether the bytes
+        equal the "drf" output.
+    """
+    user = User.objects.create_user(username="serializer-benchmark")
+    for i in range(quizzes):
+        save_quiz(fake_quiz_payload(f"serializer-{i}", questions), next_video_url(), user)
+
+    expected = render_quiz_list("drf", user)
+    report = []
+    for path in SERIALIZER_PATHS:
+        body = render_quiz_list(path, user)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render_quiz_list(path, user)
+            timings.append((time.perf_counter() - start) * 1000)
+        report.append({"path": path, "median_ms": round(percentile(timings, 50), 3),
+                       "best_ms": round(min(timings), 3), "bytes": len(body), "identical": body == expected})
+    baseline = report[0]["median_ms"]
+    for row in report:
+        row["speedup"] = round(baseline / row["median_ms"], 2) if row["median_ms"] else 0.0
+    return report
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz_app.api.snapshots import backfill_snapshots
+
+
+class Command(BaseCommand):
+    """
+    Store the read snapshot of quizzes created before snapshots existed, or
+    after Quiz.SNAPSHOT_VERSION was bumped. Until then such quizzes get
+    their snapshot rebuilt by the first read that needs it.
+    """
+
+    help = "Build missing or outdated quiz snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Quizzes per batch.")
+        parser.add_argument('--all', action='store_true', help="Rebuild current snapshots as well.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        written = backfill_snapshots(batch_size=options['batch_size'], rebuild_all=options['all'])
+        self.stdout.write(f"Stored {written} quiz snapshot(s).")
@@ -0,0 +1,64 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from quiz_app.management.benchmark import ENDPOINTS, fake_external_stages, run_benchmark, throwaway_database
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the API offline with stubbed external stages.
+
+    yt-dlp, Whisper and Gemini are replaced with fakes of fixed latency, so
+    the numbers only move when our own code (views, pipeline, ORM,
+    serializers, authentication) gets faster or slower. Runs against a
+    throwaway test database and never touches the real one.
+    """
+
+    help = "Benchmark the API endpoints with fake yt-dlp, Whisper and Gemini stages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', default=",".join(ENDPOINTS),
+                            help=f"Comma separated endpoints, any of {', '.join(ENDPOINTS)}.")
+        parser.add_argument('--requests', type=int, default=50, help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent clients.")
+        parser.add_argument('--seed-quizzes', type=int, default=10, help="Quizzes created per client beforehand.")
+        parser.add_argument('--info-ms', type=float, default=20, help="Latency of the fake yt-dlp extraction.")
+        parser.add_argument('--download-ms', type=float, default=50, help="Latency of the fake audio download.")
+        parser.add_argument('--transcribe-ms', type=float, default=100, help="Latency of the fake Whisper.")
+        parser.add_argument('--gemini-ms', type=float, default=100, help="Latency of every fake Gemini request.")
+        parser.add_argument('--max-p95-ms', type=float, default=None,
+                            help="Fail if the p95 latency of any endpoint is above this value.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--requests and --concurrency must be at least 1")
+
+        report = self.run(endpoints, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.write_table(report)
+
+        limit = options['max_p95_ms']
+        slow = [row['endpoint'] for row in report if limit is not None and row['p95_ms'] > limit]
+        if slow:
+            raise CommandError(f"p95 above {limit} ms: {', '.join(slow)}")
+
+    def run(self, endpoints, options):
+        with throwaway_database(), fake_external_stages(options['info_ms'], options['download_ms'],
+                                                        options['transcribe_ms'], options['gemini_ms']):
+            return run_benchmark(endpoints, options['requests'], options['concurrency'], options['seed_quizzes'])
+
+    def write_table(self, report):
+        header = f"{'endpoint':<12} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in report:
+            self.stdout.write(
+                f"{row['endpoint']:<12} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8} "
+                f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['queries_mean']:>8}")
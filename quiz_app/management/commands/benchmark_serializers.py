@@ -0,0 +1,43 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from quiz_app.management.benchmark import run_serializer_benchmark, throwaway_database
+
+
+class Command(BaseCommand):
+    """
+    Micro-benchmark of the quiz list read path.
+
+    Renders the same quiz list through DRF's ModelSerializer and
+    JSONRenderer, through the .values() read serializers with the orjson
+    renderer, and from the stored snapshots, and checks that all three
+    produce identical bytes. Runs against a throwaway test database.
+    """
+
+    help = "Compare the DRF, .values() and snapshot paths of the quiz list."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizzes', type=int, default=200, help="Quizzes of the benchmark user.")
+        parser.add_argument('--questions', type=int, default=10, help="Questions per quiz.")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed renders per path.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        if min(options['quizzes'], options['questions'], options['repeat']) < 1:
+            raise CommandError("--quizzes, --questions and --repeat must be at least 1")
+
+        with throwaway_database():
+            report = run_serializer_benchmark(options['quizzes'], options['questions'], options['repeat'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            header = f"{'path':<10} {'median ms':>10} {'best ms':>9} {'speedup':>8} {'bytes':>9} {'identical':>10}"
+            self.stdout.write(header)
+            self.stdout.write("-" * len(header))
+            for row in report:
+                self.stdout.write(f"{row['path']:<10} {row['median_ms']:>10} {row['best_ms']:>9} {row['speedup']:>8} "
+                                  f"{row['bytes']:>9} {str(row['identical']):>10}")
+
+        different = [row['path'] for row in report if not row['identical']]
+        if different:
+            raise CommandError(f"Output differs from the DRF path: {', '.join(different)}")
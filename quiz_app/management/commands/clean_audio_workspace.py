@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from quiz_app.api.workspace import sweep_workspace, workspace_usage
+
+
+class Command(BaseCommand):
+    """
+    Remove audio job directories left behind by crashed workers.
+
+    Meant to run periodically (e.g. from cron) next to the sweep that
+    audio_workspace() performs when the disk cap is reached.
+    """
+
+    help = "Remove stale audio job directories."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=float, default=None,
+                            help="Age in seconds, defaults to AUDIO_WORKSPACE_MAX_AGE.")
+
+    def handle(self, *args, **options):
+        removed = sweep_workspace(max_age=options['max_age'])
+        noun = "directory" if removed == 1 else "directories"
+        self.stdout.write(f"Removed {removed} stale job {noun}, {workspace_usage()} bytes in use.")
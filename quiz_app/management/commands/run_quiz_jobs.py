@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from quiz_app.api.jobs import drain_queue, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    """
+    Drain queued quiz jobs with the local worker pool.
+
+    Useful after a restart, when jobs that were queued but not yet started
+    would otherwise stay in the queue, or to run a dedicated worker process.
+    Jobs whose worker died mid-pipeline are queued again first, see
+    requeue_stale_jobs.
+    """
+
+    help = "Run queued quiz generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new jobs.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Polling interval in seconds for --loop.")
+        parser.add_argument('--limit', type=int, default=None, help="Maximum number of jobs per pass.")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale quiz job(s).")
+        while True:
+            count = drain_queue(limit=options['limit'])
+            if count:
+                self.stdout.write(f"Processed {count} quiz job(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,63 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from quiz_app.api.metrics import start_request, finish_request
+
+
+class ServerTimingMiddleware:
+    """
+    Add a Server-Timing header with the pipeline spans of a request.
+
+    Every stage timed with quiz_app.api.metrics.span during the request is
+    reported once, summed over repeated calls, followed by the total time
+    spent in the view. Browser dev tools and most HTTP clients show the
+    header next to the response. Disabled with settings.QUIZ_SERVER_TIMING.
+    Supports sync and async requests, so async views stay on the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUIZ_SERVER_TIMING:
+            return self.get_response(request)
+
+        token = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            spans = finish_request(token)
+        return self.add_header(response, spans, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not settings.QUIZ_SERVER_TIMING:
+            return await self.get_response(request)
+
+        token = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            spans = finish_request(token)
+        return self.add_header(response, spans, time.perf_counter() - start)
+
+    def add_header(self, response, spans, total: float):
+        entries = [self.entry(stage, seconds, calls) for stage, seconds, calls in spans]
+        entries.append(self.entry("total", total, 1))
+        response["Server-Timing"] = ", ".join(entries)
+        return response
+
+    @staticmethod
+    def entry(stage: str, seconds: float, calls: int):
+        entry = f"{stage};dur={seconds * 1000:.1f}"
+        if calls > 1:
+            entry += f';desc="{calls} calls"'
+        return entry
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0003_quiz_transcript_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['user', 'created_at'], name='quiz_user_created_idx'),
+        ),
+    ]
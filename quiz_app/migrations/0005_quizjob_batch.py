@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0004_quiz_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='batch',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0005_quizjob_batch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizjob',
+            index=models.Index(fields=['status', 'created_at'], name='quizjob_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0006_quizjob_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
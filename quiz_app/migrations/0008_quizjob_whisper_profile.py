@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0007_quiz_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='whisper_profile',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
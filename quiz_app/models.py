@@ -3,12 +3,24 @@ from auth_app.models import User
 # Create your models here.
 
 class Quiz(models.Model):
+    # Bump when the layout of the snapshot changes, older snapshots are then
+    # ignored until backfill_quiz_snapshots rebuilds them.
+    SNAPSHOT_VERSION = 1
+
     title = models.CharField(max_length=200)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     video_url = models.URLField(blank=True,null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quizzes')
+    transcript_source = models.CharField(max_length=20, blank=True)
+    # Rendered read payload, see quiz_app.api.snapshots.
+    snapshot = models.JSONField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='quiz_user_created_idx'),
+        ]
 
 
     def __str__(self):
@@ -25,4 +37,41 @@ class Question(models.Model):
 
 
     def __str__(self):
-        return f"Quizz  {self.quizz.title} - {self.question_title}"
\ No newline at end of file
+        return f"Quizz  {self.quizz.title} - {self.question_title}"
+
+class QuizJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_DOWNLOADING = 'downloading'
+    STATUS_TRANSCRIBING = 'transcribing'
+    STATUS_GENERATING = 'generating'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_DOWNLOADING, 'Downloading'),
+        (STATUS_TRANSCRIBING, 'Transcribing'),
+        (STATUS_GENERATING, 'Generating'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_jobs')
+    video_url = models.URLField()
+    batch = models.UUIDField(null=True, blank=True, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    quiz = models.ForeignKey(Quiz, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    error = models.TextField(blank=True)
+    whisper_profile = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='quizjob_status_created_idx'),
+        ]
+
+
+    def __str__(self):
+        return f"QuizJob {self.id} ({self.status}) by {self.user.username}"
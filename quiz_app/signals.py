@@ -0,0 +1,63 @@
+import threading
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from quiz_app.api.read_cache import invalidate_user_reads
+from quiz_app.models import Question, Quiz
+
+
+@receiver(pre_save, sender=Quiz)
+def clear_quiz_snapshot(sender, instance, **kwargs):
+    """
+    Drop the snapshot of a changed quiz in the same write. The code that
+    saved the quiz stores a new one, see quiz_app.api.snapshots.
+    """
+    instance.snapshot = None
+
+
+_deleting = threading.local()
+
+
+def _deleting_quiz_ids():
+    if not hasattr(_deleting, "ids"):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+@receiver(pre_delete, sender=Quiz)
+def mark_quiz_deleting(sender, instance, **kwargs):
+    """
+    Remember the quiz while its delete cascades, so the question receivers
+    skip the questions removed along with it.
+    """
+    _deleting_quiz_ids().add(instance.pk)
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def drop_cached_quiz_reads(sender, instance, **kwargs):
+    """
+    Drop the cached quiz list and detail payloads of the quiz owner.
+    """
+    _deleting_quiz_ids().discard(instance.pk)
+    invalidate_user_reads(instance.user_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def drop_cached_question_reads(sender, instance, **kwargs):
+    """
+    Drop the snapshot of the question's quiz and the cached payloads of its
+    owner. Questions deleted together with their quiz are covered by the
+    quiz signal and cost no queries here.
+    """
+    if instance.quizz_id in _deleting_quiz_ids():
+        return
+    Quiz.objects.filter(pk=instance.quizz_id).update(snapshot=None)
+    if Question.quizz.is_cached(instance):
+        instance.quizz.snapshot = None
+        user_id = instance.quizz.user_id
+    else:
+        user_id = Quiz.objects.filter(pk=instance.quizz_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_user_reads(user_id)
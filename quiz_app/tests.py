@@ -1,3 +1,1340 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import httpx
+import numpy as np
+import torch
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework import status
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from quiz_app.api import gemini, helper, jobs
+from quiz_app.api.jobs import get_audio_slots, requeue_stale_jobs, run_batch, run_job
+from quiz_app.api.captions import parse_vtt, select_caption_track
+from quiz_app.api.pipeline import aprepare_video, generate_quiz, save_quiz
+from quiz_app.api.views import AsyncCreateQuizView
+from quiz_app.api.seralizers import QuizListSeralizer
+from quiz_app.api.read_serializers import question_rows, quiz_row, represent_quiz
+from quiz_app.api.renderers import FastJSONRenderer
+from quiz_app.api.result_cache import cache_stats, extract_video_id, reset_cache_stats
+from quiz_app.api import transcription
+from quiz_app.api.metrics import reset_metrics
+from quiz_app.management.benchmark import (ENDPOINTS, SERIALIZER_PATHS, fake_external_stages, percentile, run_benchmark,
+                                    run_serializer_benchmark)
+from quiz_app.api.tokens import count_tokens, split_by_tokens
+from quiz_app.api.workspace import audio_workspace, sweep_workspace, WorkspaceFullError
+from quiz_app.api.transcription import WhisperModelRegistry, find_split_points, merge_transcripts
+from quiz_app.models import Question, Quiz, QuizJob
 
-# Create your tests here.
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+VIDEO_INFO = {"id": "dQw4w9WgXcQ", "language": "en", "subtitles": {}, "automatic_captions": {}}
+
+
+def load_blacklist_rules(client):
+    """
+    The blacklist middleware reloads its rules once per minute. Trigger the
+    load before counting queries so budgets do not depend on test order.
+    """
+    client.get("/api/quizzes/")
+
+
+def fake_quiz_json(count=10):
+    return {
+        "title": "Fake quiz",
+        "description": "Generated in tests",
+        "questions": [
+            {
+                "question_title": f"Question {i}?",
+                "question_options": ["A", "B", "C", "D"],
+                "answer": "A",
+            }
+            for i in range(count)
+        ],
+    }
+
+
+class WhisperModelRegistryTests(TestCase):
+
+    def setUp(self):
+        self.registry = WhisperModelRegistry()
+
+    @mock.patch("quiz_app.api.transcription.whisper.load_model")
+    def test_model_is_loaded_once_per_size(self, load_model):
+        load_model.side_effect = lambda name: torch.nn.Linear(4, 4)
+
+        first = self.registry.get("base")
+        second = self.registry.get("base")
+        self.registry.get("tiny")
+
+        self.assertIs(first, second)
+        self.assertEqual(load_model.call_count, 2)
+        self.assertEqual(self.registry.stats()["base"]["uses"], 2)
+        self.assertEqual(self.registry.stats()["base"]["memory_bytes"], 20 * 4)
+
+    @mock.patch("quiz_app.api.transcription.whisper.load_model")
+    def test_concurrent_requests_share_one_load(self, load_model):
+        load_model.side_effect = lambda name: torch.nn.Linear(2, 2)
+        threads = [threading.Thread(target=self.registry.get, args=("base",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(load_model.call_count, 1)
+        self.assertEqual(self.registry.stats()["base"]["uses"], 8)
+
+    @override_settings(WHISPER_PRELOAD_MODELS=["tiny", "base"])
+    @mock.patch("quiz_app.api.transcription.whisper.load_model")
+    def test_warm_loads_configured_models(self, load_model):
+        load_model.side_effect = lambda name: torch.nn.Linear(2, 2)
+        self.registry.warm()
+
+        self.assertEqual(sorted(self.registry.stats()), ["base", "tiny"])
+
+
+class ChunkedTranscriptionTests(TestCase):
+
+    def tone(self, seconds, amplitude=0.5):
+        samples = int(seconds * 16000)
+        return (amplitude * np.sin(np.arange(samples) * 0.1)).astype(np.float32)
+
+    def test_split_points_land_in_silence(self):
+        audio = np.concatenate([self.tone(9), np.zeros(16000, dtype=np.float32), self.tone(10)])
+        points = find_split_points(audio, chunk_seconds=10, search_seconds=2)
+
+        self.assertEqual(points[0], 0)
+        self.assertEqual(points[-1], len(audio))
+        self.assertEqual(len(points), 3)
+        self.assertTrue(9 * 16000 <= points[1] < 10 * 16000)
+
+    def test_merge_drops_overlapping_words(self):
+        merged = merge_transcripts(["The cell is the basic unit", "basic unit of life. Every cell", "Every cell divides."])
+
+        self.assertEqual(merged, "The cell is the basic unit of life. Every cell divides.")
+
+    @override_settings(WHISPER_PARALLEL_WORKERS=2, WHISPER_PARALLEL_MIN_SECONDS=5,
+                       WHISPER_CHUNK_SECONDS=4, WHISPER_CHUNK_OVERLAP_SECONDS=0, WHISPER_VAD=False)
+    def test_long_audio_is_transcribed_in_chunks_in_order(self):
+        audio = np.concatenate([self.tone(3), np.zeros(16000, dtype=np.float32)] * 3)
+        chunk_text = lambda chunk, options=None: f"part{round(len(chunk) / 16000)}"
+
+        with mock.patch("quiz_app.api.transcription.whisper.load_audio", return_value=audio), \
+                mock.patch("quiz_app.api.transcription.get_transcription_pool", return_value=ThreadPoolExecutor(2)), \
+                mock.patch("quiz_app.api.transcription._transcribe_chunk", side_effect=chunk_text):
+            result = transcription.transcribe_file("media/long.webm")
+
+        self.assertEqual(result["chunks"], 3)
+        self.assertEqual(result["text"].split(), ["part3", "part4", "part5"])
+
+    @override_settings(WHISPER_PARALLEL_WORKERS=2)
+    def test_pools_are_kept_per_model_spec(self):
+        with mock.patch("quiz_app.api.transcription.ProcessPoolExecutor", side_effect=lambda **kwargs: mock.Mock()) as pools, \
+                mock.patch.dict("quiz_app.api.transcription._pools", clear=True):
+            base = transcription.get_transcription_pool("base")
+            tiny = transcription.get_transcription_pool("tiny:int8")
+
+            self.assertIs(transcription.get_transcription_pool("base"), base)
+        self.assertIsNot(base, tiny)
+        self.assertEqual([call.kwargs["initargs"][0] for call in pools.call_args_list], ["base", "tiny:int8"])
+
+    def test_inference_lock_is_shared_by_all_models(self):
+        registry = WhisperModelRegistry()
+
+        self.assertIs(registry.inference_lock("base"), registry.inference_lock("tiny:int8"))
+
+
+
+@override_settings(WHISPER_VAD=True, WHISPER_VAD_NOISE_RATIO=3, WHISPER_VAD_SILENCE_RMS=0.0001,
+                   WHISPER_VAD_MIN_SILENCE_SECONDS=1, WHISPER_VAD_PAD_SECONDS=0.25)
+class VoiceActivityTests(TestCase):
+
+    def tone(self, seconds, amplitude=0.5):
+        samples = int(seconds * 16000)
+        return (amplitude * np.sin(np.arange(samples) * 0.1)).astype(np.float32)
+
+    def silence(self, seconds):
+        return np.zeros(int(seconds * 16000), dtype=np.float32)
+
+    def test_long_pauses_are_cut_and_speech_is_kept(self):
+        audio = np.concatenate([self.silence(20), self.tone(3), self.silence(10), self.tone(2), self.silence(5)])
+
+        spans = transcription.speech_spans(audio)
+        trimmed, removed = transcription.trim_non_speech(audio)
+
+        self.assertEqual(len(spans), 2)
+        self.assertLessEqual(spans[0][0], 20 * 16000)
+        self.assertGreaterEqual(spans[1][1], 35 * 16000)
+        self.assertAlmostEqual(removed, 40 - 5 - 4 * 0.25, delta=0.1)
+        self.assertEqual(len(trimmed), len(audio) - round(removed * 16000))
+
+    def test_short_pauses_are_merged_into_one_span(self):
+        audio = np.concatenate([self.tone(2), self.silence(0.8), self.tone(2)])
+
+        self.assertEqual(transcription.speech_spans(audio), [(0, len(audio))])
+        self.assertEqual(transcription.trim_non_speech(audio)[1], 0.0)
+
+    def test_quiet_background_noise_counts_as_silence(self):
+        rng = np.random.default_rng(0)
+        audio = np.concatenate([self.silence(10), self.tone(3), self.silence(10)])
+        audio += (0.005 * rng.standard_normal(len(audio))).astype(np.float32)
+
+        trimmed, removed = transcription.trim_non_speech(audio)
+
+        self.assertAlmostEqual(removed, 20 - 0.5, delta=0.1)
+
+    def test_quiet_speaker_next_to_loud_passage_is_kept(self):
+        audio = np.concatenate([self.silence(5), self.tone(3, amplitude=0.005), self.silence(5), self.tone(3)])
+
+        spans = transcription.speech_spans(audio)
+
+        self.assertEqual(len(spans), 2)
+        self.assertLessEqual(spans[0][0], 5 * 16000)
+        self.assertGreaterEqual(spans[0][1], 8 * 16000)
+
+    def test_audio_without_speech_is_kept(self):
+        audio = self.silence(5)
+
+        trimmed, removed = transcription.trim_non_speech(audio)
+
+        self.assertIs(trimmed, audio)
+        self.assertEqual(removed, 0.0)
+
+    def test_transcription_runs_on_speech_and_reports_removed_audio(self):
+        model = mock.Mock()
+        model.transcribe.side_effect = lambda audio, **options: {"text": "hello"}
+        audio = np.concatenate([self.silence(30), self.tone(3), self.silence(30)])
+
+        with mock.patch.object(transcription.whisper_registry, "get", return_value=model), \
+                mock.patch("quiz_app.api.transcription.torch.set_num_threads"):
+            result = transcription.transcribe_pcm(audio)
+            with override_settings(WHISPER_VAD=False):
+                untrimmed = transcription.transcribe_pcm(audio)
+
+        first, second = model.transcribe.call_args_list
+        self.assertAlmostEqual(len(first.args[0]) / 16000, 3.5, delta=0.05)
+        self.assertAlmostEqual(result["vad_removed_seconds"], 59.5, delta=0.05)
+        self.assertEqual(len(second.args[0]), len(audio))
+        self.assertEqual(untrimmed["vad_removed_seconds"], 0.0)
+
+
+class WhisperProfileTests(TestCase):
+
+    def setUp(self):
+        reset_metrics()
+
+    def tiny_whisper(self):
+        from whisper.model import ModelDimensions, Whisper
+        model = Whisper(ModelDimensions(n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+                                        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1))
+        # left uninitialized by Whisper until checkpoint weights are loaded
+        torch.nn.init.normal_(model.decoder.positional_embedding, std=0.02)
+        return model
+
+    def test_model_is_chosen_by_audio_duration(self):
+        fast = transcription.get_profile("fast")
+
+        self.assertEqual(transcription.select_model(fast, 300), "base:int8")
+        self.assertEqual(transcription.select_model(fast, 3600), "tiny:int8")
+        with override_settings(WHISPER_MODEL="small"), mock.patch.dict(
+                "django.conf.settings.WHISPER_PROFILES", {"plain": {}}):
+            self.assertEqual(transcription.select_model(transcription.get_profile("plain"), 60), "small")
+
+    def test_decode_options_follow_profile(self):
+        self.assertEqual(transcription.decode_options(transcription.get_profile("fast")),
+                         {"fp16": False, "temperature": 0.0})
+        self.assertEqual(transcription.decode_options(transcription.get_profile("accurate")),
+                         {"fp16": False, "beam_size": 5, "best_of": 5})
+
+    def test_unknown_profile_raises(self):
+        with self.assertRaises(transcription.UnknownProfileError):
+            transcription.get_profile("huge")
+
+    def test_quantized_model_has_int8_linear_layers(self):
+        model = self.tiny_whisper()
+        fp32_bytes = transcription.model_bytes(model)
+
+        with mock.patch("quiz_app.api.transcription.whisper.load_model", return_value=model):
+            quantized = transcription.load_whisper_model("tiny:int8")
+
+        dynamic_linear = torch.ao.nn.quantized.dynamic.Linear
+        self.assertFalse(any(isinstance(module, torch.nn.Linear) for module in quantized.modules()))
+        self.assertTrue(any(isinstance(module, dynamic_linear) for module in quantized.modules()))
+        self.assertLess(transcription.model_bytes(quantized), fp32_bytes)
+        result = quantized.transcribe(np.zeros(16000, dtype=np.float32), fp16=False, temperature=0,
+                                      condition_on_previous_text=False, language="en")
+        self.assertIsInstance(result["text"], str)
+
+    def test_transcription_reports_realtime_factor_per_profile(self):
+        model = mock.Mock()
+        model.transcribe.return_value = {"text": "hello"}
+        audio = np.zeros(16000 * 10, dtype=np.float32)
+
+        with mock.patch.object(transcription.whisper_registry, "get", return_value=model) as get, \
+                mock.patch("quiz_app.api.transcription.torch.set_num_threads") as set_threads:
+            result = transcription.transcribe_pcm(audio, profile="fast")
+
+        get.assert_called_once_with("base:int8")
+        model.transcribe.assert_called_once_with(audio, fp16=False, temperature=0.0)
+        set_threads.assert_called_once_with(transcription.cpu_allotment())
+        self.assertEqual((result["profile"], result["model"]), ("fast", "base:int8"))
+        self.assertEqual(transcription.profile_stats()["fast"]["transcriptions"], 1)
+
+
+@mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value=VIDEO_INFO)
+@mock.patch("quiz_app.api.pipeline.create_Quiz_with_GeminiAPI", return_value=fake_quiz_json())
+@mock.patch("quiz_app.api.pipeline.transcripts_Audio_to_Text", return_value="transcript")
+@mock.patch("quiz_app.api.pipeline.video_download", return_value="media/audio.webm")
+class QuizJobTests(APITestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.force_authenticate(self.user)
+
+    def test_async_create_returns_job(self, *mocks):
+        with mock.patch("quiz_app.api.views.enqueue_job") as enqueue:
+            response = self.client.post("/api/createQuiz/", {"url": VIDEO_URL, "async": True}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], QuizJob.STATUS_QUEUED)
+        enqueue.assert_called_once()
+        self.assertFalse(Quiz.objects.exists())
+
+    def test_create_rejects_unknown_whisper_profile(self, *mocks):
+        response = self.client.post("/api/createQuiz/", {"url": VIDEO_URL, "whisper_profile": "huge"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QuizJob.objects.exists())
+
+    def test_job_transcribes_with_requested_whisper_profile(self, video_download, transcribe, *mocks):
+        with mock.patch("quiz_app.api.views.enqueue_job"):
+            response = self.client.post("/api/createQuiz/", {"url": VIDEO_URL, "async": True, "whisper_profile": "fast"},
+                                        format="json")
+        run_job(response.data["id"])
+
+        self.assertEqual(QuizJob.objects.get().whisper_profile, "fast")
+        transcribe.assert_called_once_with("media/audio.webm", "fast")
+
+    def test_async_create_rejects_invalid_url(self, *mocks):
+        response = self.client.post("/api/createQuiz/", {"url": "https://example.com", "async": True}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QuizJob.objects.exists())
+
+    def test_stale_in_progress_jobs_are_requeued(self, *mocks):
+        stale = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL, status=QuizJob.STATUS_TRANSCRIBING)
+        live = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL, status=QuizJob.STATUS_TRANSCRIBING)
+        done = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL, status=QuizJob.STATUS_DONE)
+        QuizJob.objects.filter(pk__in=[stale.pk, done.pk]).update(updated_at=timezone.now() - datetime.timedelta(hours=3))
+
+        self.assertEqual(requeue_stale_jobs(max_age=3600), 1)
+        statuses = dict(QuizJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[stale.pk], QuizJob.STATUS_QUEUED)
+        self.assertEqual(statuses[live.pk], QuizJob.STATUS_TRANSCRIBING)
+        self.assertEqual(statuses[done.pk], QuizJob.STATUS_DONE)
+
+    def test_run_job_creates_quiz_and_poll_reports_done(self, *mocks):
+        job = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL)
+        run_job(job.pk)
+
+        response = self.client.get(f"/api/jobs/{job.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], QuizJob.STATUS_DONE)
+        self.assertEqual(len(response.data["quiz"]["questions"]), 10)
+
+    def test_run_job_records_failure(self, video_download, *mocks):
+        video_download.return_value = False
+        job = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL)
+        with self.assertLogs("quiz_app.api.jobs", "ERROR"):
+            run_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, QuizJob.STATUS_FAILED)
+        self.assertEqual(job.error, "Download failed")
+
+    def test_job_is_only_visible_to_owner(self, *mocks):
+        job = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL)
+        other = User.objects.create_user(username="other", password="secret-pass")
+        self.client.force_authenticate(other)
+
+        response = self.client.get(f"/api/jobs/{job.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value=VIDEO_INFO)
+@mock.patch("quiz_app.api.pipeline.create_Quiz_with_GeminiAPI", return_value=fake_quiz_json())
+@mock.patch("quiz_app.api.pipeline.transcripts_Audio_to_Text", return_value="transcript")
+@mock.patch("quiz_app.api.pipeline.video_download", return_value="media/audio.webm")
+class ResultCacheTests(TestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+        reset_cache_stats()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+
+    def test_extract_video_id_normalizes_url_variants(self, *mocks):
+        for url in (VIDEO_URL, VIDEO_URL + "&t=42s", "https://youtu.be/dQw4w9WgXcQ",
+                    "https://www.youtube.com/shorts/dQw4w9WgXcQ"):
+            self.assertEqual(extract_video_id(url), "dQw4w9WgXcQ")
+        self.assertIsNone(extract_video_id("https://www.youtube.com/watch?v=short"))
+        self.assertIsNone(extract_video_id("https://notyoutube.com/watch?v=dQw4w9WgXcQ"))
+        self.assertEqual(extract_video_id("https://m.youtube.com/watch?v=dQw4w9WgXcQ"), "dQw4w9WgXcQ")
+
+    def test_repeated_video_is_cloned_from_cache(self, video_download, transcribe, generate, fetch_info):
+        first = generate_quiz(VIDEO_URL, self.user)
+        other = User.objects.create_user(username="other", password="secret-pass")
+        second = generate_quiz("https://youtu.be/dQw4w9WgXcQ", other)
+
+        self.assertEqual(video_download.call_count, 1)
+        self.assertEqual(generate.call_count, 1)
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.user, other)
+        self.assertEqual(second.questions.count(), 10)
+        self.assertEqual(cache_stats()["hits"], 1)
+        self.assertEqual(cache_stats()["misses"], 1)
+
+    def test_whisper_results_are_cached_per_profile(self, video_download, transcribe, generate, fetch_info):
+        generate_quiz(VIDEO_URL, self.user, whisper_profile="fast")
+        generate_quiz(VIDEO_URL, self.user, whisper_profile="accurate")
+        generate_quiz(VIDEO_URL, self.user, whisper_profile="fast")
+
+        self.assertEqual(transcribe.call_count, 2)
+        self.assertEqual(cache_stats()["hits"], 1)
+
+
+class VideoInfoTests(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.ydl = mock.MagicMock()
+        self.ydl.__enter__.return_value = self.ydl
+        self.ydl.extract_info.return_value = {"id": "dQw4w9WgXcQ", "title": "Video", "formats": []}
+        patcher = mock.patch("quiz_app.api.helper.yt_dlp.YoutubeDL", return_value=self.ydl)
+        youtube_dl = patcher.start()
+        youtube_dl.sanitize_info.side_effect = lambda info, remove_private_keys=False: dict(info)
+        self.addCleanup(patcher.stop)
+
+    @mock.patch("quiz_app.api.helper.glob", return_value=["job/audio.webm"])
+    def test_download_reuses_single_extraction(self, glob):
+        self.assertTrue(helper.check_video(VIDEO_URL))
+        audio = helper.video_download(VIDEO_URL, workdir="job")
+
+        self.assertEqual(audio, "job/audio.webm")
+        self.ydl.extract_info.assert_called_once_with(VIDEO_URL, download=False)
+        self.ydl.download.assert_not_called()
+        info, = self.ydl.process_ie_result.call_args.args
+        self.assertEqual(info["id"], "dQw4w9WgXcQ")
+
+    def test_unavailable_video_is_rejected(self):
+        self.ydl.extract_info.side_effect = helper.yt_dlp.utils.DownloadError("unavailable")
+
+        self.assertFalse(helper.check_video(VIDEO_URL))
+        self.assertFalse(helper.video_download(VIDEO_URL))
+
+
+CAPTION_INFO = {
+    "id": "dQw4w9WgXcQ",
+    "language": "en",
+    "subtitles": {
+        "de": [{"ext": "vtt", "url": "https://captions/manual-de.vtt"}],
+    },
+    "automatic_captions": {
+        "en-orig": [{"ext": "srv1", "url": "https://captions/auto-en.srv1"},
+                    {"ext": "json3", "url": "https://captions/auto-en.json3"}],
+        "fr": [{"ext": "json3", "url": "https://captions/auto-fr.json3"}],
+    },
+}
+
+AUTO_JSON3 = '{"events": [{"segs": [{"utf8": "Cells are"}, {"utf8": " the unit"}]}, {"segs": [{"utf8": "\\n"}]}, {"segs": [{"utf8": "of life"}]}]}'
+
+MANUAL_VTT = """WEBVTT
+Kind: captions
+Language: de
+
+00:00:00.000 --> 00:00:02.000
+Zellen sind die
+
+00:00:02.000 --> 00:00:04.000
+<c>Grundeinheit</c> des Lebens
+"""
+
+
+@mock.patch("quiz_app.api.pipeline.create_Quiz_with_GeminiAPI", return_value=fake_quiz_json())
+@mock.patch("quiz_app.api.pipeline.transcripts_Audio_to_Text", return_value="whisper transcript")
+@mock.patch("quiz_app.api.pipeline.video_download", return_value="media/audio.webm")
+class TranscriptSourceTests(TestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+
+    def fetch_caption(self, track):
+        return {"https://captions/auto-en.json3": AUTO_JSON3, "https://captions/manual-de.vtt": MANUAL_VTT}[track["url"]]
+
+    def test_automatic_track_uses_spoken_language_and_preferred_format(self, *mocks):
+        track = select_caption_track(CAPTION_INFO, "automatic", ["fr"])
+
+        self.assertEqual(track["url"], "https://captions/auto-en.json3")
+
+    def test_vtt_is_converted_to_plain_text(self, *mocks):
+        self.assertEqual(parse_vtt(MANUAL_VTT), "Zellen sind die Grundeinheit des Lebens")
+
+    @override_settings(CAPTION_LANGUAGES=["de"])
+    def test_manual_subtitles_skip_whisper(self, video_download, transcribe, generate):
+        with mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value=CAPTION_INFO), \
+                mock.patch("quiz_app.api.helper.fetch_caption", side_effect=self.fetch_caption):
+            quiz = generate_quiz(VIDEO_URL, self.user)
+
+        self.assertEqual(quiz.transcript_source, "manual")
+        generate.assert_called_once_with("Zellen sind die Grundeinheit des Lebens")
+        video_download.assert_not_called()
+
+    @override_settings(TRANSCRIPT_SOURCES=["automatic", "whisper"])
+    def test_automatic_captions_when_manual_source_is_disabled(self, video_download, transcribe, generate):
+        with mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value=CAPTION_INFO), \
+                mock.patch("quiz_app.api.helper.fetch_caption", side_effect=self.fetch_caption):
+            quiz = generate_quiz(VIDEO_URL, self.user)
+
+        self.assertEqual(quiz.transcript_source, "automatic")
+        generate.assert_called_once_with("Cells are the unit of life")
+
+    def test_whisper_is_the_last_resort(self, video_download, transcribe, generate):
+        with mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value=VIDEO_INFO):
+            quiz = generate_quiz(VIDEO_URL, self.user)
+
+        self.assertEqual(quiz.transcript_source, "whisper")
+        video_download.assert_called_once_with(VIDEO_URL, info=VIDEO_INFO, workdir=mock.ANY)
+
+
+@mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value=VIDEO_INFO)
+@mock.patch("quiz_app.api.pipeline.create_Quiz_with_GeminiAPI", return_value=fake_quiz_json())
+@mock.patch("quiz_app.api.pipeline.transcripts_Audio_to_Text", return_value="transcript")
+@mock.patch("quiz_app.api.pipeline.video_download", return_value="media/audio.webm")
+class CreateQuizTests(APITestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.force_authenticate(self.user)
+        load_blacklist_rules(self.client)
+
+    def test_create_quiz_stays_within_query_budget(self, *mocks):
+        # savepoint, quiz insert, one bulk question insert, snapshot update, release, questions
+        # of the response
+        with self.assertNumQueries(6):
+            response = self.client.post("/api/createQuiz/", {"url": VIDEO_URL}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["questions"]), 10)
+
+    def test_invalid_urls_are_rejected_on_both_paths(self, video_download, transcribe, generate, fetch_info):
+        for body in ({"url": 123}, {"url": 123, "async": True},
+                     {"url": "https://example.com"}, {"url": "https://example.com", "async": True}):
+            response = self.client.post("/api/createQuiz/", body, format="json")
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+        fetch_info.assert_not_called()
+        self.assertFalse(QuizJob.objects.exists())
+
+    def test_invalid_question_leaves_no_partial_quiz(self, video_download, transcribe, generate, fetch_info):
+        quiz_json = fake_quiz_json()
+        quiz_json["questions"][7]["answer"] = "E"
+        generate.return_value = quiz_json
+
+        response = self.client.post("/api/createQuiz/", {"url": VIDEO_URL}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Quiz.objects.exists())
+
+
+class QuizListTests(APITestCase):
+
+    def setUp(self):
+        caches["quiz_reads"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.force_authenticate(self.user)
+        load_blacklist_rules(self.client)
+
+    def create_quizzes(self, count):
+        for _ in range(count):
+            save_quiz(fake_quiz_json(), VIDEO_URL, self.user)
+
+    def test_list_query_count_does_not_grow_with_quizzes(self):
+        self.create_quizzes(2)
+        # list ETag, quizzes with their snapshots
+        with self.assertNumQueries(2):
+            self.client.get("/api/quizzes/")
+        self.create_quizzes(5)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/quizzes/")
+
+        self.assertEqual(len(response.data), 7)
+
+    def test_cursor_pages_walk_all_quizzes_newest_first(self):
+        self.create_quizzes(5)
+        seen = []
+        url = "/api/quizzes/?page_size=2"
+        while url:
+            response = self.client.get(url)
+            seen += [quiz["id"] for quiz in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(seen, sorted(Quiz.objects.values_list("id", flat=True), reverse=True))
+
+    def test_fields_switch_drops_questions(self):
+        self.create_quizzes(1)
+        response = self.client.get("/api/quizzes/?fields=id,title")
+        self.assertEqual(set(response.data[0]), {"id", "title"})
+
+        response = self.client.get("/api/quizzes/?fields=id&include=questions")
+        self.assertEqual(set(response.data[0]), {"id", "questions"})
+
+
+class ConditionalReadTests(APITestCase):
+
+    def setUp(self):
+        caches["quiz_reads"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.force_authenticate(self.user)
+        load_blacklist_rules(self.client)
+        self.quiz = save_quiz(fake_quiz_json(), VIDEO_URL, self.user)
+
+    def test_repeat_reads_come_from_the_cache(self):
+        for url in ("/api/quizzes/", f"/api/quizzes/{self.quiz.pk}/"):
+            first = self.client.get(url)
+            with self.assertNumQueries(0), \
+                    mock.patch("quiz_app.api.seralizers.QuizListSeralizer.to_representation") as serialize:
+                second = self.client.get(url)
+
+            serialize.assert_not_called()
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get("/api/quizzes/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/quizzes/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_matching_etag_skips_serializers_after_cache_loss(self):
+        url = f"/api/quizzes/{self.quiz.pk}/"
+        etag = self.client.get(url)["ETag"]
+        caches["quiz_reads"].clear()
+
+        with mock.patch("quiz_app.api.seralizers.QuizListSeralizer.to_representation") as serialize:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        serialize.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_quiz_and_question_changes_invalidate_reads(self):
+        url = f"/api/quizzes/{self.quiz.pk}/"
+        etag = self.client.get(url)["ETag"]
+        list_etag = self.client.get("/api/quizzes/")["ETag"]
+
+        self.client.patch(url, {"title": "Renamed"}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["title"], "Renamed")
+
+        question = self.quiz.questions.first()
+        question.question_title = "Changed?"
+        question.save()
+        response = self.client.get("/api/quizzes/", HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Changed?", [q["question_title"] for q in response.json()[0]["questions"]])
+
+        self.quiz.delete()
+        self.assertEqual(self.client.get("/api/quizzes/").json(), [])
+
+    def test_cached_detail_is_not_served_to_other_users(self):
+        url = f"/api/quizzes/{self.quiz.pk}/"
+        self.client.get(url)
+        other = User.objects.create_user(username="other", password="secret-pass")
+        self.client.force_authenticate(other)
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class QuizSnapshotTests(APITestCase):
+
+    def setUp(self):
+        caches["quiz_reads"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.force_authenticate(self.user)
+        load_blacklist_rules(self.client)
+        self.quiz = save_quiz(fake_quiz_json(), VIDEO_URL, self.user)
+        self.url = f"/api/quizzes/{self.quiz.pk}/"
+
+    def serialized(self):
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        return json.loads(json.dumps(QuizListSeralizer(quiz).data))
+
+    def test_detail_is_a_single_row_fetch(self):
+        # the quiz with its snapshot, the ETag comes from the snapshot
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), self.serialized())
+
+    def test_edits_store_a_new_snapshot(self):
+        self.client.patch(self.url, {"title": "Renamed"}, format="json")
+
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.snapshot["quiz"]["title"], "Renamed")
+        self.assertEqual(self.client.get(self.url).json(), self.serialized())
+
+    def test_quiz_delete_does_not_query_per_question(self):
+        quiz = save_quiz(fake_quiz_json(10), VIDEO_URL, self.user)
+
+        # questions, job unlink, one batched question delete, the quiz
+        with self.assertNumQueries(4):
+            quiz.delete()
+
+        self.assertFalse(Question.objects.filter(quizz_id=quiz.pk).exists())
+
+    def test_changed_question_snapshot_is_rebuilt_on_read(self):
+        question = self.quiz.questions.first()
+        question.question_title = "Changed?"
+        question.save()
+
+        self.quiz.refresh_from_db()
+        self.assertIsNone(self.quiz.snapshot)
+        response = self.client.get("/api/quizzes/?fields=id&include=questions")
+        self.assertIn("Changed?", [q["question_title"] for q in response.json()[0]["questions"]])
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.snapshot["quiz"], self.serialized())
+        self.assertEqual(self.client.get(self.url).json(), self.serialized())
+
+    def test_quiz_saved_outside_the_views_is_rebuilt_once(self):
+        self.quiz.title = "Saved in the admin"
+        self.quiz.save()
+        caches["quiz_reads"].clear()
+
+        self.assertEqual(self.client.get(self.url).json()["title"], "Saved in the admin")
+        caches["quiz_reads"].clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json(), self.serialized())
+
+    def test_backfill_stores_missing_and_outdated_snapshots(self):
+        other = save_quiz(fake_quiz_json(), VIDEO_URL, self.user)
+        Quiz.objects.filter(pk=self.quiz.pk).update(snapshot=None)
+        Quiz.objects.filter(pk=other.pk).update(snapshot={"version": 0})
+        out = io.StringIO()
+
+        call_command("backfill_quiz_snapshots", "--batch-size", "1", stdout=out)
+
+        self.assertIn("Stored 2 quiz snapshot(s).", out.getvalue())
+        for quiz in Quiz.objects.all():
+            self.assertEqual(quiz.snapshot["version"], Quiz.SNAPSHOT_VERSION)
+            self.assertEqual(quiz.snapshot["quiz"], json.loads(json.dumps(QuizListSeralizer(quiz).data)))
+
+
+class FastReadPathTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+
+    def test_values_serializers_match_model_serializers(self):
+        quiz_json = fake_quiz_json(3)
+        quiz_json["title"] = "Grüße \u2028 “quoted”"
+        quiz = save_quiz(quiz_json, VIDEO_URL, self.user)
+        Quiz.objects.filter(pk=quiz.pk).update(video_url=None)
+        quiz = Quiz.objects.get(pk=quiz.pk)
+        expected = QuizListSeralizer(quiz).data
+
+        actual = represent_quiz(quiz_row(quiz), question_rows([quiz.pk])[quiz.pk])
+
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+        self.assertEqual(represent_quiz(quiz_row(quiz), fields=["title", "id", "unknown"]),
+                         {"id": quiz.pk, "title": quiz.title})
+
+    def test_fast_renderer_output_is_byte_compatible(self):
+        payloads = [
+            {"text": "Grüße \u2028 \u2029 \"x\" \\ \n", "int": 2 ** 70, "nested": [None, True, 1.5, 1e16, 1e-7]},
+            {"when": timezone.now(), "day": datetime.date(2026, 1, 2), "amount": Decimal("1.25"),
+             "id": uuid.uuid4(), "delta": datetime.timedelta(seconds=90), "error": ErrorDetail("bad", code="x")},
+            [{"a": 1, "b": ["Grüße \u2028 \u2029", {"c": None}], "ratio": 0.25}],
+            {1: "non string key"},
+        ]
+        for payload in payloads:
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(FastJSONRenderer().render(payloads[2], "application/json; indent=2"),
+                         JSONRenderer().render(payloads[2], "application/json; indent=2"))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+class AudioWorkspaceTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        override = override_settings(AUDIO_WORKSPACE_ROOT=self.root, AUDIO_WORKSPACE_MAX_BYTES=1000)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_each_job_gets_its_own_directory_removed_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with audio_workspace() as first, audio_workspace() as second:
+                self.assertNotEqual(first, second)
+                raise RuntimeError("transcription failed")
+
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_stale_directories_are_swept_when_over_cap(self):
+        stale = os.path.join(self.root, "job-stale")
+        os.makedirs(stale)
+        with open(os.path.join(stale, "audio.webm"), "wb") as f:
+            f.write(b"0" * 2000)
+        old = time.time() - 7200
+        os.utime(stale, (old, old))
+
+        with audio_workspace() as workdir:
+            self.assertTrue(os.path.isdir(workdir))
+        self.assertFalse(os.path.exists(stale))
+
+    def test_full_workspace_refuses_new_jobs(self):
+        running = os.path.join(self.root, "job-running")
+        os.makedirs(running)
+        with open(os.path.join(running, "audio.webm"), "wb") as f:
+            f.write(b"0" * 2000)
+
+        with self.assertRaises(WorkspaceFullError):
+            with audio_workspace():
+                pass
+        self.assertEqual(sweep_workspace(max_age=3600), 0)
+        self.assertTrue(os.path.exists(running))
+
+    def test_sweep_keeps_old_directories_of_running_jobs(self):
+        with audio_workspace() as workdir:
+            old = time.time() - 7200
+            os.utime(workdir, (old, old))
+
+            self.assertEqual(sweep_workspace(max_age=3600), 0)
+            self.assertTrue(os.path.isdir(workdir))
+
+        self.assertEqual(os.listdir(self.root), [])
+
+    @mock.patch("quiz_app.api.helper.subprocess.run")
+    def test_stream_is_decoded_to_float_pcm(self, run):
+        run.return_value = mock.Mock(stdout=np.array([0, 16384, -32768], dtype=np.int16).tobytes())
+        audio = helper.decode_audio_stream({"url": "https://media/audio", "http_headers": {"User-Agent": "test"}})
+
+        np.testing.assert_allclose(audio, [0.0, 0.5, -1.0])
+        cmd = run.call_args.args[0]
+        self.assertIn("-headers", cmd)
+        self.assertEqual(cmd[-7:], ["-f", "s16le", "-ac", "1", "-ar", "16000", "-"])
+
+
+@mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value=VIDEO_INFO)
+@mock.patch("quiz_app.api.pipeline.create_Quiz_with_GeminiAPI", return_value=fake_quiz_json())
+@mock.patch("quiz_app.api.pipeline.transcripts_Audio_to_Text", return_value="transcript")
+@mock.patch("quiz_app.api.pipeline.video_download", return_value="media/audio.webm")
+class QuizBatchTests(APITestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.force_authenticate(self.user)
+
+    def test_batch_reports_every_url_individually(self, *mocks):
+        urls = [VIDEO_URL, "https://example.com/video", "https://www.youtube.com/watch?v=aaaaaaaaaaa"]
+        with mock.patch("quiz_app.api.views.enqueue_batch") as enqueue:
+            response = self.client.post("/api/createQuiz/batch/", {"urls": urls}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        jobs = response.data["jobs"]
+        self.assertEqual([job["video_url"] for job in jobs], urls)
+        self.assertEqual(jobs[0]["status"], QuizJob.STATUS_QUEUED)
+        self.assertIn("error", jobs[1])
+        enqueue.assert_called_once_with([jobs[0]["id"], jobs[2]["id"]])
+
+        response = self.client.get(f"/api/jobs/batch/{response.data['batch']}/")
+        self.assertEqual([job["id"] for job in response.data], [jobs[0]["id"], jobs[2]["id"]])
+
+    @override_settings(QUIZ_BATCH_MAX_URLS=2)
+    def test_batch_size_is_limited(self, *mocks):
+        response = self.client.post("/api/createQuiz/batch/", {"urls": [VIDEO_URL] * 3}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staged_pipeline_finishes_jobs_and_isolates_failures(self, video_download, transcribe, generate, fetch_info):
+        transcribe.side_effect = lambda audio, profile=None: "transcript" if audio == "good.webm" else 1 / 0
+        video_download.side_effect = lambda url, info, workdir: "good.webm" if url == VIDEO_URL else "bad.webm"
+        fetch_info.side_effect = lambda url: {**VIDEO_INFO, "id": url[-11:]}
+        good = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL)
+        bad = QuizJob.objects.create(user=self.user, video_url="https://www.youtube.com/watch?v=aaaaaaaaaaa")
+
+        inline = ThreadPoolExecutor(1)
+        inline.submit = lambda fn, *args: fn(*args)
+        with mock.patch("quiz_app.api.jobs.get_stage_pool", return_value=inline), \
+                self.assertLogs("quiz_app.api.jobs", "ERROR"):
+            run_batch([good.pk, bad.pk])
+
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual(good.status, QuizJob.STATUS_DONE)
+        self.assertEqual(good.quiz.questions.count(), 10)
+        self.assertEqual(bad.status, QuizJob.STATUS_FAILED)
+        self.assertEqual(bad.error, "division by zero")
+
+    @override_settings(QUIZ_BATCH_MAX_PENDING_AUDIO=1)
+    def test_audio_slots_are_released_on_every_path(self, video_download, transcribe, generate, fetch_info):
+        transcribe.side_effect = lambda audio, profile=None: "transcript" if audio == "good.webm" else 1 / 0
+        video_download.side_effect = lambda url, info, workdir: "good.webm" if url == VIDEO_URL else "bad.webm"
+        fetch_info.side_effect = lambda url: None if url.endswith("bbbbbbbbbbb") else {**VIDEO_INFO, "id": url[-11:]}
+        jobs = [QuizJob.objects.create(user=self.user, video_url=url) for url in (
+            VIDEO_URL, "https://www.youtube.com/watch?v=aaaaaaaaaaa", "https://www.youtube.com/watch?v=bbbbbbbbbbb")]
+
+        inline = ThreadPoolExecutor(1)
+        inline.submit = lambda fn, *args: fn(*args)
+        with mock.patch("quiz_app.api.jobs.get_stage_pool", return_value=inline), \
+                mock.patch("quiz_app.api.jobs._audio_slots", None), \
+                self.assertLogs("quiz_app.api.jobs", "ERROR"):
+            run_batch([job.pk for job in jobs])
+            slots = get_audio_slots()
+
+            self.assertTrue(slots.acquire(blocking=False))
+        statuses = [QuizJob.objects.get(pk=job.pk).status for job in jobs]
+        self.assertEqual(statuses, [QuizJob.STATUS_DONE, QuizJob.STATUS_FAILED, QuizJob.STATUS_FAILED])
+
+    @override_settings(QUIZ_BATCH_MAX_PENDING_AUDIO=1)
+    def test_audio_slot_is_released_when_claiming_fails(self, *mocks):
+        job = QuizJob.objects.create(user=self.user, video_url=VIDEO_URL)
+
+        with mock.patch("quiz_app.api.jobs._audio_slots", None), \
+                mock.patch("quiz_app.api.jobs.claim_job", side_effect=RuntimeError("database gone")):
+            with self.assertRaises(RuntimeError):
+                jobs._download_stage(job.pk)
+
+            self.assertTrue(get_audio_slots().acquire(blocking=False))
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the generateContent endpoint. Answers with the
+    queued status codes first and with a quiz afterwards.
+    """
+
+    failures = []
+    requests = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        GeminiStubHandler.requests.append(self.path)
+        if GeminiStubHandler.failures:
+            code = GeminiStubHandler.failures.pop(0)
+            body = {"error": {"code": code, "message": "unavailable", "status": "UNAVAILABLE"}}
+        else:
+            code = 200
+            text = json.dumps(fake_quiz_json())
+            body = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class GeminiClientTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), GeminiStubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        GeminiStubHandler.failures = []
+        GeminiStubHandler.requests = []
+        override = override_settings(
+            GEMINI_BASE_URL=f"http://127.0.0.1:{self.server.server_address[1]}", GEMINI_API_KEY="test-key",
+            GEMINI_MAX_ATTEMPTS=3, GEMINI_RETRY_INITIAL_DELAY=0.01)
+        override.enable()
+        self.addCleanup(override.disable)
+        gemini.reset_client()
+        self.addCleanup(gemini.reset_client)
+        patcher = mock.patch("quiz_app.api.tokens.get_encoding", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transient_errors_are_retried_on_one_client(self):
+        GeminiStubHandler.failures = [503, 429]
+        with self.assertLogs("quiz_app.api.gemini", "WARNING"):
+            quiz = helper.create_Quiz_with_GeminiAPI("transcript")
+
+        self.assertEqual(len(quiz["questions"]), 10)
+        self.assertEqual(len(GeminiStubHandler.requests), 3)
+        self.assertIs(gemini.get_client(), gemini.get_client())
+
+    def test_async_client_retries_on_the_event_loop(self):
+        GeminiStubHandler.failures = [503]
+
+        async def create():
+            return await helper.acreate_Quiz_with_GeminiAPI("transcript")
+
+        with self.assertLogs("quiz_app.api.gemini", "WARNING"):
+            quiz = asyncio.run(create())
+
+        self.assertEqual(len(quiz["questions"]), 10)
+        self.assertEqual(len(GeminiStubHandler.requests), 2)
+
+    @override_settings(GEMINI_MAX_CONCURRENCY=1)
+    def test_sync_and_async_requests_share_the_concurrency_cap(self):
+        semaphore = gemini.get_semaphore()
+
+        async def wait_for_slot():
+            async with gemini.async_slot():
+                pass
+
+        semaphore.acquire()
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(asyncio.wait_for(wait_for_slot(), 0.2))
+        semaphore.release()
+
+        # the cancelled request did not keep a slot
+        self.assertTrue(semaphore.acquire(blocking=False))
+        semaphore.release()
+        asyncio.run(wait_for_slot())
+
+    def test_client_errors_are_not_retried(self):
+        GeminiStubHandler.failures = [400]
+        with self.assertRaises(gemini.errors.ClientError):
+            gemini.generate_content("prompt")
+
+        self.assertEqual(len(GeminiStubHandler.requests), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        GeminiStubHandler.failures = [503, 503, 503, 503]
+        with self.assertLogs("quiz_app.api.gemini", "WARNING"), self.assertRaises(gemini.errors.ServerError):
+            gemini.generate_content("prompt")
+
+        self.assertEqual(len(GeminiStubHandler.requests), 3)
+
+
+@mock.patch("quiz_app.api.tokens.get_encoding", return_value=None)
+class TokenBudgetTests(TestCase):
+
+    def test_split_respects_budget_and_sentence_boundaries(self, get_encoding):
+        text = " ".join(f"Sentence number {i} explains a detail." for i in range(50))
+        parts = split_by_tokens(text, 40)
+
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(count_tokens(part) <= 40 for part in parts))
+        self.assertTrue(all(part.endswith(".") for part in parts))
+        self.assertEqual(" ".join(parts), text)
+
+    def test_unpunctuated_text_is_cut_by_words(self, get_encoding):
+        parts = split_by_tokens("word " * 200, 30)
+
+        self.assertTrue(all(count_tokens(part) <= 30 for part in parts))
+        self.assertEqual(sum(len(part.split()) for part in parts), 200)
+
+    @override_settings(GEMINI_TRANSCRIPT_TOKEN_BUDGET=100, GEMINI_CHUNK_TOKENS=60)
+    def test_long_transcript_is_mapped_and_reduced(self, get_encoding):
+        prompts = []
+
+        def fake_generate(prompt, config=None):
+            prompts.append(prompt)
+            if "You receive part" in prompt:
+                data = {"summary": f"summary {len(prompts)}", "questions": fake_quiz_json(3)["questions"]}
+            else:
+                data = fake_quiz_json(12)
+            return mock.Mock(text=json.dumps(data))
+
+        transcript = " ".join(f"Sentence number {i} explains a detail." for i in range(40))
+        with mock.patch("quiz_app.api.helper.generate_content", side_effect=fake_generate):
+            quiz = helper.create_Quiz_with_GeminiAPI(transcript)
+
+        parts = split_by_tokens(transcript, 60)
+        self.assertEqual(len(prompts), len(parts) + 1)
+        self.assertTrue(all(count_tokens(prompt) < 1000 for prompt in prompts))
+        self.assertIn("Candidate questions", prompts[-1])
+        self.assertEqual(len(quiz["questions"]), 10)
+
+    def test_short_transcript_uses_single_call(self, get_encoding):
+        with mock.patch("quiz_app.api.helper.generate_content",
+                        return_value=mock.Mock(text=json.dumps(fake_quiz_json()))) as generate:
+            helper.create_Quiz_with_GeminiAPI("A short transcript.")
+
+        generate.assert_called_once()
+
+
+@mock.patch("quiz_app.api.tokens.get_encoding", return_value=None)
+class QuizRepairTests(TestCase):
+
+    def test_fenced_response_with_surrounding_text_is_parsed(self, get_encoding):
+        text = "Here is your quiz:\n```json\n" + json.dumps(fake_quiz_json()) + "\n```"
+
+        self.assertEqual(helper.parse_quiz_response(text), fake_quiz_json())
+
+    def test_request_asks_for_schema_constrained_json(self, get_encoding):
+        with mock.patch("quiz_app.api.helper.generate_content",
+                        return_value=mock.Mock(text=json.dumps(fake_quiz_json()))) as generate:
+            helper.create_Quiz_with_GeminiAPI("A short transcript.")
+
+        config = generate.call_args.kwargs["config"]
+        self.assertEqual(config.response_mime_type, "application/json")
+        self.assertIsNotNone(config.response_schema)
+
+    def test_only_invalid_questions_are_regenerated(self, get_encoding):
+        quiz = fake_quiz_json()
+        quiz["questions"][3]["answer"] = "E"
+        quiz["questions"][7]["question_options"] = ["A", "B"]
+        replacements = {"questions": [
+            {"question_title": f"New {i}?", "question_options": ["A", "B", "C", "D"], "answer": "B"}
+            for i in range(2)]}
+        responses = [mock.Mock(text=json.dumps(quiz)), mock.Mock(text=json.dumps(replacements))]
+
+        with mock.patch("quiz_app.api.helper.generate_content", side_effect=responses) as generate:
+            result = helper.create_Quiz_with_GeminiAPI("A short transcript.")
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertIn("Write 2 new quiz questions", generate.call_args.args[0])
+        titles = [question["question_title"] for question in result["questions"]]
+        self.assertEqual(len(titles), 10)
+        self.assertNotIn("Question 3?", titles)
+        self.assertIn("New 1?", titles)
+
+    def test_malformed_json_is_requested_again(self, get_encoding):
+        responses = [mock.Mock(text="{\"title\": \"cut off"), mock.Mock(text=json.dumps(fake_quiz_json()))]
+
+        with mock.patch("quiz_app.api.helper.generate_content", side_effect=responses) as generate:
+            result = helper.create_Quiz_with_GeminiAPI("A short transcript.")
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual(len(result["questions"]), 10)
+
+
+@mock.patch("quiz_app.api.pipeline.fetch_video_info", return_value={**VIDEO_INFO, "duration": 212})
+@mock.patch("quiz_app.api.pipeline.create_Quiz_with_GeminiAPI", return_value=fake_quiz_json())
+@mock.patch("quiz_app.api.pipeline.transcripts_Audio_to_Text", return_value="transcript")
+@mock.patch("quiz_app.api.pipeline.video_download", return_value="media/audio.webm")
+@override_settings(METRICS_TOKEN="scrape-token")
+class PipelineMetricsTests(APITestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.client.force_authenticate(self.user)
+
+    def test_create_quiz_reports_server_timing(self, *mocks):
+        with self.assertLogs("quiz_app.api.metrics", "INFO") as logs:
+            response = self.client.post("/api/createQuiz/", {"url": VIDEO_URL}, format="json")
+
+        timing = response["Server-Timing"]
+        for stage in ("result_cache", "db", "serialize", "total"):
+            self.assertIn(f"{stage};dur=", timing)
+        self.assertTrue(timing.split(", ")[-1].startswith("total;dur="))
+        self.assertTrue(any("span stage=db duration_ms=" in line for line in logs.output))
+
+    def test_metrics_endpoint_exposes_histograms(self, *mocks):
+        self.client.post("/api/createQuiz/", {"url": VIDEO_URL}, format="json")
+        self.client.force_authenticate(None)
+
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape-token")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn('quiz_stage_duration_seconds_bucket{stage="db",le="+Inf"} 1', body)
+        self.assertIn('quiz_audio_duration_seconds_bucket{le="300"} 1', body)
+        self.assertIn("quiz_audio_duration_seconds_sum 212", body)
+        self.assertIn('quiz_transcript_characters_count{source="whisper"} 1', body)
+
+    def test_metrics_require_token_or_staff(self, *mocks):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BenchmarkTests(TestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+
+    def test_percentile_interpolates(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_every_endpoint_runs_against_fake_stages(self):
+        with mock.patch("quiz_app.api.tokens.get_encoding", return_value=None), fake_external_stages():
+            report = run_benchmark(requests=2, concurrency=1, seed_quizzes=2)
+
+        self.assertEqual([row["endpoint"] for row in report], list(ENDPOINTS))
+        for row in report:
+            self.assertEqual(row["requests"], 2)
+            self.assertEqual(row["errors"], 0, row["endpoint"])
+            self.assertGreater(row["queries_mean"], 0)
+        self.assertEqual(Quiz.objects.filter(user__username="benchmark-0").count(), 4)
+
+    def test_serializer_paths_render_identical_bytes(self):
+        report = run_serializer_benchmark(quizzes=3, questions=2, repeat=1)
+
+        self.assertEqual([row["path"] for row in report], list(SERIALIZER_PATHS))
+        self.assertTrue(all(row["identical"] for row in report))
+
+
+@mock.patch("quiz_app.api.pipeline.afetch_video_info", new_callable=mock.AsyncMock, return_value=VIDEO_INFO)
+@mock.patch("quiz_app.api.pipeline.acreate_Quiz_with_GeminiAPI", new_callable=mock.AsyncMock,
+            return_value=fake_quiz_json())
+@mock.patch("quiz_app.api.pipeline.transcripts_Audio_to_Text", return_value="transcript")
+@mock.patch("quiz_app.api.pipeline.avideo_download", new_callable=mock.AsyncMock, return_value="media/audio.webm")
+class AsyncCreateQuizTests(TestCase):
+
+    def setUp(self):
+        caches["quiz_results"].clear()
+        self.user = User.objects.create_user(username="owner", password="secret-pass")
+        self.factory = AsyncRequestFactory()
+        self.view = AsyncCreateQuizView.as_view()
+
+    def post(self, data, authenticated=True):
+        request = self.factory.post("/api/createQuiz/", data, content_type="application/json")
+        if authenticated:
+            request.COOKIES["access_token"] = str(AccessToken.for_user(self.user))
+        return self.view(request)
+
+    async def test_creates_quiz_without_blocking_the_loop(self, video_download, transcribe, generate, fetch_info):
+        response = await self.post({"url": VIDEO_URL})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        body = json.loads(response.content)
+        self.assertEqual(len(body["questions"]), 10)
+        self.assertEqual(await Quiz.objects.filter(user=self.user, transcript_source="whisper").acount(), 1)
+        generate.assert_awaited_once_with("transcript")
+
+    async def test_requires_authentication(self, *mocks):
+        response = await self.post({"url": VIDEO_URL}, authenticated=False)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_rejects_invalid_url(self, video_download, transcribe, generate, fetch_info):
+        response = await self.post({"url": "https://example.com/video"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        fetch_info.assert_not_awaited()
+
+    async def test_failed_download_returns_400(self, video_download, transcribe, generate, fetch_info):
+        fetch_info.return_value = None
+
+        response = await self.post({"url": VIDEO_URL})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(json.loads(response.content), ["Download failed"])
+
+    async def test_audio_workspace_is_opened_off_the_event_loop(self, *mocks):
+        threads = []
+
+        @contextlib.contextmanager
+        def workspace():
+            threads.append(threading.get_ident())
+            yield "media/work/job"
+
+        with mock.patch("quiz_app.api.pipeline.audio_workspace", workspace):
+            response = await self.post({"url": VIDEO_URL})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+    async def test_audio_workspace_is_removed_when_the_download_is_cancelled(self, video_download, *mocks):
+        closed = []
+
+        @contextlib.contextmanager
+        def workspace():
+            try:
+                yield "media/work/job"
+            finally:
+                closed.append(True)
+
+        video_download.side_effect = asyncio.CancelledError
+        with mock.patch("quiz_app.api.pipeline.audio_workspace", workspace):
+            with self.assertRaises(asyncio.CancelledError):
+                await aprepare_video(VIDEO_URL)
+
+        self.assertEqual(closed, [True])
+
+    async def test_async_caption_fetch_sends_the_cookie_file(self, *mocks):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as cookie_file:
+            cookie_file.write("# Netscape HTTP Cookie File\n.youtube.com\tTRUE\t/\tTRUE\t0\tSID\tsecret\n")
+        self.addCleanup(os.remove, cookie_file.name)
+        sent = []
+
+        def handler(request):
+            sent.append(request.headers.get("cookie"))
+            return httpx.Response(200, text="WEBVTT")
+
+        client_class = httpx.AsyncClient
+        with mock.patch.dict(helper.YDL_OPTIONS, {"cookiefile": cookie_file.name}), \
+                mock.patch("quiz_app.api.helper.httpx.AsyncClient",
+                           lambda **kwargs: client_class(transport=httpx.MockTransport(handler), **kwargs)):
+            content = await helper.afetch_caption({"url": "https://www.youtube.com/api/timedtext?v=x"})
+
+        self.assertEqual(content, "WEBVTT")
+        self.assertEqual(sent, ["SID=secret"])
+
+
+class DatabaseProfileTests(TestCase):
+    def index_columns(self, model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return [info['columns'] for info in constraints.values() if info['index']]
+
+    def test_access_pattern_indexes_exist(self):
+        self.assertIn(['user_id', 'created_at'], self.index_columns(Quiz))
+        self.assertIn(['quizz_id'], self.index_columns(Question))
+        self.assertIn(['status', 'created_at'], self.index_columns(QuizJob))
+
+    def test_sqlite_connections_are_tuned(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite profile only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')